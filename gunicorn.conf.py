@@ -0,0 +1,55 @@
+# Configuration of the gunicorn server running the dashboard in production. See
+# https://docs.gunicorn.org/en/stable/settings.html.
+import gc
+import glob
+import os
+import tempfile
+
+# With preloading, the app is created once in the master process, before the
+# workers are forked. The workers thus share the imported modules and the
+# dashboard copy-on-write, instead of each importing and creating them on its
+# own.
+_preload = os.environ.get("DASHBOARD_PRELOAD", "true")
+if _preload not in ("true", "false"):
+    raise ValueError("Environment variable 'DASHBOARD_PRELOAD' must be set to either 'true' or 'false'.")
+preload_app = _preload == "true"
+
+# Each worker records its metrics to files in this directory, which are
+# aggregated across workers when /metrics is scraped. This has to be set up
+# before the app, and thus prometheus_client, is imported. Files left over
+# from a previous run are removed so that counters start from zero.
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+else:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="dashboard-metrics-")
+
+
+def pre_fork(server, worker):  # pylint: disable=unused-argument
+    # Modules imported lazily by the dashboard are imported here so that the
+    # workers share them, rather than each importing them on first use.
+    if preload_app:
+        import src  # pylint: disable=import-outside-toplevel
+
+        src.load_lazy_modules()
+
+    # Move all objects created so far into the permanent generation, so that
+    # garbage collections in the workers don't touch, and thereby copy, the
+    # memory pages shared with the master.
+    gc.freeze()
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    # Database connections must not be shared across processes. Each worker
+    # thus creates its own pool after it has been forked.
+    import main  # pylint: disable=import-outside-toplevel
+
+    main.post_fork()
+
+
+def post_worker_init(worker):  # pylint: disable=unused-argument
+    # Datasets are warmed up by each worker rather than before forking, as the
+    # master process must not connect to the database.
+    import main  # pylint: disable=import-outside-toplevel
+
+    main.warm_up()
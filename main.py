@@ -1,44 +1,91 @@
 import os
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import Any, cast
 from warnings import filterwarnings
 
-import pyodbc
 import sqlalchemy
 from flask import Flask
 from sqlalchemy.dialects import mssql
 
 from src import config
 from src.dashboard import DashboardApp
+from src.mssql import make_cnxn
 
 # See https://stackoverflow.com/questions/71082494.
 filterwarnings("ignore", category=UserWarning, message=".*pandas only supports SQLAlchemy connectable.*")
 
 
+# The dashboard created by create_app, used by the gunicorn hooks in
+# gunicorn.conf.py.
+_dashboard: DashboardApp | None = None
+
+
 def create_app(*, init_config_from_env=True) -> Flask:
+    global _dashboard
     if init_config_from_env:
         config.init()
+
+    # The connection pool is created on first use. When preloaded by gunicorn,
+    # the master process thus never connects to the database.
+    _dashboard = DashboardApp(make_cnxn_pool)
+    return _dashboard._app.server
+
+
+def make_cnxn_pool() -> sqlalchemy.QueuePool:
     cfg = config.get()
+    if cfg.DASHBOARD_REPLICA_DIR is not None:
+        from src import replica  # pylint: disable=import-outside-toplevel
 
-    def make_conn():
-        return pyodbc.connect(
-            f"SERVER={cfg.MSSQL_HOSTNAME},{cfg.MSSQL_PORT};"
-            f"UID={cfg.MSSQL_USER};"
-            f"PWD={cfg.MSSQL_PASSWORD.get_secret_value()};"
-            f"DATABASE={cfg.MSSQL_DB};"
-            "Driver=ODBC Driver 18 for SQL Server;"
-            f"TargetEncryptConnection={"yes" if cfg.MSSQL_TARGET_ENCRYPT_CONNECTION else "no"};"
-            f"TrustServerCertificate={"yes" if cfg.MSSQL_TRUST_SERVER_CERTIFICATE else "no"};",
-            readonly=True,
+        directory = Path(cfg.DASHBOARD_REPLICA_DIR)
+        return sqlalchemy.QueuePool(
+            # Replica connections only provide the part of the DB-API used by
+            # pandas.
+            lambda: cast(Any, replica.connect(directory)),
+            pool_size=1,
+            max_overflow=0,
+            reset_on_return=True,
         )
-
-    cnxn_pool = sqlalchemy.QueuePool(
-        make_conn,
+    return sqlalchemy.QueuePool(
+        # The pool passes its connection record to creators taking an argument.
+        lambda: make_cnxn(),  # pylint: disable=unnecessary-lambda
         pool_size=1,
         max_overflow=0,
         reset_on_return=True,
         pre_ping=True,
         dialect=mssql.dialect(),  # required when pre_ping is set.
     )
-    return DashboardApp(cnxn_pool)._app.server
+
+
+def post_fork():
+    """
+    Gives a worker process forked from a preloaded app its own connection
+    pool. Does nothing if the app is loaded by the worker itself.
+    """
+
+    if _dashboard is not None:
+        _dashboard.reset_cnxn_pool()
+
+
+def warm_up():
+    """
+    Loads the datasets cached by the dashboard in the background if
+    DASHBOARD_WARM_UP is set, e.g. in a gunicorn worker which has loaded the
+    app.
+    """
+
+    if _dashboard is not None and config.get().DASHBOARD_WARM_UP:
+        threading.Thread(target=_warm_up, args=(_dashboard,), name="warm-up", daemon=True).start()
+
+
+def _warm_up(dashboard: DashboardApp):
+    try:
+        dashboard.warm_up()
+    except Exception:  # pylint: disable=broad-exception-caught
+        # The datasets are loaded on demand instead.
+        traceback.print_exc(file=sys.stderr)
 
 
 def main():
@@ -58,6 +105,7 @@ def main():
     )
 
     app = create_app(init_config_from_env=False)
+    warm_up()
     app.run(
         debug=debug,
         host=cfg.DEV_DASHBOARD_HOSTNAME,
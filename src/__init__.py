@@ -1,5 +1,7 @@
+import importlib
 import re
-from typing import Literal, get_args
+from types import ModuleType
+from typing import Any, Literal, get_args
 
 import pandas as pd
 
@@ -143,3 +145,49 @@ def int_bucket_label(bucket: pd.Interval) -> str:
     if bucket.right - bucket.left == 1:
         return f"{bucket.left:,}"
     return f"{bucket.left:,} - {bucket.right-1:,}"
+
+
+class LazyModule:
+    """
+    Stand-in for a module which is only imported once one of its attributes
+    is accessed. Used to keep modules with expensive imports, e.g. plotly
+    express, off the startup path.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType | None = None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            # import_module is thread-safe and returns the same module on
+            # concurrent first uses.
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+
+_lazy_modules: list[LazyModule] = []
+
+
+def lazy_import(name: str) -> Any:
+    """
+    Returns a LazyModule for the module of the given name. Modules which are
+    to be type checked should be imported regularly under TYPE_CHECKING.
+    """
+
+    module = LazyModule(name)
+    _lazy_modules.append(module)
+    return module
+
+
+def load_lazy_modules():
+    """
+    Imports all modules which have been imported lazily, e.g. before forking
+    worker processes that are supposed to share them.
+    """
+
+    for module in _lazy_modules:
+        module.load()
@@ -0,0 +1,373 @@
+"""
+Benchmarks the dashboard's datasets and plots against a database.
+
+Usage: python -m src.benchmarks [--suite SUITE ...] [--database NAME ...]
+                                [--driver pyodbc|pymssql|sqlite|replica ...]
+                                [--pool-size N ...] [--dataset NAME ...]
+                                [--repeat N] [--hide-test-clients]
+                                [--out FILE]
+
+Suites:
+- datasets: Times every dataset, i.e. every function of src/queries.py and
+  the relationship network, from running its queries to processing the rows.
+- plots: Times every graph callback of the dashboard end-to-end by posting
+  to dash's /_dash-update-component, i.e. loading the dataset and building
+  and serializing the figure. Caches are cleared before every request.
+- pool: Loads the datasets concurrently by N threads sharing a connection
+  pool of size N, for every given pool size.
+
+The database is configured by the same environment variables as the
+dashboard, e.g. pointing to the local server of dev/bootstrap-mssql. To sweep
+data sizes, pass several databases holding data at different scales, e.g.
+generated by src.synthetic. Every combination of database and driver is
+benchmarked. The sqlite driver reads data written by src.synthetic's sqlite
+target and the replica driver the replica synced by src.replica, given their
+directory as the database.
+
+Results are written to FILE as JSON along with the git revision, so that the
+results of releases can be compared.
+"""
+
+import argparse
+import functools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+import sqlalchemy
+
+from src import config, mssql, replica, synthetic
+from src.diagnostics import datasets
+
+SUITES = ("datasets", "plots", "pool")
+DRIVERS = ("pyodbc", "pymssql", "sqlite", "replica")
+
+
+@dataclass
+class Result:
+    suite: str
+    database: str
+    driver: str
+    name: str
+    times_s: list[float]
+    pool_size: int = 1
+    # Rows of a dataset or bytes of a callback's response.
+    rows: int | None = None
+    response_bytes: int | None = None
+    # Latencies of the single loads of the pool suite.
+    latencies_s: list[float] = field(default_factory=list)
+    error: str | None = None
+
+    def summary(self) -> dict[str, Any]:
+        record = asdict(self)
+        del record["times_s"], record["latencies_s"]
+        if len(self.times_s) > 0:
+            record |= {"min_s": min(self.times_s), "median_s": statistics.median(self.times_s)}
+        if len(self.latencies_s) > 0:
+            record |= percentiles(self.latencies_s)
+        return record
+
+
+def connect(driver: str) -> Any:
+    """
+    Opens a connection to the configured database using the given driver.
+    """
+
+    if driver == "pyodbc":
+        return mssql.make_cnxn()
+    if driver == "pymssql":
+        import pymssql  # pylint: disable=import-outside-toplevel
+
+        cfg = config.get()
+        return pymssql.connect(
+            server=cfg.MSSQL_HOSTNAME,
+            port=cfg.MSSQL_PORT,
+            user=cfg.MSSQL_USER,
+            password=cfg.MSSQL_PASSWORD.get_secret_value(),
+            database=cfg.MSSQL_DB,
+            read_only=True,
+            autocommit=True,
+        )
+    if driver == "sqlite":
+        return synthetic.connect_sqlite(Path(config.get().MSSQL_DB))
+    if driver == "replica":
+        return replica.connect(Path(config.get().MSSQL_DB))
+    raise ValueError(driver)
+
+
+def make_cnxn_pool(driver: str, pool_size: int) -> sqlalchemy.QueuePool:
+    return sqlalchemy.QueuePool(
+        lambda: connect(driver),
+        pool_size=pool_size,
+        max_overflow=0,
+        reset_on_return=True,
+    )
+
+
+def bench_datasets(
+    cnxn_pool: sqlalchemy.QueuePool,
+    loaders: dict[str, Callable],
+    hide_test_clients: bool,
+    repeat: int,
+) -> list[tuple[str, list[float], int | None, str | None]]:
+    """
+    Times every dataset, returning its name, the times of the repetitions,
+    its number of rows and an error, if loading failed.
+    """
+
+    results = []
+    for name, load in loaders.items():
+        times = []
+        rows = None
+        error = None
+        cnxn = cnxn_pool.connect()
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data = load(cnxn, hide_test_clients)
+                times.append(time.perf_counter() - start)
+            rows = _num_rows(data)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error = repr(e)
+        finally:
+            cnxn.close()
+        results.append((name, times, rows, error))
+    return results
+
+
+def figure_callback_payloads(dependencies: list[dict], hide_test_clients: bool) -> dict[str, dict]:
+    """
+    Returns the /_dash-update-component payloads of all graph callbacks by
+    plot id, given the callbacks as listed by /_dash-dependencies.
+    """
+
+    payloads = {}
+    for callback in dependencies:
+        output: str = callback["output"]
+        if not output.endswith(".figure") or not output.startswith("{"):
+            continue
+        output_id = json.loads(output.removesuffix(".figure"))
+        inputs = []
+        for i in callback["inputs"]:
+            input_id = json.loads(i["id"]) if i["id"].startswith("{") else i["id"]
+            inputs.append(
+                {
+                    "id": input_id,
+                    "property": i["property"],
+                    "value": ["hide_test_clients"] if hide_test_clients else [],
+                }
+            )
+        payloads[output_id["plot"]] = {
+            "output": output,
+            "outputs": {"id": output_id, "property": "figure"},
+            "inputs": inputs,
+            "changedPropIds": [],
+            "state": [],
+        }
+    return payloads
+
+
+def bench_plots(
+    dashboard: Any,
+    hide_test_clients: bool,
+    repeat: int,
+) -> list[tuple[str, list[float], int | None, str | None]]:
+    """
+    Times every graph callback of the dashboard, returning its plot id, the
+    times of the repetitions, the size of its response and an error, if the
+    callback failed.
+    """
+
+    client = dashboard._app.server.test_client()  # pylint: disable=protected-access
+    payloads = figure_callback_payloads(client.get("/_dash-dependencies").get_json(), hide_test_clients)
+    results = []
+    for plot, payload in payloads.items():
+        times = []
+        size = None
+        error = None
+        for _ in range(repeat):
+            dashboard.clear_caches()
+            start = time.perf_counter()
+            response = client.post("/_dash-update-component", json=payload)
+            times.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+                break
+            size = len(response.data)
+        results.append((plot, times, size, error))
+    return results
+
+
+def bench_pool(
+    cnxn_pool: sqlalchemy.QueuePool,
+    pool_size: int,
+    loaders: dict[str, Callable],
+    hide_test_clients: bool,
+    repeat: int,
+) -> tuple[list[float], list[float]]:
+    """
+    Loads all datasets by as many threads as there are pooled connections,
+    returning the wall times of the repetitions and the latencies of the
+    single loads, including waiting for a connection.
+    """
+
+    walls = []
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def worker():
+        for load in loaders.values():
+            start = time.perf_counter()
+            cnxn = cnxn_pool.connect()
+            try:
+                load(cnxn, hide_test_clients)
+            finally:
+                cnxn.close()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    for _ in range(repeat):
+        threads = [threading.Thread(target=worker) for _ in range(pool_size)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        walls.append(time.perf_counter() - start)
+    return walls, latencies
+
+
+def _num_rows(data: Any) -> int | None:
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    # The relationship network.
+    return getattr(data, "num_edges", None)
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """
+    Returns the p50, p95 and p99 of the given latencies.
+    """
+
+    q = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {"p50_s": q[49], "p95_s": q[94], "p99_s": q[98]}
+
+
+def _git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent.parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _write_report(out: Path, results: list[Result], repeat: int, hide_test_clients: bool):
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "hide_test_clients": hide_test_clients,
+        "results": [r.summary() | {"times_s": r.times_s} for r in results],
+    }
+    out.write_text(json.dumps(report, indent=2))
+
+
+def _print_results(results: list[Result]):
+    print(f"\n{'min [s]':>9} {'median [s]':>10}  {'suite':<8} {'database':<16} {'driver':<8} {'pool':>4}  name")
+    for r in results:
+        columns = f"{r.suite:<8} {r.database:<16} {r.driver:<8} {r.pool_size:>4}"
+        if r.error is not None:
+            print(f"{'failed':>9} {'':>10}  {columns}  {r.name}: {r.error}")
+            continue
+        s = r.summary()
+        print(f"{s['min_s']:9.3f} {s['median_s']:10.3f}  {columns}  {r.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="suite, may be repeated; defaults to all")
+    parser.add_argument("--database", action="append", help="database, may be repeated; defaults to MSSQL_DB")
+    parser.add_argument("--driver", action="append", choices=DRIVERS, help="driver, may be repeated; pyodbc by default")
+    parser.add_argument("--pool-size", action="append", type=int, help="pool size of the pool suite, may be repeated")
+    parser.add_argument("--dataset", action="append", help="dataset to benchmark, may be repeated; all by default")
+    parser.add_argument("--repeat", type=int, default=3, help="number of repetitions")
+    parser.add_argument("--hide-test-clients", action="store_true", help="load the datasets without test clients")
+    parser.add_argument("--out", type=Path, default=Path("benchmark-results.json"), help="results file")
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    drivers = args.driver or ["pyodbc"]
+    pool_sizes = args.pool_size or [1, 2, 4, 8]
+    repeat = max(args.repeat, 1)
+
+    cfg = config.init()
+    databases = args.database or [cfg.MSSQL_DB]
+    loaders = datasets()
+    if args.dataset:
+        unknown = set(args.dataset) - set(loaders)
+        if unknown:
+            parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+        loaders = {name: loaders[name] for name in args.dataset}
+
+    dashboard = None
+    results: list[Result] = []
+    for database in databases:
+        # Arguments take precedence over the environment.
+        config.init(MSSQL_DB=database)
+        for driver in drivers:
+            print(f"Benchmarking {database} using {driver}", file=sys.stderr)
+            if "datasets" in suites:
+                cnxn_pool = make_cnxn_pool(driver, 1)
+                for name, times, rows, error in bench_datasets(cnxn_pool, loaders, args.hide_test_clients, repeat):
+                    results.append(Result("datasets", database, driver, name, times, rows=rows, error=error))
+                cnxn_pool.dispose()
+            if "plots" in suites:
+                # The dashboard is created once, as dash registers its pages
+                # globally, and connected to the database at hand.
+                if dashboard is None:
+                    from src.dashboard import DashboardApp  # pylint: disable=import-outside-toplevel
+
+                    dashboard = DashboardApp(functools.partial(make_cnxn_pool, driver, 1))
+                else:
+                    dashboard.reset_cnxn_pool(functools.partial(make_cnxn_pool, driver, 1))
+                for plot, times, size, error in bench_plots(dashboard, args.hide_test_clients, repeat):
+                    results.append(Result("plots", database, driver, plot, times, response_bytes=size, error=error))
+            if "pool" in suites:
+                for pool_size in pool_sizes:
+                    cnxn_pool = make_cnxn_pool(driver, pool_size)
+                    walls, latencies = bench_pool(cnxn_pool, pool_size, loaders, args.hide_test_clients, repeat)
+                    cnxn_pool.dispose()
+                    results.append(
+                        Result(
+                            "pool",
+                            database,
+                            driver,
+                            "all datasets",
+                            walls,
+                            pool_size=pool_size,
+                            latencies_s=latencies,
+                        )
+                    )
+
+    _write_report(args.out, results, repeat, args.hide_test_clients)
+    _print_results(results)
+    print(f"\nResults written to {args.out}")
+
+if __name__ == "__main__":
+    main()
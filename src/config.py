@@ -36,6 +36,18 @@ class _Config(BaseSettings):
     DASHBOARD_HIDE_TEST_CLIENTS_DEFAULT: bool
     DASHBOARD_TEST_CLIENTS_REGEX: re.Pattern
     DASHBOARD_APP_CLIENTS_REGEX: re.Pattern
+    DASHBOARD_SNAPSHOT_TTL_SECONDS: int = Field(300, ge=0)
+    DASHBOARD_MESSAGE_COUNT_ROLLUP: bool = False
+    DASHBOARD_MESSAGE_COUNT_ROLLUP_FULL_REFRESH_SECONDS: int = Field(3600, ge=0)
+    DASHBOARD_DAILY_COUNT_ROLLUP_FILE: str | None = None
+    DASHBOARD_DAILY_COUNT_ROLLUP_FULL_REFRESH_SECONDS: int = Field(86400, ge=0)
+    DASHBOARD_SYNC_RUN_EVENT_COUNT: bool = False
+    DASHBOARD_WARM_UP: bool = False
+    DASHBOARD_TRACING: bool = False
+    DASHBOARD_TRACING_OTLP_ENDPOINT: str | None = None
+    DASHBOARD_PROFILING_TOKEN: SecretStr | None = None
+    DASHBOARD_PROFILING_DIR: str | None = None
+    DASHBOARD_REPLICA_DIR: str | None = None
 
     DEV_DASHBOARD_HOSTNAME: str | None = None
     DEV_DASHBOARD_PORT: int | None = Field(None, ge=1, le=65535)
@@ -44,6 +56,10 @@ class _Config(BaseSettings):
         "MSSQL_TARGET_ENCRYPT_CONNECTION",
         "MSSQL_TRUST_SERVER_CERTIFICATE",
         "DASHBOARD_HIDE_TEST_CLIENTS_DEFAULT",
+        "DASHBOARD_MESSAGE_COUNT_ROLLUP",
+        "DASHBOARD_SYNC_RUN_EVENT_COUNT",
+        "DASHBOARD_WARM_UP",
+        "DASHBOARD_TRACING",
         mode="before",
     )
     @classmethod
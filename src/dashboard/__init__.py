@@ -1,20 +1,81 @@
+from __future__ import annotations
+
+import json
+import threading
 from contextlib import contextmanager
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+from urllib.parse import urlencode
 
 import dash
-import plotly.graph_objs as go
 import sqlalchemy
 from dash import ALL, Dash, Input, Output, State, dcc, html
-from flask import Flask, redirect, render_template, request
+from flask import Flask, Response, abort, redirect, request
+
+from src import config, lazy_import, metrics, profiling, queries, tracing
+from src.layout import LayoutCache
+from src.rollups import DailyCountRollup, MessageCountRollup
+from src.snapshots import Snapshot, SnapshotCache, VersionedCache, content_version
+
+if TYPE_CHECKING:
+    import plotly.graph_objs as go
+    from pyodbc import Connection
 
-from src import config, network
-from src import plotly_plots as plots
-from src import queries
+    from src import network
+    from src import plotly_plots as plots
+else:
+    # Imported on first use, keeping plotly express and friends off the
+    # startup path of every worker.
+    network = lazy_import("src.network")
+    plots = lazy_import("src.plotly_plots")
+
+T = TypeVar("T")
+
+# Number of layouts of ego networks of given addresses kept per worker.
+_MAX_EGO_NETWORK_LAYOUTS = 64
 
 
 class DashboardApp:
-    def __init__(self, cnxn_pool: sqlalchemy.QueuePool):
-        self._cnxn_pool = cnxn_pool
+    def __init__(self, make_cnxn_pool: Callable[[], sqlalchemy.QueuePool]):
+        # The connection pool is created on first use, so that a dashboard
+        # created before gunicorn forks its workers never connects to the
+        # database in the master process.
+        self._make_cnxn_pool = make_cnxn_pool
+        self._cnxn_pool: sqlalchemy.QueuePool | None = None
+        self._cnxn_pool_lock = threading.Lock()
+        self._forcegraph_snapshots: SnapshotCache[bytes] = SnapshotCache(
+            name="forcegraph",
+            ttl=config.get().DASHBOARD_SNAPSHOT_TTL_SECONDS,
+            version=content_version,
+        )
+        self._rel_network_snapshots: SnapshotCache[network.RelNetwork] = SnapshotCache(
+            name="rel_network",
+            ttl=config.get().DASHBOARD_SNAPSHOT_TTL_SECONDS,
+            version=lambda net: net.version,
+        )
+        self._forcegraph_layouts = LayoutCache()
+        # Ego networks of arbitrary addresses are not known in advance, so
+        # that only the most recent ones are kept.
+        self._ego_network_layouts = LayoutCache(max_size=_MAX_EGO_NETWORK_LAYOUTS)
+        self._network_statistics: VersionedCache[network.NetworkStatistics] = VersionedCache(name="network_statistics")
+        # Page datasets are not served with ETags, so that they need no version.
+        self._page_datasets: SnapshotCache[Any] = SnapshotCache(
+            name="page_datasets",
+            ttl=config.get().DASHBOARD_SNAPSHOT_TTL_SECONDS,
+            version=lambda dataset: "",
+        )
+        self._message_counts: MessageCountRollup | None = None
+        if config.get().DASHBOARD_MESSAGE_COUNT_ROLLUP:
+            self._message_counts = MessageCountRollup(
+                full_refresh_interval=config.get().DASHBOARD_MESSAGE_COUNT_ROLLUP_FULL_REFRESH_SECONDS,
+            )
+        self._daily_counts: DailyCountRollup | None = None
+        daily_count_rollup_file = config.get().DASHBOARD_DAILY_COUNT_ROLLUP_FILE
+        if daily_count_rollup_file is not None:
+            self._daily_counts = DailyCountRollup(
+                Path(daily_count_rollup_file),
+                full_refresh_interval=config.get().DASHBOARD_DAILY_COUNT_ROLLUP_FULL_REFRESH_SECONDS,
+            )
 
         # We explicitly set up a flask server to override dash's default
         # root-url route for which there seems no good way to reconfigure it
@@ -25,7 +86,6 @@ class DashboardApp:
             __name__,
             static_url_path="/static",
             static_folder="./static",
-            template_folder="./templates",
         )
         flask.add_url_rule(
             "/",
@@ -91,28 +151,42 @@ class DashboardApp:
 
         self._setup_callbacks()
         self._app.server.add_url_rule("/forcegraph.html", view_func=self.render_forcegraph)
+        self._app.server.add_url_rule("/forcegraph/data", view_func=self.forcegraph_data)
+        # Probes are served by flask directly and never touch the database.
+        self._app.server.add_url_rule("/health", view_func=self.health)
+        self._app.server.add_url_rule("/ready", view_func=self.ready)
+        metrics.init_app(self._app.server, paths={"/forcegraph/data": "forcegraph-data"})
+        tracing.init_app(self._app.server)
+        profiling.init_app(self._app.server)
 
     @contextmanager
     def _grab_cnxn(self):
-        cnxn = self._cnxn_pool.connect()
-        yield cnxn
-        cnxn.close()
+        cnxn_pool = self._get_cnxn_pool()
+        with metrics.pool_checkout():
+            cnxn = cnxn_pool.connect()
+        try:
+            yield cnxn
+        finally:
+            # Return the connection even if a query fails, as the pool would
+            # be exhausted otherwise.
+            cnxn.close()
 
     def _setup_callbacks(self):
         @self._app.callback(
             Output({"type": "graph", "plot": "num-max-rel-templ-allocations"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-max-rel-templ-allocations"}, "value"),
         )
+        @tracing.traced("num-max-rel-templ-allocations")
         def num_max_rel_templ_allocations(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.num_max_rel_templ_allocations(cnxn, hide)
-            return plots.num_max_rel_templ_allocations(df)
+            dataset = self._get_page_dataset(queries.relationship_templates, hide)
+            return plots.num_max_rel_templ_allocations(dataset.num_max_rel_templ_allocations)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "size-of-file-contents"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "size-of-file-contents"}, "value"),
         )
+        @tracing.traced("size-of-file-contents")
         def size_of_file_contents(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
@@ -123,20 +197,22 @@ class DashboardApp:
             Output({"type": "graph", "plot": "num-external-events-per-sync-run"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-external-events-per-sync-run"}, "value"),
         )
+        @tracing.traced("num-external-events-per-sync-run")
         def num_external_events_per_sync_run(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
-                df = queries.num_external_events_per_sync_run(cnxn, hide)
+                df = queries.num_external_events_per_sync_run(cnxn, hide, config.get().DASHBOARD_SYNC_RUN_EVENT_COUNT)
             return plots.num_external_events_per_sync_run(df)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "type-of-external-events"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "type-of-external-events"}, "value"),
         )
+        @tracing.traced("type-of-external-events")
         def type_of_external_events(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
-                df = queries.type_of_external_events(cnxn, hide)
+                df = queries.type_of_external_events(cnxn, hide, self._daily_counts)
             return plots.type_of_external_events(df)
 
         @self._app.callback(
@@ -145,66 +221,76 @@ class DashboardApp:
                 {"type": "hide-test-clients-checkbox", "plot": "payload-category-of-datawallet-modifications"}, "value"
             ),
         )
+        @tracing.traced("payload-category-of-datawallet-modifications")
         def payload_category_of_datawallet_modifications(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.payload_category_of_datawallet_modifications(cnxn, hide)
-            return plots.payload_category_of_datawallet_modifications(df)
+            dataset = self._get_page_dataset(queries.datawallet_modifications, hide)
+            return plots.payload_category_of_datawallet_modifications(
+                dataset.payload_category_of_datawallet_modifications
+            )
 
         @self._app.callback(
             Output({"type": "graph", "plot": "collection-of-datawallet-modifications"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "collection-of-datawallet-modifications"}, "value"),
         )
+        @tracing.traced("collection-of-datawallet-modifications")
         def collection_of_datawallet_modifications(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.collection_of_datawallet_modifications(cnxn, hide)
-            return plots.collection_of_datawallet_modifications(df)
+            dataset = self._get_page_dataset(queries.datawallet_modifications, hide)
+            return plots.collection_of_datawallet_modifications(dataset.collection_of_datawallet_modifications)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "type-of-datawallet-modifications"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "type-of-datawallet-modifications"}, "value"),
         )
+        @tracing.traced("type-of-datawallet-modifications")
         def type_of_datawallet_modifications(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.type_of_datawallet_modifications(cnxn, hide)
-            return plots.type_of_datawallet_modifications(df)
+            dataset = self._get_page_dataset(queries.datawallet_modifications, hide)
+            return plots.type_of_datawallet_modifications(dataset.type_of_datawallet_modifications)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "size-of-datawallet-modifications"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "size-of-datawallet-modifications"}, "value"),
         )
+        @tracing.traced("size-of-datawallet-modifications")
         def size_of_datawallet_modifications(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.size_of_datawallet_modifications(cnxn, hide)
-            return plots.size_of_datawallet_modifications(df)
+            dataset = self._get_page_dataset(queries.datawallet_modifications, hide)
+            return plots.size_of_datawallet_modifications(dataset.size_of_datawallet_modifications)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "num-datawallet-modifications"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-datawallet-modifications"}, "value"),
         )
+        @tracing.traced("num-datawallet-modifications")
         def num_datawallet_modifications(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.num_datawallet_modifications_per_identity(cnxn, hide)
-            return plots.num_datawallet_modifications_per_identity(df)
+            dataset = self._get_page_dataset(queries.datawallet_modifications, hide)
+            return plots.num_datawallet_modifications_per_identity(dataset.num_datawallet_modifications_per_identity)
 
         @self._app.callback(
             Output("forcegraph$iframe", "src"),
             Input({"type": "hide-test-clients-checkbox", "plot": "forcegraph"}, "value"),
+            Input("forcegraph-level-radio", "value"),
         )
-        def update_forcegraph(value: list | None) -> str:
+        @tracing.traced("forcegraph")
+        def update_forcegraph(value: list | None, level: str) -> str:
             hide_test_clients = value is not None and len(value) > 0
+            params: dict[str, str | int] = {}
             if hide_test_clients:
-                return "/forcegraph.html?hide-test-clients=1"
-            return "/forcegraph.html"
+                params["hide-test-clients"] = 1
+            # The aggregated client view collapses identities into one node
+            # per client, which keeps large networks renderable.
+            if level == "clients":
+                params["level"] = "clients"
+            return "/forcegraph.html" + (f"?{urlencode(params)}" if params else "")
 
         @self._app.callback(
             Output({"type": "graph", "plot": "num-identities-per-client"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-identities-per-client"}, "value"),
         )
+        @tracing.traced("num-identities-per-client")
         def num_identities_per_client(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
@@ -215,26 +301,27 @@ class DashboardApp:
             Output({"type": "graph", "plot": "num-sent-messages-per-client"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-sent-messages-per-client"}, "value"),
         )
+        @tracing.traced("num-sent-messages-per-client")
         def num_sent_messages_per_client(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.num_sent_messages_per_client(cnxn, hide)
-            return plots.num_sent_messages_per_client(df)
+            dataset = self._get_page_dataset(queries.messages, hide)
+            return plots.num_sent_messages_per_client(dataset.num_sent_messages_per_client)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "num-received-messages-per-client"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-received-messages-per-client"}, "value"),
         )
+        @tracing.traced("num-received-messages-per-client")
         def num_received_messages_per_client(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.num_received_messages_per_client(cnxn, hide)
-            return plots.num_received_messages_per_client(df)
+            dataset = self._get_page_dataset(queries.messages, hide)
+            return plots.num_received_messages_per_client(dataset.num_received_messages_per_client)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "num-devices-per-identity"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-devices-per-identity"}, "value"),
         )
+        @tracing.traced("num-devices-per-identity")
         def num_devices_per_identity(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
@@ -245,20 +332,21 @@ class DashboardApp:
             Output({"type": "graph", "plot": "num-recipients-per-sender-client-type"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-recipients-per-sender-client-type"}, "value"),
         )
+        @tracing.traced("num-recipients-per-sender-client-type")
         def num_recipients_per_sender_client_type(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.num_recipients_per_sender_client_type(cnxn, hide)
-            return plots.num_recipients_per_sender_client_type(df)
+            dataset = self._get_page_dataset(queries.messages, hide)
+            return plots.num_recipients_per_sender_client_type(dataset.num_recipients_per_sender_client_type)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "activity-identity-creations"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "activity-identity-creations"}, "value"),
         )
+        @tracing.traced("activity-identity-creations")
         def activity_identity_creations(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
-                df = queries.identity_creations(cnxn, hide)
+                df = queries.identity_creations(cnxn, hide, self._daily_counts)
             return plots.activity_plot(
                 df,
                 time_col="CreatedAt",
@@ -269,16 +357,58 @@ class DashboardApp:
             Output({"type": "graph", "plot": "num-peers-per-identity"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-peers-per-identity"}, "value"),
         )
+        @tracing.traced("num-peers-per-identity")
         def num_peers_per_identity(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
                 df = queries.num_peers_per_identity(cnxn, hide)
             return plots.num_peers_per_identity(df)
 
+        @self._app.callback(
+            Output({"type": "graph", "plot": "network-degree-distribution"}, "figure"),
+            Input({"type": "hide-test-clients-checkbox", "plot": "network-degree-distribution"}, "value"),
+        )
+        @tracing.traced("network-degree-distribution")
+        def network_degree_distribution(value: list | None) -> go.Figure:
+            hide = value is not None and len(value) > 0
+            df = self._get_network_statistics(hide).degree_distribution
+            return plots.network_degree_distribution(df)
+
+        @self._app.callback(
+            Output({"type": "graph", "plot": "network-component-sizes"}, "figure"),
+            Input({"type": "hide-test-clients-checkbox", "plot": "network-component-sizes"}, "value"),
+        )
+        @tracing.traced("network-component-sizes")
+        def network_component_sizes(value: list | None) -> go.Figure:
+            hide = value is not None and len(value) > 0
+            df = self._get_network_statistics(hide).component_sizes
+            return plots.network_component_sizes(df)
+
+        @self._app.callback(
+            Output({"type": "graph", "plot": "network-hubs"}, "figure"),
+            Input({"type": "hide-test-clients-checkbox", "plot": "network-hubs"}, "value"),
+        )
+        @tracing.traced("network-hubs")
+        def network_hubs(value: list | None) -> go.Figure:
+            hide = value is not None and len(value) > 0
+            df = self._get_network_statistics(hide).hubs
+            return plots.network_hubs(df)
+
+        @self._app.callback(
+            Output({"type": "graph", "plot": "relationships-between-client-types"}, "figure"),
+            Input({"type": "hide-test-clients-checkbox", "plot": "relationships-between-client-types"}, "value"),
+        )
+        @tracing.traced("relationships-between-client-types")
+        def relationships_between_client_types(value: list | None) -> go.Figure:
+            hide = value is not None and len(value) > 0
+            df = self._get_network_statistics(hide).relationships_between_client_types
+            return plots.relationships_between_client_types(df)
+
         @self._app.callback(
             Output({"type": "graph", "plot": "num-tokens-per-identity"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-tokens-per-identity"}, "value"),
         )
+        @tracing.traced("num-tokens-per-identity")
         def num_tokens_per_identity(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
@@ -289,16 +419,17 @@ class DashboardApp:
             Output({"type": "graph", "plot": "num-relationship-templates-per-identity"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-relationship-templates-per-identity"}, "value"),
         )
+        @tracing.traced("num-relationship-templates-per-identity")
         def num_relationship_templates_per_identity(value: list | None) -> go.Figure:
             hide = value is not None and len(value) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.num_relationship_templates_per_identity(cnxn, hide)
-            return plots.num_relationship_templates_per_identity(df)
+            dataset = self._get_page_dataset(queries.relationship_templates, hide)
+            return plots.num_relationship_templates_per_identity(dataset.num_relationship_templates_per_identity)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "token-size"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "token-size"}, "value"),
         )
+        @tracing.traced("token-size")
         def token_size(value: list | None) -> go.Figure:
             hide_test_clients = value is not None and len(value) > 0
             with self._grab_cnxn() as cnxn:
@@ -309,12 +440,12 @@ class DashboardApp:
             Output({"type": "graph", "plot": "activity-num-sent-messages"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "activity-num-sent-messages"}, "value"),
         )
+        @tracing.traced("activity-num-sent-messages")
         def activity_num_sent_messages(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.messages(cnxn, hide)
+            dataset = self._get_page_dataset(queries.messages, hide)
             return plots.activity_plot(
-                df,
+                dataset.activity_num_sent_messages,
                 time_col="CreatedAt",
                 split_col="ClientType",
             )
@@ -323,10 +454,11 @@ class DashboardApp:
             Output({"type": "graph", "plot": "activity-external-events"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "activity-external-events"}, "value"),
         )
+        @tracing.traced("activity-external-events")
         def activity_external_events(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
-                df = queries.external_events(cnxn, hide)
+                df = queries.external_events(cnxn, hide, self._daily_counts)
             return plots.activity_plot(
                 df,
                 time_col="CreatedAt",
@@ -337,16 +469,18 @@ class DashboardApp:
             Output({"type": "graph", "plot": "sync-errors"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "sync-errors"}, "value"),
         )
+        @tracing.traced("sync-errors")
         def sync_errors(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
-                df = queries.sync_errors(cnxn, hide)
+                df = queries.sync_errors(cnxn, hide, self._daily_counts)
             return plots.timeline(df, "ErrorCode", "CreatedAt", True)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "relationship-status-distribution"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "relationship-status-distribution"}, "value"),
         )
+        @tracing.traced("relationship-status-distribution")
         def relationship_status_distribution(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
@@ -357,6 +491,7 @@ class DashboardApp:
             Output({"type": "graph", "plot": "relationship-duration-pending"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "relationship-duration-pending"}, "value"),
         )
+        @tracing.traced("relationship-duration-pending")
         def relationship_duration_pending(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
@@ -367,6 +502,7 @@ class DashboardApp:
             Output({"type": "graph", "plot": "device-type-distribution"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "device-type-distribution"}, "value"),
         )
+        @tracing.traced("device-type-distribution")
         def device_type_distribution(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
@@ -377,30 +513,31 @@ class DashboardApp:
             Output({"type": "graph", "plot": "message-content-size"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "message-content-size"}, "value"),
         )
+        @tracing.traced("message-content-size")
         def message_content_size(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.messages(cnxn, hide)
-            return plots.message_content_size(df)
+            dataset = self._get_page_dataset(queries.messages, hide)
+            return plots.message_content_size(dataset.message_content_size)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "size-of-relationship-templates"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "size-of-relationship-templates"}, "value"),
         )
+        @tracing.traced("size-of-relationship-templates")
         def size_of_relationship_templates(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.size_of_relationship_templates(cnxn, hide)
-            return plots.size_of_relationship_templates(df)
+            dataset = self._get_page_dataset(queries.relationship_templates, hide)
+            return plots.size_of_relationship_templates(dataset.size_of_relationship_templates)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "activity-num-created-files"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "activity-num-created-files"}, "value"),
         )
+        @tracing.traced("activity-num-created-files")
         def activity_num_created_files(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
-                df = queries.activity_num_created_files(cnxn, hide)
+                df = queries.activity_num_created_files(cnxn, hide, self._daily_counts)
             return plots.activity_plot(
                 df,
                 time_col="CreatedAt",
@@ -411,6 +548,7 @@ class DashboardApp:
             Output({"type": "graph", "plot": "num-files-per-identity"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "num-files-per-identity"}, "value"),
         )
+        @tracing.traced("num-files-per-identity")
         def num_files_per_identity(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
@@ -421,26 +559,27 @@ class DashboardApp:
             Output({"type": "graph", "plot": "rlt-time-until-first-usage"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "rlt-time-until-first-usage"}, "value"),
         )
+        @tracing.traced("rlt-time-until-first-usage")
         def rlt_time_until_first_usage(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.rlt_time_until_first_usage(cnxn, hide)
-            return plots.rlt_time_until_first_usage(df)
+            dataset = self._get_page_dataset(queries.relationship_templates, hide)
+            return plots.rlt_time_until_first_usage(dataset.rlt_time_until_first_usage)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "rlt-validity-period"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "rlt-validity-period"}, "value"),
         )
+        @tracing.traced("rlt-validity-period")
         def rlt_validity_period(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
-            with self._grab_cnxn() as cnxn:
-                df = queries.rlt_validity_period(cnxn, hide)
-            return plots.rlt_validity_period(df)
+            dataset = self._get_page_dataset(queries.relationship_templates, hide)
+            return plots.rlt_validity_period(dataset.rlt_validity_period)
 
         @self._app.callback(
             Output({"type": "graph", "plot": "ral-reasons"}, "figure"),
             Input({"type": "hide-test-clients-checkbox", "plot": "ral-reasons"}, "value"),
         )
+        @tracing.traced("ral-reasons")
         def ral_reasons(hide_list: list | None) -> go.Figure:
             hide = hide_list is not None and len(hide_list) > 0
             with self._grab_cnxn() as cnxn:
@@ -524,12 +663,233 @@ class DashboardApp:
                 return make_result(hide=True, mask=True)
             return mask_updates(None, checkboxes)  # Unset radio group if checkbox states are not all identical.
 
-    def render_forcegraph(self):
+    def render_forcegraph(self) -> Response:
+        # The page is a static shell which fetches its data from
+        # /forcegraph/data, forwarding its own query string. It can thus be
+        # cached by the browser independently of the data.
+        return self._app.server.send_static_file("forcegraph.html")
+
+    def forcegraph_data(self) -> Response:
         hide_test_clients = request.args.get("hide-test-clients", default=False, type=bool)
-        with self._grab_cnxn() as cnxn:
-            net = network.make_rel_network(cnxn, hide_test_clients)
-        data = network.forcegraph_data(net)
-        return render_template("forcegraph.html", data=data)
+        # Level of detail: either the full identity-level network, the network
+        # aggregated by client or the neighborhood of a client's identities or
+        # of single addresses, within the given number of hops.
+        level = request.args.get("level", default="identities")
+        client_id = request.args.get("client")
+        addresses = request.args.getlist("address")
+        radius = request.args.get("radius", default=1, type=int)
+        if level not in ("identities", "clients") or not 0 <= radius <= _MAX_EGO_NETWORK_RADIUS:
+            abort(400)
+
+        if len(addresses) > 0:
+            # Neighborhoods of addresses are extracted from the cached network
+            # within milliseconds, but there are too many of them to cache each.
+            body = self._build_forcegraph_data(hide_test_clients, level, client_id, addresses, radius)
+            response = Response(body, mimetype="application/json")
+            response.set_etag(content_version(body))
+        else:
+            snapshot = self._get_forcegraph_snapshot(hide_test_clients, level, client_id, radius)
+            response = Response(snapshot.value, mimetype="application/json")
+            # The ETag is derived from the content. Layouts depend only on the
+            # network, so it is identical across workers. Clients have to
+            # revalidate on every request, which costs a 304 without body as
+            # long as the data has not changed.
+            response.set_etag(snapshot.version)
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+        return response
+
+    def health(self) -> Response:
+        # Liveness: the process is able to serve requests.
+        return Response("OK", mimetype="text/plain")
+
+    def ready(self) -> Response:
+        """
+        Readiness, along with the state of the connection pool and caches.
+        Only in-memory state is inspected, no connection is checked out.
+
+        If warm-up is enabled, the dashboard is ready once the warmed up
+        datasets are cached. Otherwise it is ready right away, as datasets are
+        loaded on demand.
+        """
+
+        ready = True
+        if config.get().DASHBOARD_WARM_UP:
+            ready = all(
+                self._forcegraph_snapshots.peek(self._forcegraph_snapshot_key(hide, "identities")) is not None
+                for hide in (True, False)
+            )
+
+        cnxn_pool = self._get_cnxn_pool()
+        status = {
+            "ready": ready,
+            "pool": {
+                "size": cnxn_pool.size(),
+                "checkedIn": cnxn_pool.checkedin(),
+                "checkedOut": cnxn_pool.checkedout(),
+                "overflow": cnxn_pool.overflow(),
+            },
+            "caches": {
+                "relNetwork": _snapshot_cache_status(self._rel_network_snapshots),
+                "forcegraph": _snapshot_cache_status(self._forcegraph_snapshots),
+                "pageDatasets": _snapshot_cache_status(self._page_datasets),
+            },
+        }
+        response = Response(json.dumps(status), status=200 if ready else 503, mimetype="application/json")
+        response.cache_control.no_store = True
+        return response
+
+    def warm_up(self):
+        """
+        Loads the datasets cached by the dashboard, so that they are available
+        before the first request. When run before gunicorn forks its workers
+        (--preload), the workers share the warm caches copy-on-write.
+        """
+
+        for hide_test_clients in (True, False):
+            self._get_forcegraph_snapshot(hide_test_clients, "identities")
+            self._get_forcegraph_snapshot(hide_test_clients, "clients")
+            self._get_network_statistics(hide_test_clients)
+
+    def clear_caches(self):
+        """
+        Drops all cached datasets and layouts, so that they are loaded from
+        the database again on next use, e.g. when benchmarking.
+        """
+
+        self._forcegraph_snapshots.clear()
+        self._rel_network_snapshots.clear()
+        self._forcegraph_layouts.clear()
+        self._ego_network_layouts.clear()
+        self._network_statistics.clear()
+        self._page_datasets.clear()
+
+    def reset_cnxn_pool(self, make_cnxn_pool: Callable[[], sqlalchemy.QueuePool] | None = None):
+        """
+        Drops the connection pool, which is created again on next use, e.g. in
+        a forked worker process which must not share connections with its
+        parent. If given, the new pool is created by make_cnxn_pool.
+        """
+
+        with self._cnxn_pool_lock:
+            if make_cnxn_pool is not None:
+                self._make_cnxn_pool = make_cnxn_pool
+            self._cnxn_pool = None
+
+    def _get_cnxn_pool(self) -> sqlalchemy.QueuePool:
+        with self._cnxn_pool_lock:
+            if self._cnxn_pool is None:
+                self._cnxn_pool = self._make_cnxn_pool()
+            return self._cnxn_pool
+
+    def _get_forcegraph_snapshot(
+        self,
+        hide_test_clients: bool,
+        level: str,
+        client_id: str | None = None,
+        radius: int = 1,
+    ) -> Snapshot[bytes]:
+        return self._forcegraph_snapshots.get(
+            self._forcegraph_snapshot_key(hide_test_clients, level, client_id, radius),
+            lambda: self._build_forcegraph_data(hide_test_clients, level, client_id, [], radius),
+        )
+
+    @staticmethod
+    def _forcegraph_snapshot_key(
+        hide_test_clients: bool,
+        level: str,
+        client_id: str | None = None,
+        radius: int = 1,
+    ) -> tuple:
+        return ("forcegraph", hide_test_clients, level, client_id, radius if client_id is not None else None)
+
+    def _build_forcegraph_data(
+        self,
+        hide_test_clients: bool,
+        level: str,
+        client_id: str | None,
+        addresses: list[str],
+        radius: int,
+    ) -> bytes:
+        net = self._get_rel_network(hide_test_clients)
+        # Node positions are computed once per network version, so that the
+        # browser can render a settled graph right away.
+        if client_id is not None or len(addresses) > 0:
+            sub = network.ego_network(net, addresses=addresses, client_id=client_id, radius=radius)
+            if sub is None:
+                abort(404)
+            if len(addresses) > 0:
+                positions = self._ego_network_layouts.get(
+                    (hide_test_clients, tuple(sorted(set(addresses))), radius), sub.addresses, sub.sources, sub.targets
+                )
+            else:
+                positions = self._forcegraph_layouts.get(
+                    ("client", hide_test_clients, client_id, radius), sub.addresses, sub.sources, sub.targets
+                )
+            data = network.forcegraph_data(sub, positions)
+        elif level == "clients":
+            clients = network.aggregate_by_client(net)
+            positions = self._forcegraph_layouts.get(
+                ("clients", hide_test_clients),
+                clients.client_ids,
+                clients.sources,
+                clients.targets,
+                weights=clients.num_relationships,
+            )
+            data = network.client_network_data(clients, positions)
+        else:
+            positions = self._forcegraph_layouts.get(
+                ("identities", hide_test_clients), net.addresses, net.sources, net.targets
+            )
+            data = network.forcegraph_data(net, positions)
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def _get_rel_network(self, hide_test_clients: bool) -> network.RelNetwork:
+        # All views of the relationship network are derived from the same
+        # snapshot of the network, so that it is queried only once per variant.
+        def build() -> network.RelNetwork:
+            with self._grab_cnxn() as cnxn:
+                message_counts = None
+                if self._message_counts is not None:
+                    message_counts = self._message_counts.refresh(cnxn)
+                return network.make_rel_network(cnxn, hide_test_clients, message_counts)
+
+        return self._rel_network_snapshots.get(hide_test_clients, build).value
+
+    def _get_page_dataset(self, load: Callable[[Connection, bool], T], hide_test_clients: bool) -> T:
+        # The aggregates shown on a page are loaded together and shared by the
+        # page's plots, whose callbacks wait for the single load.
+        def build() -> T:
+            with self._grab_cnxn() as cnxn:
+                return load(cnxn, hide_test_clients)
+
+        return self._page_datasets.get((load.__name__, hide_test_clients), build).value
+
+    def _get_network_statistics(self, hide_test_clients: bool) -> network.NetworkStatistics:
+        # Statistics are computed once per version of the network.
+        net = self._get_rel_network(hide_test_clients)
+        return self._network_statistics.get(hide_test_clients, net.version, lambda: network.network_statistics(net))
+
+
+def _snapshot_cache_status(cache: SnapshotCache) -> dict:
+    snapshots = cache.snapshots()
+    return {
+        "hits": cache.hits,
+        "misses": cache.misses,
+        "snapshots": [
+            {
+                "key": [str(k) for k in key] if isinstance(key, tuple) else str(key),
+                "ageSeconds": round(snapshot.age(), 3),
+                "fresh": cache.is_fresh(snapshot),
+            }
+            for key, snapshot in snapshots.items()
+        ],
+    }
+
+
+# Neighborhoods grow quickly with their radius, so that larger ones are about
+# as expensive as the whole network.
+_MAX_EGO_NETWORK_RADIUS = 3
 
 
 def _get_dropdown(children: list[Any] | None = None):
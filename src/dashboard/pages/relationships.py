@@ -17,6 +17,14 @@ layout = html.Div(
                                     options=[{"label": "Hide Test Clients?", "value": "hide_test_clients"}],
                                     value=[],
                                 ),
+                                dcc.RadioItems(
+                                    id="forcegraph-level-radio",
+                                    options=[
+                                        {"label": "Identities", "value": "identities"},
+                                        {"label": "Clients", "value": "clients"},
+                                    ],
+                                    value="identities",
+                                ),
                             ]
                         ),
                         html.Span(
@@ -110,6 +118,109 @@ layout = html.Div(
             id="num_peers_per_identity$div",
             className="graph-div",
         ),
+        html.Div(
+            [
+                html.Div(
+                    children=[
+                        _get_dropdown(
+                            children=[
+                                dcc.Checklist(
+                                    id={"type": "hide-test-clients-checkbox", "plot": "network-degree-distribution"},
+                                    options=[{"label": "Hide Test Clients?", "value": "hide_test_clients"}],
+                                    value=[],
+                                ),
+                            ]
+                        ),
+                        html.Span(
+                            children=["Distribution of Number of Peers per Identity (Active Relationships)"],
+                            className="plot-title",
+                        ),
+                    ],
+                    className="plot-header",
+                ),
+                dcc.Graph(id={"type": "graph", "plot": "network-degree-distribution"}),
+            ],
+            id="network_degree_distribution$div",
+            className="graph-div",
+        ),
+        html.Div(
+            [
+                html.Div(
+                    children=[
+                        _get_dropdown(
+                            children=[
+                                dcc.Checklist(
+                                    id={"type": "hide-test-clients-checkbox", "plot": "network-component-sizes"},
+                                    options=[{"label": "Hide Test Clients?", "value": "hide_test_clients"}],
+                                    value=[],
+                                ),
+                            ]
+                        ),
+                        html.Span(
+                            children=["Distribution of Connected Component Sizes"],
+                            className="plot-title",
+                        ),
+                    ],
+                    className="plot-header",
+                ),
+                dcc.Graph(id={"type": "graph", "plot": "network-component-sizes"}),
+            ],
+            id="network_component_sizes$div",
+            className="graph-div",
+        ),
+        html.Div(
+            [
+                html.Div(
+                    children=[
+                        _get_dropdown(
+                            children=[
+                                dcc.Checklist(
+                                    id={"type": "hide-test-clients-checkbox", "plot": "network-hubs"},
+                                    options=[{"label": "Hide Test Clients?", "value": "hide_test_clients"}],
+                                    value=[],
+                                ),
+                            ]
+                        ),
+                        html.Span(
+                            children=["Identities with the Most Peers"],
+                            className="plot-title",
+                        ),
+                    ],
+                    className="plot-header",
+                ),
+                dcc.Graph(id={"type": "graph", "plot": "network-hubs"}),
+            ],
+            id="network_hubs$div",
+            className="graph-div",
+        ),
+        html.Div(
+            [
+                html.Div(
+                    children=[
+                        _get_dropdown(
+                            children=[
+                                dcc.Checklist(
+                                    id={
+                                        "type": "hide-test-clients-checkbox",
+                                        "plot": "relationships-between-client-types",
+                                    },
+                                    options=[{"label": "Hide Test Clients?", "value": "hide_test_clients"}],
+                                    value=[],
+                                ),
+                            ]
+                        ),
+                        html.Span(
+                            children=["Active Relationships between Client Types"],
+                            className="plot-title",
+                        ),
+                    ],
+                    className="plot-header",
+                ),
+                dcc.Graph(id={"type": "graph", "plot": "relationships-between-client-types"}),
+            ],
+            id="relationships_between_client_types$div",
+            className="graph-div",
+        ),
         html.Div(
             [
                 html.Div(
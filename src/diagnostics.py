@@ -0,0 +1,288 @@
+"""
+Captures SQL Server's I/O and time statistics and the actual execution plans
+of the queries run for each dataset of the dashboard.
+
+Usage: python -m src.diagnostics [--dataset NAME ...] [--hide-test-clients]
+                                 [--out DIR] [--json]
+
+The database is configured by the same environment variables as the
+dashboard, e.g. pointing to the local server of dev/bootstrap-mssql. Each
+dataset is loaded with STATISTICS IO, TIME and XML enabled for its session.
+The logical and physical reads per table and the CPU and elapsed time per
+statement are parsed from the informational messages returned by the server.
+
+For every dataset, DIR/<dataset>.json lists its statements along with their
+statistics and DIR/<dataset>-<n>.sqlplan holds the actual execution plan of
+its n-th statement, which can be opened with SQL Server Management Studio or
+Azure Data Studio. A summary of all datasets, ordered by logical reads, is
+printed.
+"""
+
+import argparse
+import inspect
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from pyodbc import Connection, Cursor
+
+from src import config, mssql, network, queries
+
+
+@dataclass
+class TableStatistics:
+    table: str
+    # Counters as reported by STATISTICS IO, e.g. "logical reads", keyed in
+    # camel case, e.g. logicalReads.
+    counters: dict[str, int]
+
+
+@dataclass
+class StatementStatistics:
+    sql: str
+    tables: list[TableStatistics] = field(default_factory=list)
+    parse_and_compile_cpu_ms: int = 0
+    parse_and_compile_elapsed_ms: int = 0
+    cpu_ms: int = 0
+    elapsed_ms: int = 0
+    plan: str | None = None
+
+    @property
+    def logical_reads(self) -> int:
+        return sum(t.counters.get("logicalReads", 0) for t in self.tables)
+
+    @property
+    def physical_reads(self) -> int:
+        return sum(t.counters.get("physicalReads", 0) for t in self.tables)
+
+
+@dataclass
+class DatasetStatistics:
+    dataset: str
+    statements: list[StatementStatistics]
+
+    @property
+    def logical_reads(self) -> int:
+        return sum(s.logical_reads for s in self.statements)
+
+    @property
+    def physical_reads(self) -> int:
+        return sum(s.physical_reads for s in self.statements)
+
+    @property
+    def cpu_ms(self) -> int:
+        return sum(s.cpu_ms for s in self.statements)
+
+    @property
+    def elapsed_ms(self) -> int:
+        return sum(s.elapsed_ms for s in self.statements)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "dataset": self.dataset,
+            "numStatements": len(self.statements),
+            "logicalReads": self.logical_reads,
+            "physicalReads": self.physical_reads,
+            "cpuMs": self.cpu_ms,
+            "elapsedMs": self.elapsed_ms,
+        }
+
+
+def datasets() -> dict[str, Callable[[Connection, bool], Any]]:
+    """
+    Returns the functions loading the dashboard's datasets by name.
+    """
+
+    result: dict[str, Callable[[Connection, bool], Any]] = {
+        name: func
+        for name, func in inspect.getmembers(queries, inspect.isfunction)
+        if func.__module__ == queries.__name__ and _is_dataset(inspect.signature(func))
+    }
+    result["make_rel_network"] = network.make_rel_network
+    return result
+
+
+def _is_dataset(signature: inspect.Signature) -> bool:
+    # Datasets are loaded given a connection and whether to hide test clients,
+    # any further parameters being optional.
+    params = list(signature.parameters.values())
+    return [p.name for p in params[:2]] == ["cnxn", "hide_test_clients"] and all(
+        p.default is not inspect.Parameter.empty for p in params[2:]
+    )
+
+
+def capture(
+    cnxn: Connection,
+    dataset: str,
+    load: Callable[[Connection, bool], Any],
+    hide_test_clients: bool,
+) -> DatasetStatistics:
+    """
+    Loads a dataset, capturing the statistics of every statement run.
+    """
+
+    statements: list[StatementStatistics] = []
+    cursor = cnxn.cursor()
+    cursor.execute("SET STATISTICS IO, TIME, XML ON")
+    cursor.close()
+    try:
+        load(_CapturingConnection(cnxn, statements), hide_test_clients)  # type: ignore[arg-type]
+    finally:
+        cursor = cnxn.cursor()
+        cursor.execute("SET STATISTICS IO, TIME, XML OFF")
+        cursor.close()
+    return DatasetStatistics(dataset=dataset, statements=statements)
+
+
+class _CapturingConnection:
+    # Passed to the dataset functions in place of the connection. Only the
+    # parts of the DB-API used by pandas are provided.
+
+    def __init__(self, cnxn: Connection, statements: list[StatementStatistics]):
+        self._cnxn = cnxn
+        self._statements = statements
+
+    def cursor(self) -> "_CapturingCursor":
+        return _CapturingCursor(self._cnxn.cursor(), self._statements)
+
+    def commit(self):
+        self._cnxn.commit()
+
+    def rollback(self):
+        self._cnxn.rollback()
+
+
+class _CapturingCursor:
+    def __init__(self, cursor: Cursor, statements: list[StatementStatistics]):
+        self._cursor = cursor
+        self._statements = statements
+        self._statement: StatementStatistics | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def execute(self, sql: str, *params: Any) -> "_CapturingCursor":
+        self._cursor.execute(sql, *params)
+        self._statement = StatementStatistics(sql=sql)
+        self._statements.append(self._statement)
+        # Parse and compile times are reported before the first result set.
+        _parse_messages(self._statement, self._cursor.messages)
+        return self
+
+    def close(self):
+        # Statistics of the statement are reported after its rows, and its
+        # plan follows as a separate result set. pandas has fetched the rows
+        # by the time it closes the cursor.
+        if self._statement is not None:
+            while self._cursor.nextset():
+                _parse_messages(self._statement, self._cursor.messages)
+                if self._cursor.description is not None and self._cursor.description[0][0] == _SHOWPLAN_COLUMN:
+                    self._statement.plan = self._cursor.fetchone()[0]
+            _parse_messages(self._statement, self._cursor.messages)
+        self._cursor.close()
+
+
+_SHOWPLAN_COLUMN = "Microsoft SQL Server 2005 XML Showplan"
+
+# Messages are prefixed by the driver, e.g. "[Microsoft][ODBC Driver 18 for
+# SQL Server][SQL Server]Table 'Identities'. Scan count 1, logical reads 50,
+# physical reads 0, ...".
+_TABLE_RE = re.compile(r"Table '(?P<table>[^']+)'\. (?P<counters>.*)")
+_COUNTER_RE = re.compile(r"(?P<name>[a-zA-Z -]+?) (?P<value>\d+)")
+_TIMES_RE = re.compile(
+    r"SQL Server (?P<kind>parse and compile time|Execution Times):\s*"
+    r"CPU time = (?P<cpu>\d+) ms,\s*elapsed time = (?P<elapsed>\d+) ms"
+)
+
+
+def _parse_messages(statement: StatementStatistics, messages: list[tuple[str, str]] | None):
+    for _, message in messages or []:
+        text = message.rsplit("]", 1)[-1]
+        if m := _TABLE_RE.search(text):
+            counters = {}
+            for counter in m["counters"].split(","):
+                if c := _COUNTER_RE.fullmatch(counter.strip().rstrip(".")):
+                    counters[_camel_case(c["name"])] = int(c["value"])
+            statement.tables.append(TableStatistics(table=m["table"], counters=counters))
+        for m in _TIMES_RE.finditer(text):
+            if m["kind"] == "parse and compile time":
+                statement.parse_and_compile_cpu_ms += int(m["cpu"])
+                statement.parse_and_compile_elapsed_ms += int(m["elapsed"])
+            else:
+                statement.cpu_ms += int(m["cpu"])
+                statement.elapsed_ms += int(m["elapsed"])
+
+
+def _camel_case(name: str) -> str:
+    words = name.replace("-", " ").split()
+    return words[0].lower() + "".join(w.capitalize() for w in words[1:])
+
+
+def _write(stats: DatasetStatistics, out: Path):
+    statements = []
+    for i, statement in enumerate(stats.statements, start=1):
+        plan_file = None
+        if statement.plan is not None:
+            plan_file = f"{stats.dataset}-{i}.sqlplan"
+            (out / plan_file).write_text(statement.plan)
+        statements.append(
+            {
+                "sql": statement.sql,
+                "logicalReads": statement.logical_reads,
+                "physicalReads": statement.physical_reads,
+                "cpuMs": statement.cpu_ms,
+                "elapsedMs": statement.elapsed_ms,
+                "parseAndCompileCpuMs": statement.parse_and_compile_cpu_ms,
+                "parseAndCompileElapsedMs": statement.parse_and_compile_elapsed_ms,
+                "tables": [{"table": t.table} | t.counters for t in statement.tables],
+                "planFile": plan_file,
+            }
+        )
+    report = stats.summary() | {"statements": statements}
+    (out / f"{stats.dataset}.json").write_text(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", action="append", help="dataset to capture, may be repeated; defaults to all")
+    parser.add_argument("--hide-test-clients", action="store_true", help="load the datasets without test clients")
+    parser.add_argument("--out", type=Path, default=Path("sql-diagnostics"), help="output directory")
+    parser.add_argument("--json", action="store_true", help="print a machine-readable summary")
+    args = parser.parse_args()
+
+    config.init()
+
+    available = datasets()
+    names = args.dataset or sorted(available)
+    unknown = set(names) - set(available)
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    results = []
+    cnxn = mssql.make_cnxn()
+    try:
+        for name in names:
+            stats = capture(cnxn, name, available[name], args.hide_test_clients)
+            _write(stats, args.out)
+            results.append(stats)
+            if not args.json:
+                print(f"Captured {name}", file=sys.stderr)
+    finally:
+        cnxn.close()
+
+    results.sort(key=lambda s: s.logical_reads, reverse=True)
+    if args.json:
+        print(json.dumps([s.summary() for s in results], indent=2))
+    else:
+        print(f"\n{'logical reads':>14} {'physical reads':>14} {'cpu [ms]':>9} {'elapsed [ms]':>12}  dataset")
+        for s in results:
+            print(f"{s.logical_reads:14d} {s.physical_reads:14d} {s.cpu_ms:9d} {s.elapsed_ms:12d}  {s.dataset}")
+        print(f"\nStatistics and plans written to {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
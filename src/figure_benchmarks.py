@@ -0,0 +1,451 @@
+"""
+Benchmarks every figure builder of src/plotly_plots.py on synthetic frames
+and checks them against stored performance budgets.
+
+Usage: python -m src.figure_benchmarks [--rows N ...] [--figure NAME ...]
+                                       [--repeat N] [--update-budgets]
+                                       [--json]
+
+Every builder is fed frames of N rows matching the input schema documented
+by its docstring, by default 10^3 to 10^6 rows. Frames of 10^7 rows, which
+take several GB of memory for some builders, have to be requested
+explicitly with --rows 1e7. For every builder and size, the fastest build
+time of the repetitions, the peak memory allocated while building, as traced
+by tracemalloc, and the size of the figure serialized to JSON are reported.
+
+Budgets are stored in src/figure_budgets.json per builder and size. The
+command exits with status 1 if any measurement exceeds its budget, so that it
+can be used as a regression check. --update-budgets stores the measurements,
+with some headroom, as the new budgets of the measured builders and sizes.
+Raise budgets deliberately, not to make the check pass.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, get_args
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from src import (
+    DeviceType,
+    bb_datawallet_modification_collections,
+    bb_datawallet_modification_type_map,
+    bb_external_event_type_map,
+    bb_rel_status_map,
+    bb_relationship_audit_log_reason_map,
+    client_types,
+)
+from src import plotly_plots as plots
+
+BUDGETS_FILE = Path(__file__).parent / "figure_budgets.json"
+DEFAULT_ROWS = (10**3, 10**4, 10**5, 10**6)
+
+# Headroom of the budgets stored by --update-budgets. Build times vary most
+# between machines and are never budgeted below _MIN_BUILD_BUDGET_MS.
+_HEADROOM = {"build_ms": 3.0, "peak_mib": 1.5, "figure_kib": 1.25}
+_MIN_BUILD_BUDGET_MS = 100.0
+
+# The data spans three years, as the timeline splits its subplots by year.
+_START = np.datetime64("2023-01-01T00:00:00", "ns")
+_SPAN_S = 3 * 365 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class Case:
+    figure: str
+    make_frame: Callable[[np.random.Generator, int], pd.DataFrame]
+    # Passed to the builder after the frame, as done by the dashboard.
+    args: tuple = ()
+
+
+@dataclass
+class Measurement:
+    figure: str
+    rows: int
+    build_ms: float
+    peak_mib: float
+    figure_kib: float
+    # Budgets exceeded, by measurement.
+    exceeded: dict[str, float] | None = None
+    error: str | None = None
+
+
+def _client_type(rng: np.random.Generator, n: int) -> pd.Categorical:
+    codes = (rng.random(n) < 0.2).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=client_types(), ordered=True)
+
+
+def _category(rng: np.random.Generator, n: int, categories: list[str]) -> pd.Categorical:
+    codes = rng.integers(len(categories), size=n)
+    return pd.Categorical.from_codes(codes, categories=sorted(categories), ordered=True)
+
+
+def _counts(rng: np.random.Generator, n: int) -> np.ndarray:
+    # Heavy-tailed, as most identities are barely active and few are hubs.
+    return np.minimum(rng.pareto(1.2, n) + 1, 10**7).astype(np.int64)
+
+
+def _sizes(rng: np.random.Generator, n: int) -> np.ndarray:
+    return rng.lognormal(8, 1.5, n).astype(np.int64)
+
+
+def _times(rng: np.random.Generator, n: int) -> np.ndarray:
+    return _START + (rng.random(n) * _SPAN_S * 10**9).astype("timedelta64[ns]")
+
+
+def _durations(rng: np.random.Generator, n: int) -> np.ndarray:
+    return (rng.lognormal(10, 2.5, n) * 10**6).astype("timedelta64[us]")
+
+
+def _value_counts(rng: np.random.Generator, n: int, col: str) -> pd.DataFrame:
+    # Like grouping by client type and counting the distinct values of col,
+    # i.e. every pair of client type and value is unique.
+    values = np.arange(n) // 2
+    codes = (np.arange(n) % 2).astype(np.int8)
+    return pd.DataFrame(
+        {
+            "ClientType": pd.Categorical.from_codes(codes, categories=client_types(), ordered=True),
+            col: values,
+            "count": np.maximum(_counts(rng, n) * n // (values + 1) // 100, 1),
+        }
+    )
+
+
+def _clients(rng: np.random.Generator, n: int, prefix: str, count_col: str) -> pd.DataFrame:
+    ids = [f"client-{i}" for i in range(n)]
+    return pd.DataFrame(
+        {
+            f"{prefix}ClientDisplayName": pd.Categorical([f"Client {i}" for i in range(n)], ordered=True),
+            f"{prefix}ClientId": pd.Categorical(ids, ordered=True),
+            f"{prefix}ClientType": _client_type(rng, n),
+            count_col: _counts(rng, n),
+        }
+    )
+
+
+def _category_counts(rng: np.random.Generator, n: int, col: str, categories: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            col: _category(rng, n, categories),
+            "ClientType": _client_type(rng, n),
+            "count": _counts(rng, n),
+        }
+    )
+
+
+def _relationship_durations(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    created_at = _times(rng, n)
+    answered_at = created_at + _durations(rng, n).astype("timedelta64[ns]")
+    answered_at[rng.random(n) < 0.1] = np.datetime64("NaT")
+    return pd.DataFrame({"CreatedAt": created_at, "AnsweredAt": answered_at})
+
+
+def _template_allocations(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    # Templates without a limit have MaxAllocs 0.
+    max_allocs = np.where(rng.random(n) < 0.5, 0, _counts(rng, n))
+    num_allocs = np.minimum(_counts(rng, n) - 1, np.where(max_allocs == 0, 10**7, max_allocs))
+    return pd.DataFrame(
+        {
+            "RLTCreatorClientType": _client_type(rng, n),
+            "MaxAllocs": max_allocs,
+            "NumAllocs": num_allocs,
+            "RelRLTAllocs": np.where(max_allocs == 0, np.nan, num_allocs / np.maximum(max_allocs, 1)),
+        }
+    )
+
+
+def _time_until_first_usage(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    unallocated = rng.random(n) < 0.3
+    return pd.DataFrame(
+        {
+            "ExpiredUnallocated": unallocated & (rng.random(n) < 0.5),
+            "RLTCreatorClientType": _client_type(rng, n),
+            "TimeUntilFirstUsage": np.where(unallocated, np.timedelta64("NaT"), _durations(rng, n)),
+        }
+    )
+
+
+def _validity_periods(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    # Templates without expiry are valid until 9999.
+    unlimited = rng.random(n) < 0.1
+    until_9999 = np.datetime64("9999-12-31", "us") - _START.astype("datetime64[us]")
+    return pd.DataFrame(
+        {
+            "ValidityPeriod": np.where(unlimited, until_9999, _durations(rng, n)),
+            "RLTCreatorClientType": _client_type(rng, n),
+        }
+    )
+
+
+def cases() -> dict[str, Case]:
+    """
+    Returns the benchmarked builders by name, along with the making of their
+    input frames.
+    """
+
+    dwm_types = list(bb_datawallet_modification_type_map.values())
+    event_types = list(bb_external_event_type_map.values())
+    return {
+        c.figure: c
+        for c in [
+            Case("num_identities_per_client", lambda rng, n: _clients(rng, n, "", "NumIdentities")),
+            Case("num_sent_messages_per_client", lambda rng, n: _clients(rng, n, "Sender", "NumMessages")),
+            Case("num_received_messages_per_client", lambda rng, n: _clients(rng, n, "Recipient", "NumMessages")),
+            Case(
+                "message_content_size",
+                lambda rng, n: pd.DataFrame(
+                    {
+                        "ClientType": _client_type(rng, n),
+                        "MessageSize": _sizes(rng, n) // 50 * 50,
+                        "count": _counts(rng, n),
+                    }
+                ),
+            ),
+            Case("num_devices_per_identity", lambda rng, n: _value_counts(rng, n, "NumDevices")),
+            Case(
+                "num_recipients_per_sender_client_type",
+                lambda rng, n: _value_counts(rng, n, "NumRecipients").rename(
+                    columns={"ClientType": "SenderClientType", "count": "NumSentMessages"}
+                ),
+            ),
+            Case(
+                "num_peers_per_identity",
+                lambda rng, n: pd.DataFrame({"ClientType": _client_type(rng, n), "NumPeers": _counts(rng, n)}),
+            ),
+            Case(
+                "network_degree_distribution",
+                lambda rng, n: pd.DataFrame({"ClientType": _client_type(rng, n), "NumPeers": _counts(rng, n)})
+                .groupby(["ClientType", "NumPeers"], as_index=False, observed=True)
+                .size()
+                .rename(columns={"size": "count"}),
+            ),
+            Case("network_component_sizes", lambda rng, n: pd.DataFrame({"NumIdentities": _counts(rng, n) + 1})),
+            Case(
+                "network_hubs",
+                lambda rng, n: pd.DataFrame(
+                    {
+                        "Address": [f"did:e:localhost:dids:{i:022x}" for i in range(n)],
+                        "Client": _category(rng, n, [f"client-{i}" for i in range(100)]),
+                        "ClientType": _client_type(rng, n),
+                        "NumPeers": _counts(rng, n),
+                        "NumMessages": _counts(rng, n) * 10,
+                    }
+                ),
+            ),
+            Case(
+                "relationships_between_client_types",
+                lambda rng, n: pd.DataFrame(
+                    {
+                        "ClientType1": _client_type(rng, n),
+                        "ClientType2": _client_type(rng, n),
+                        "NumRelationships": _counts(rng, n),
+                        "NumMessages": _counts(rng, n) * 10,
+                    }
+                ),
+            ),
+            Case(
+                "activity_plot",
+                lambda rng, n: pd.DataFrame({"CreatedAt": _times(rng, n), "ClientType": _client_type(rng, n)}),
+                ("CreatedAt", "ClientType"),
+            ),
+            Case(
+                "relationship_status_distribution",
+                lambda rng, n: pd.DataFrame({"Status": _category(rng, n, list(bb_rel_status_map.values()))}),
+            ),
+            Case("relationship_duration_pending", _relationship_durations),
+            Case(
+                "device_push_channel_type",
+                lambda rng, n: pd.DataFrame(
+                    {"ClientType": _client_type(rng, n), "DeviceType": _category(rng, n, list(get_args(DeviceType)))}
+                ),
+            ),
+            Case(
+                "num_relationship_templates_per_identity",
+                lambda rng, n: pd.DataFrame({"ClientType": _client_type(rng, n), "NumTemplates": _counts(rng, n)}),
+            ),
+            Case(
+                "num_tokens_per_identity",
+                lambda rng, n: pd.DataFrame({"ClientType": _client_type(rng, n), "NumTokens": _counts(rng, n)}),
+            ),
+            Case(
+                "token_size",
+                lambda rng, n: pd.DataFrame({"ClientType": _client_type(rng, n), "TokenSize": _sizes(rng, n)}),
+            ),
+            Case("num_datawallet_modifications_per_identity", lambda rng, n: _value_counts(rng, n, "NumDWM")),
+            Case(
+                "size_of_datawallet_modifications",
+                lambda rng, n: pd.DataFrame(
+                    {"Size": _sizes(rng, n) // 50 * 50, "ClientType": _client_type(rng, n), "count": _counts(rng, n)}
+                ),
+            ),
+            Case("type_of_datawallet_modifications", lambda rng, n: _category_counts(rng, n, "Type", dwm_types)),
+            Case(
+                "collection_of_datawallet_modifications",
+                lambda rng, n: _category_counts(rng, n, "Collection", bb_datawallet_modification_collections),
+            ),
+            Case(
+                "payload_category_of_datawallet_modifications",
+                lambda rng, n: _category_counts(rng, n, "PayloadCategory", ["Empty", "Userdata", "Metadata"]),
+            ),
+            Case("type_of_external_events", lambda rng, n: _category_counts(rng, n, "Type", event_types)),
+            Case("num_external_events_per_sync_run", lambda rng, n: _value_counts(rng, n, "NumExternalEvents")),
+            Case(
+                "size_of_relationship_templates",
+                lambda rng, n: pd.DataFrame(
+                    {"RelationshipTemplateSize": _sizes(rng, n), "ClientType": _client_type(rng, n)}
+                ),
+            ),
+            Case(
+                "size_of_file_contents",
+                lambda rng, n: pd.DataFrame({"FileSize": _sizes(rng, n) * 100, "ClientType": _client_type(rng, n)}),
+            ),
+            Case("num_max_rel_templ_allocations", _template_allocations),
+            Case("num_files_per_identity", lambda rng, n: _value_counts(rng, n, "NumFiles")),
+            Case("rlt_time_until_first_usage", _time_until_first_usage),
+            Case("rlt_validity_period", _validity_periods),
+            Case(
+                "timeline",
+                lambda rng, n: pd.DataFrame(
+                    {
+                        "ErrorCode": _category(rng, n, ["content_too_large", "invalid_content", "timeout"]),
+                        "CreatedAt": _times(rng, n),
+                    }
+                ),
+                ("ErrorCode", "CreatedAt", True),
+            ),
+            Case(
+                "ral_reasons",
+                lambda rng, n: pd.DataFrame(
+                    {"Reason": _category(rng, n, list(bb_relationship_audit_log_reason_map.values()))}
+                ),
+            ),
+        ]
+    }
+
+
+def measure(case: Case, rows: int, repeat: int) -> Measurement:
+    """
+    Builds the figure of a case from a frame of the given number of rows,
+    measuring the fastest build, the peak memory and the serialized size.
+    """
+
+    df = case.make_frame(np.random.default_rng(rows), rows)
+    build = getattr(plots, case.figure)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build(df, *case.args)
+        times.append(time.perf_counter() - start)
+    # Tracing slows down allocations, so that memory is measured separately.
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        build(df, *case.args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(
+        figure=case.figure,
+        rows=rows,
+        build_ms=min(times) * 1000,
+        peak_mib=(peak - before) / 2**20,
+        figure_kib=len(pio.to_json(fig, validate=False)) / 2**10,
+    )
+
+
+def check(m: Measurement, budgets: dict[str, Any]) -> dict[str, float] | None:
+    """
+    Returns the budgets of a measurement it exceeds, or None if it has no
+    budget.
+    """
+
+    budget = budgets.get(m.figure, {}).get(str(m.rows))
+    if budget is None:
+        return None
+    return {key: limit for key, limit in budget.items() if getattr(m, key) > limit}
+
+
+def _with_headroom(m: Measurement) -> dict[str, float]:
+    budget = {key: round(getattr(m, key) * factor, 1) for key, factor in _HEADROOM.items()}
+    budget["build_ms"] = max(budget["build_ms"], _MIN_BUILD_BUDGET_MS)
+    return budget
+
+
+def _num_rows(value: str) -> int:
+    # Allows for scientific notation, e.g. 1e6.
+    return int(float(value))
+
+
+def _update_budgets(budgets: dict, measurements: list[Measurement]):
+    for m in measurements:
+        if m.error is None:
+            budgets.setdefault(m.figure, {})[str(m.rows)] = _with_headroom(m)
+            m.exceeded = {}
+    budgets = {name: dict(sorted(b.items(), key=lambda kv: int(kv[0]))) for name, b in sorted(budgets.items())}
+    BUDGETS_FILE.write_text(json.dumps(budgets, indent=2) + "\n")
+
+
+def _status(m: Measurement) -> str:
+    if m.error is not None:
+        return f"failed: {m.error}"
+    if m.exceeded is None:
+        return "no budget"
+    if m.exceeded:
+        return "exceeds " + ", ".join(f"{key} budget of {limit}" for key, limit in m.exceeded.items())
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", action="append", type=_num_rows, help="number of rows, may be repeated")
+    parser.add_argument("--figure", action="append", help="builder to benchmark, may be repeated; defaults to all")
+    parser.add_argument("--repeat", type=int, default=3, help="number of builds, the fastest of which is reported")
+    parser.add_argument("--update-budgets", action="store_true", help="store the measurements as budgets")
+    parser.add_argument("--json", action="store_true", help="print a machine-readable report")
+    args = parser.parse_args()
+
+    available = cases()
+    names = args.figure or list(available)
+    unknown = set(names) - set(available)
+    if unknown:
+        parser.error(f"unknown figures: {', '.join(sorted(unknown))}")
+    sizes = sorted(set(args.rows or DEFAULT_ROWS))
+    budgets = json.loads(BUDGETS_FILE.read_text()) if BUDGETS_FILE.exists() else {}
+
+    measurements = []
+    for name in names:
+        for rows in sizes:
+            if not args.json:
+                print(f"Building {name} from {rows} rows", file=sys.stderr)
+            try:
+                m = measure(available[name], rows, max(args.repeat, 1))
+                m.exceeded = check(m, budgets)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                m = Measurement(name, rows, float("nan"), float("nan"), float("nan"), error=repr(e))
+            measurements.append(m)
+
+    if args.update_budgets:
+        _update_budgets(budgets, measurements)
+
+    failed = [m for m in measurements if m.error is not None or m.exceeded]
+    if args.json:
+        print(json.dumps({"within_budget": len(failed) == 0, "measurements": [asdict(m) for m in measurements]}))
+    else:
+        print(f"\n{'rows':>9} {'build [ms]':>11} {'peak [MiB]':>11} {'figure [KiB]':>13}  figure")
+        for m in measurements:
+            print(f"{m.rows:9d} {m.build_ms:11.1f} {m.peak_mib:11.1f} {m.figure_kib:13.1f}  {m.figure} {_status(m)}")
+        if args.update_budgets:
+            print(f"\nBudgets written to {BUDGETS_FILE}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import threading
+from dataclasses import dataclass
+from typing import Hashable
+
+import numpy as np
+import pandas as pd
+
+from src.snapshots import content_version
+
+
+def force_layout(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    num_nodes: int,
+    *,
+    weights: np.ndarray | None = None,
+    iterations: int = 300,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Computes a 2D force-directed layout of an undirected graph, returning an
+    array of shape (num_nodes, 2). The simulation mirrors the defaults of
+    d3-force as used by force-graph.js (many-body repulsion, link springs and
+    velocity decay), so that a layout computed here looks like one which has
+    settled in the browser.
+
+    Repulsion is approximated Barnes-Hut style on a uniform grid: nodes are
+    repelled by the center of mass of every other grid cell and by a bounded
+    sample of the nodes within their own cell. The cost per iteration is thus
+    linear in the number of nodes and edges.
+
+    Edges may be weighted, e.g. by the number of relationships between two
+    clients. The strength of a link is its weight relative to the total weight
+    of the links of its less connected node, which reduces to the default of
+    d3-force for equal weights. Heavily connected nodes thus end up closer
+    together.
+
+    The layout is a function of the graph and the seed only, so that every
+    process computes the same positions for the same graph.
+    """
+
+    rng = np.random.default_rng(seed)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    if num_nodes == 0:
+        return np.empty((0, 2), dtype=np.float64)
+
+    pos = _phyllotaxis(num_nodes)
+
+    if weights is None:
+        weights = np.ones(len(sources))
+    weights = np.asarray(weights, dtype=np.float64)
+    degrees = np.bincount(np.concatenate([sources, targets]), weights=np.tile(weights, 2), minlength=num_nodes)
+    link_strength = weights / np.maximum(np.minimum(degrees[sources], degrees[targets]), 1e-12)
+    link_bias = degrees[sources] / np.maximum(degrees[sources] + degrees[targets], 1e-12)
+
+    velocity = np.zeros_like(pos)
+    alpha = 1.0
+    alpha_decay = 1 - _ALPHA_MIN ** (1 / iterations)
+    for _ in range(iterations):
+        alpha += (0 - alpha) * alpha_decay
+        force = _link_forces(pos, sources, targets, link_strength, link_bias)
+        force += _repulsion_forces(pos, rng)
+        force -= _GRAVITY_STRENGTH * pos
+        velocity = (velocity + alpha * force) * (1 - _VELOCITY_DECAY)
+        pos += velocity
+
+    return pos - pos.mean(axis=0)
+
+
+@dataclass(frozen=True)
+class _Layout:
+    version: str
+    positions: np.ndarray
+
+
+class LayoutCache:
+    """
+    Caches one layout per key, e.g. per network variant. A layout is only
+    recomputed if the network it was computed for has changed. It does not
+    depend on previous layouts, so that all workers serve the same positions
+    for the same version of the network.
+
+    Layouts of different keys are computed concurrently, while concurrent
+    requests for the same key wait for the single computation. If max_size is
+    given, the least recently computed layouts are dropped beyond that many
+    keys.
+    """
+
+    def __init__(self, max_size: int | None = None):
+        self._max_size = max_size
+        self._layouts: dict[Hashable, _Layout] = {}
+        self._build_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        addresses: pd.Index,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        weights: np.ndarray | None = None,
+    ) -> np.ndarray:
+        version = content_version(
+            b"\0".join(a.encode() for a in addresses)
+            + np.asarray(sources, dtype="<i8").tobytes()
+            + np.asarray(targets, dtype="<i8").tobytes()
+            + (b"" if weights is None else np.asarray(weights, dtype="<f8").tobytes())
+        )
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            previous = self._layouts.get(key)
+            if previous is not None and previous.version == version:
+                return previous.positions
+
+            positions = force_layout(sources, targets, len(addresses), weights=weights)
+            with self._lock:
+                self._layouts.pop(key, None)
+                self._layouts[key] = _Layout(version=version, positions=positions)
+                if self._max_size is not None:
+                    for evicted in list(self._layouts)[: -self._max_size or None]:
+                        del self._layouts[evicted]
+                        self._build_locks.pop(evicted, None)
+            return positions
+
+    def clear(self):
+        with self._lock:
+            self._layouts.clear()
+
+
+# Parameters following the defaults of d3-force.
+_ALPHA_MIN = 0.001
+_VELOCITY_DECAY = 0.4
+_LINK_DISTANCE = 30
+_MANY_BODY_STRENGTH = -30
+# Weak pull towards the origin which keeps isolated nodes and components from
+# drifting apart indefinitely.
+_GRAVITY_STRENGTH = 0.01
+# Upper bound for the number of nodes within the same grid cell each node is
+# repelled by exactly.
+_MAX_NEAR_NEIGHBORS = 16
+
+
+def _phyllotaxis(num_nodes: int) -> np.ndarray:
+    # Initial placement as done by d3-force.
+    i = np.arange(num_nodes)
+    radius = 10 * np.sqrt(0.5 + i)
+    angle = i * np.pi * (3 - np.sqrt(5))
+    return np.column_stack([radius * np.cos(angle), radius * np.sin(angle)])
+
+
+def _link_forces(
+    pos: np.ndarray,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    strength: np.ndarray,
+    bias: np.ndarray,
+) -> np.ndarray:
+    force = np.zeros_like(pos)
+    if len(sources) == 0:
+        return force
+    delta = pos[targets] - pos[sources]
+    dist = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 1e-6)
+    scale = ((dist - _LINK_DISTANCE) / dist * strength)[:, None] * delta
+    for dim in range(2):
+        force[:, dim] -= np.bincount(targets, weights=scale[:, dim] * bias, minlength=len(pos))
+        force[:, dim] += np.bincount(sources, weights=scale[:, dim] * (1 - bias), minlength=len(pos))
+    return force
+
+
+def _repulsion_forces(pos: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    num_nodes = len(pos)
+    grid_size = int(np.clip(np.ceil(np.sqrt(num_nodes / 16)), 1, 32))
+    lo = pos.min(axis=0)
+    extent = np.maximum(pos.max(axis=0) - lo, 1e-6)
+    cell_xy = np.minimum((pos - lo) / extent * grid_size, grid_size - 1).astype(np.int64)
+    cell = cell_xy[:, 0] * grid_size + cell_xy[:, 1]
+
+    # Far field: every node is repelled by the center of mass of all other
+    # non-empty cells, approximated by the force acting on the center of mass
+    # of its own cell.
+    mass = np.bincount(cell, minlength=grid_size**2).astype(np.float64)
+    occupied = np.flatnonzero(mass)
+    sums = np.column_stack([np.bincount(cell, weights=pos[:, dim], minlength=grid_size**2) for dim in range(2)])
+    com = sums[occupied] / mass[occupied, None]
+    sq_norm = (com**2).sum(axis=1)
+    dist2 = np.maximum(sq_norm[:, None] + sq_norm[None, :] - 2 * com @ com.T, 1)
+    weight = _MANY_BODY_STRENGTH * mass[occupied][None, :] / dist2
+    np.fill_diagonal(weight, 0)
+    cell_force = np.zeros((grid_size**2, 2))
+    cell_force[occupied] = weight @ com - weight.sum(axis=1)[:, None] * com
+    force = cell_force[cell]
+
+    # Near field: exact repulsion by a bounded number of nodes within the same
+    # cell, scaled up to account for the nodes not sampled.
+    order = np.argsort(cell, kind="stable")
+    counts = np.bincount(cell, minlength=grid_size**2)[cell[order]]
+    starts = np.searchsorted(cell[order], cell[order])
+    rank = np.arange(num_nodes) - starts
+    num_samples = np.minimum(counts - 1, _MAX_NEAR_NEIGHBORS)
+    first = rng.integers(0, np.maximum(counts - 1, 1))
+    xs = pos[order, 0]
+    ys = pos[order, 1]
+    near_x = np.zeros(num_nodes)
+    near_y = np.zeros(num_nodes)
+    for k in range(1, min(_MAX_NEAR_NEIGHBORS, int(counts.max()) - 1) + 1):
+        # Distinct offsets in [1, count - 1] so that no node is paired with
+        # itself.
+        offset = (first + k - 1) % np.maximum(counts - 1, 1) + 1
+        other = starts + (rank + offset) % counts
+        dx = xs[other] - xs
+        dy = ys[other] - ys
+        weight = np.where(num_samples >= k, _MANY_BODY_STRENGTH / np.maximum(dx * dx + dy * dy, 1), 0)
+        near_x += weight * dx
+        near_y += weight * dy
+    scale = np.where(num_samples > 0, (counts - 1) / np.maximum(num_samples, 1), 0)
+    force[order, 0] += near_x * scale
+    force[order, 1] += near_y * scale
+
+    return force
@@ -0,0 +1,482 @@
+"""
+Load tests the dashboard by replaying sessions of concurrent virtual users.
+
+Usage: python -m src.loadtest [--url URL | --workers N ...] [--users N ...]
+                              [--duration S] [--think-time S]
+                              [--toggle-probability P] [--seed N]
+                              [--out FILE]
+
+Every virtual user loads the dashboard like a browser, i.e. / and dash's
+layout and dependencies, and then repeatedly navigates to a random page,
+posting the same /_dash-update-component requests as dash's renderer: the
+page's content, the synchronization of the hide-test-clients widgets and the
+callbacks of all graphs on the page, up to six at a time like a browser.
+Opening the relationships page also loads the forcegraph iframe and its data,
+revalidating them by their ETag. After navigating, the user toggles
+hide-test-clients with the given probability, which reloads all graphs of the
+page. Users wait for an exponentially distributed think time between actions.
+
+Given --url, an already running server is load tested. Otherwise, a gunicorn
+server is started for every given number of workers, configured by the same
+environment variables and gunicorn.conf.py as in production, and every number
+of users is run against it for the given duration. The p50, p95 and p99
+latency per request, labelled like the dashboard's metrics by plot id, and
+the throughput per number of workers and users are reported and written to
+FILE as JSON. Note that a single client process may saturate before a server
+with many workers does; check its CPU usage.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.benchmarks import figure_callback_payloads, percentiles
+
+# Number of concurrent connections per host of common browsers.
+_BROWSER_CONNECTIONS = 6
+_PAGES_CONTENT = "_pages_content"
+_FORCEGRAPH_IFRAME = "forcegraph$iframe"
+
+
+@dataclass
+class Run:
+    workers: int | None
+    users: int
+    duration_s: float
+    # Latencies of successful requests and number of failed requests, by
+    # request.
+    latencies_s: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    page_views: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        num_requests = sum(len(v) for v in self.latencies_s.values())
+        return {
+            "workers": self.workers,
+            "users": self.users,
+            "duration_s": self.duration_s,
+            "requests": num_requests,
+            "errors": sum(self.errors.values()),
+            "page_views": self.page_views,
+            "requests_per_s": num_requests / self.duration_s,
+            "page_views_per_s": self.page_views / self.duration_s,
+            "latencies": {
+                name: {"requests": len(self.latencies_s.get(name, [])), "errors": self.errors.get(name, 0)}
+                | (percentiles(self.latencies_s[name]) if name in self.latencies_s else {})
+                for name in sorted(set(self.latencies_s) | set(self.errors))
+            },
+        }
+
+
+@dataclass(frozen=True)
+class Dashboard:
+    """
+    The callbacks of the dashboard, as listed by /_dash-dependencies.
+    """
+
+    pages: list[str]
+    # Payloads of the graph callbacks by plot id and hide-test-clients value.
+    graphs: dict[bool, dict[str, dict]]
+    callbacks: list[dict]
+
+    def callback(self, output: str) -> dict:
+        return next(c for c in self.callbacks if output in c["output"])
+
+
+class VirtualUser:
+    def __init__(self, url: str, dashboard: Dashboard, run: Run, lock: threading.Lock, rng: random.Random):
+        self._url = url.rstrip("/")
+        self._dashboard = dashboard
+        self._run = run
+        self._lock = lock
+        self._rng = rng
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=_BROWSER_CONNECTIONS))
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=_BROWSER_CONNECTIONS))
+        self._etags: dict[str, str] = {}
+        self._hide_test_clients = rng.random() < 0.5
+
+    def run(self, deadline: float, think_time_s: float, toggle_probability: float):
+        self._think(think_time_s, deadline)
+        self._get("/", "/")
+        self._get("/_dash-layout", "/_dash-layout")
+        self._get("/_dash-dependencies", "/_dash-dependencies")
+        while time.monotonic() < deadline:
+            page = self._rng.choice(self._dashboard.pages)
+            plots, checkboxes, forcegraph = self.navigate(page)
+            self._think(think_time_s, deadline)
+            if time.monotonic() < deadline and self._rng.random() < toggle_probability:
+                self._hide_test_clients = not self._hide_test_clients
+                self.toggle_hide_test_clients(plots, checkboxes, forcegraph)
+                self._think(think_time_s, deadline)
+
+    def navigate(self, page: str) -> tuple[list[str], list[str], bool]:
+        """
+        Navigates to a page, loading its content and all its graphs, and
+        returns the plots and checkboxes found on the page and whether it
+        holds the forcegraph.
+        """
+
+        content = self._post(
+            "page-content",
+            _payload(
+                self._dashboard.callback(f"{_PAGES_CONTENT}.children"),
+                {"pathname": page, "search": ""},
+                changed=["_pages_location.pathname"],
+            ),
+        )
+        self._post(
+            "page-links",
+            _payload(self._dashboard.callback("page-link-"), {"pathname": page}, changed=["url.pathname"]),
+        )
+        layout = (content or {}).get("response", {}).get(_PAGES_CONTENT, {}).get("children")
+        plots = [i["plot"] for i in _component_ids(layout) if isinstance(i, dict) and i.get("type") == "graph"]
+        checkboxes = [
+            i["plot"]
+            for i in _component_ids(layout)
+            if isinstance(i, dict) and i.get("type") == "hide-test-clients-checkbox"
+        ]
+        forcegraph = _FORCEGRAPH_IFRAME in _component_ids(layout)
+        self._post("hide-test-clients", self._sync_payload(checkboxes, plots, triggered=False))
+        self._load(plots, forcegraph)
+        with self._lock:
+            self._run.page_views += 1
+        return plots, checkboxes, forcegraph
+
+    def toggle_hide_test_clients(self, plots: list[str], checkboxes: list[str], forcegraph: bool):
+        self._post("hide-test-clients", self._sync_payload(checkboxes, plots, triggered=True))
+        self._load(plots, forcegraph)
+
+    def _load(self, plots: list[str], forcegraph: bool):
+        # Like dash's renderer, all graph callbacks are posted at once and
+        # limited by the browser's connections.
+        payloads = self._dashboard.graphs[self._hide_test_clients]
+        with ThreadPoolExecutor(_BROWSER_CONNECTIONS) as executor:
+            futures = [executor.submit(self._post, plot, payloads[plot]) for plot in plots if plot in payloads]
+            if forcegraph:
+                futures.append(executor.submit(self._open_forcegraph))
+            for f in futures:
+                f.result()
+
+    def _open_forcegraph(self):
+        response = self._post(
+            "forcegraph",
+            _payload(
+                self._dashboard.callback(f"{_FORCEGRAPH_IFRAME}.src"),
+                {
+                    "hide-test-clients-checkbox": ["hide_test_clients"] if self._hide_test_clients else [],
+                    "forcegraph-level-radio": "identities",
+                },
+            ),
+        )
+        src = (response or {}).get("response", {}).get(_FORCEGRAPH_IFRAME, {}).get("src")
+        if src is None:
+            return
+        self._get(src, "/forcegraph.html")
+        query = src.partition("?")[2]
+        self._get("/forcegraph/data" + (f"?{query}" if query else ""), "forcegraph-data")
+
+    def _sync_payload(self, checkboxes: list[str], plots: list[str], triggered: bool) -> dict:
+        # Inputs and states of the pattern-matching callback are lists of all
+        # matching components on the page.
+        callback = self._dashboard.callback("hide-test-clients-radio-group.value")
+        hide = ["hide_test_clients"] if self._hide_test_clients else []
+        radio = {"id": "hide-test-clients-radio-group", "property": "value"}
+        return {
+            "output": callback["output"],
+            "outputs": [
+                radio,
+                [{"id": {"plot": p, "type": "hide-test-clients-checkbox"}, "property": "value"} for p in checkboxes],
+            ],
+            "inputs": [
+                radio | {"value": "hide" if self._hide_test_clients else "show"},
+                [
+                    {"id": {"plot": p, "type": "hide-test-clients-checkbox"}, "property": "value", "value": hide}
+                    for p in checkboxes
+                ],
+            ],
+            "state": [
+                [
+                    {"id": {"plot": p, "type": "graph"}, "property": "figure", "value": {} if triggered else None}
+                    for p in plots
+                ]
+            ],
+            "changedPropIds": ["hide-test-clients-radio-group.value"] if triggered else [],
+        }
+
+    def _post(self, name: str, payload: dict) -> dict | None:
+        start = time.perf_counter()
+        try:
+            response = self._session.post(f"{self._url}/_dash-update-component", json=payload, timeout=300)
+        except requests.RequestException:
+            self._record(name, None)
+            return None
+        # Callbacks raising PreventUpdate respond with 204.
+        self._record(name, time.perf_counter() - start if response.status_code in (200, 204) else None)
+        return response.json() if response.status_code == 200 else None
+
+    def _get(self, path: str, name: str):
+        # Like a browser, responses with an ETag are revalidated.
+        headers = {"If-None-Match": self._etags[path]} if path in self._etags else {}
+        start = time.perf_counter()
+        try:
+            response = self._session.get(f"{self._url}{path}", headers=headers, timeout=300)
+        except requests.RequestException:
+            self._record(name, None)
+            return
+        self._record(name, time.perf_counter() - start if response.status_code in (200, 304) else None)
+        if "ETag" in response.headers:
+            self._etags[path] = response.headers["ETag"]
+
+    def _record(self, name: str, latency: float | None):
+        with self._lock:
+            if latency is None:
+                self._run.errors[name] += 1
+            else:
+                self._run.latencies_s[name].append(latency)
+
+    def _think(self, think_time_s: float, deadline: float):
+        if think_time_s > 0:
+            time.sleep(max(min(self._rng.expovariate(1 / think_time_s), deadline - time.monotonic()), 0))
+
+
+def _payload(callback: dict, values: dict[str, Any], changed: list[str] | None = None) -> dict:
+    # Values are given by property or, if ambiguous, by component id.
+    inputs = []
+    for i in callback["inputs"]:
+        input_id = json.loads(i["id"]) if i["id"].startswith("{") else i["id"]
+        key = input_id.get("type", "") if isinstance(input_id, dict) else input_id
+        value = values.get(key, values.get(i["property"]))
+        inputs.append({"id": input_id, "property": i["property"], "value": value})
+    outputs = []
+    for o in callback["output"].strip(".").split("..."):
+        output_id, _, prop = o.rpartition(".")
+        outputs.append({"id": json.loads(output_id) if output_id.startswith("{") else output_id, "property": prop})
+    return {
+        "output": callback["output"],
+        "outputs": outputs if callback["output"].startswith("..") else outputs[0],
+        "inputs": inputs,
+        "changedPropIds": changed or [],
+        "state": [
+            {"id": s["id"], "property": s["property"], "value": values.get(s["property"])} for s in callback["state"]
+        ],
+    }
+
+
+def _component_ids(layout: Any) -> Iterator[Any]:
+    if isinstance(layout, list):
+        for child in layout:
+            yield from _component_ids(child)
+    elif isinstance(layout, dict):
+        props = layout.get("props", {})
+        if "id" in props:
+            yield props["id"]
+        yield from _component_ids(props.get("children"))
+
+
+def _links(layout: Any) -> Iterator[str]:
+    if isinstance(layout, list):
+        for child in layout:
+            yield from _links(child)
+    elif isinstance(layout, dict):
+        props = layout.get("props", {})
+        if layout.get("type") == "Link" and "href" in props:
+            yield props["href"]
+        yield from _links(props.get("children"))
+
+
+def discover(url: str) -> Dashboard:
+    """
+    Discovers the pages and callbacks of the dashboard served at the given
+    URL.
+    """
+
+    url = url.rstrip("/")
+    layout = requests.get(f"{url}/_dash-layout", timeout=60)
+    layout.raise_for_status()
+    dependencies = requests.get(f"{url}/_dash-dependencies", timeout=60)
+    dependencies.raise_for_status()
+    callbacks = dependencies.json()
+    return Dashboard(
+        pages=sorted(set(_links(layout.json()))),
+        graphs={hide: figure_callback_payloads(callbacks, hide) for hide in (True, False)},
+        callbacks=callbacks,
+    )
+
+
+def load_test(
+    url: str,
+    workers: int | None,
+    users: int,
+    *,
+    duration_s: float,
+    think_time_s: float,
+    toggle_probability: float,
+    seed: int,
+) -> Run:
+    """
+    Runs the given number of virtual users against the dashboard served at
+    the given URL for the given duration.
+    """
+
+    dashboard = discover(url)
+    run = Run(workers=workers, users=users, duration_s=duration_s)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration_s
+    threads = [
+        threading.Thread(
+            target=VirtualUser(url, dashboard, run, lock, random.Random(seed + i)).run,
+            args=(deadline, think_time_s, toggle_probability),
+        )
+        for i in range(users)
+    ]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Requests in flight at the deadline are completed.
+    run.duration_s = time.monotonic() - start
+    return run
+
+
+def start_server(workers: int, startup_timeout_s: float) -> tuple[subprocess.Popen, str]:
+    """
+    Starts the dashboard with gunicorn using the given number of workers and
+    returns the process and its URL once it is healthy.
+    """
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            "gunicorn.conf.py",
+            "--workers",
+            str(workers),
+            "--bind",
+            f"127.0.0.1:{port}",
+            "main:create_app()",
+        ],
+        cwd=Path(__file__).parent.parent,
+        env=os.environ | {"DASHBOARD_NUM_WORKERS": str(workers)},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + startup_timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=5).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    stop_server(process)
+    raise RuntimeError(f"gunicorn did not become healthy within {startup_timeout_s}s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="URL of a running dashboard")
+    target.add_argument("--workers", action="append", type=int, help="gunicorn workers, may be repeated")
+    parser.add_argument("--users", action="append", type=int, help="concurrent virtual users, may be repeated")
+    parser.add_argument("--duration", type=float, default=60, help="duration of every run in seconds")
+    parser.add_argument("--think-time", type=float, default=5, help="mean think time between actions in seconds")
+    parser.add_argument("--toggle-probability", type=float, default=0.3, help="probability to toggle test clients")
+    parser.add_argument("--startup-timeout", type=float, default=600, help="time to wait for gunicorn in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the users' random choices")
+    parser.add_argument("--out", type=Path, default=Path("loadtest-results.json"), help="results file")
+    args = parser.parse_args()
+
+    users = args.users or [1, 4, 16]
+    runs: list[Run] = []
+
+    def run_all(url: str, workers: int | None):
+        for n in users:
+            against = url if workers is None else f"{workers} workers"
+            print(f"Running {n} users against {against} for {args.duration}s", file=sys.stderr)
+            runs.append(
+                load_test(
+                    url,
+                    workers,
+                    n,
+                    duration_s=args.duration,
+                    think_time_s=args.think_time,
+                    toggle_probability=args.toggle_probability,
+                    seed=args.seed,
+                )
+            )
+
+    if args.url is not None:
+        run_all(args.url, None)
+    else:
+        for workers in args.workers or [1, 2, 4]:
+            process, url = start_server(workers, args.startup_timeout)
+            try:
+                run_all(url, workers)
+            finally:
+                stop_server(process)
+
+    summaries = [r.summary() for r in runs]
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "think_time_s": args.think_time,
+        "toggle_probability": args.toggle_probability,
+        "runs": summaries,
+    }
+    args.out.write_text(json.dumps(report, indent=2))
+
+    print(f"\n{'workers':>7} {'users':>5} {'req/s':>7} {'views/s':>7} {'errors':>6}")
+    for s in summaries:
+        print(
+            f"{s['workers'] or '-':>7} {s['users']:5d} {s['requests_per_s']:7.2f} "
+            f"{s['page_views_per_s']:7.2f} {s['errors']:6d}"
+        )
+    for s in summaries:
+        print(f"\n{s['workers'] or '-'} workers, {s['users']} users")
+        print(f"{'requests':>9} {'errors':>6} {'p50 [s]':>8} {'p95 [s]':>8} {'p99 [s]':>8}  request")
+        for name, latency in sorted(s["latencies"].items(), key=lambda kv: kv[1].get("p95_s", 0), reverse=True):
+            if latency["requests"] == 0:
+                print(f"{0:9d} {latency['errors']:6d} {'':>8} {'':>8} {'':>8}  {name}")
+                continue
+            print(
+                f"{latency['requests']:9d} {latency['errors']:6d} {latency['p50_s']:8.3f} "
+                f"{latency['p95_s']:8.3f} {latency['p99_s']:8.3f}  {name}"
+            )
+    print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
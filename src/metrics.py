@@ -0,0 +1,250 @@
+"""
+Prometheus metrics of the dashboard, served at /metrics.
+
+When run by gunicorn, every worker process records its metrics to files in
+the directory given by PROMETHEUS_MULTIPROC_DIR, which is set up in
+gunicorn.conf.py. On every scrape the files of all workers are aggregated,
+so that whichever worker serves /metrics reports the totals across workers.
+See https://prometheus.github.io/client_python/multiprocess/.
+
+Datasets are labelled by the name of the function loading them, e.g.
+messages for queries.messages, and figures by the plot id of the callback
+building them.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+import pandas as pd
+from flask import Flask, Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pyodbc import Connection
+
+from src import tracing
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# 1 KiB to 256 MiB.
+_SIZE_BUCKETS = tuple(2**10 * 4**i for i in range(10))
+
+QUERY_DURATION = Histogram(
+    "dashboard_query_duration_seconds",
+    "Time spent executing SQL queries and fetching their results, per dataset.",
+    ["dataset"],
+    buckets=_DURATION_BUCKETS,
+)
+QUERY_ROWS = Counter(
+    "dashboard_query_rows",
+    "Number of rows fetched from the database, per dataset.",
+    ["dataset"],
+)
+QUERY_BYTES = Counter(
+    "dashboard_query_bytes",
+    "Estimated in-memory size of the rows fetched from the database, per dataset.",
+    ["dataset"],
+)
+PANDAS_DURATION = Histogram(
+    "dashboard_pandas_duration_seconds",
+    "Time spent processing the fetched rows, per dataset.",
+    ["dataset"],
+    buckets=_DURATION_BUCKETS,
+)
+FIGURE_BUILD_DURATION = Histogram(
+    "dashboard_figure_build_duration_seconds",
+    "Time spent building figures, per plot.",
+    ["plot"],
+    buckets=_DURATION_BUCKETS,
+)
+CALLBACK_DURATION = Histogram(
+    "dashboard_callback_duration_seconds",
+    "Time spent serving callbacks including serialization, per plot.",
+    ["plot"],
+    buckets=_DURATION_BUCKETS,
+)
+CALLBACK_RESPONSE_SIZE = Histogram(
+    "dashboard_callback_response_bytes",
+    "Size of the serialized callback responses, per plot.",
+    ["plot"],
+    buckets=_SIZE_BUCKETS,
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "dashboard_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool.",
+    buckets=_DURATION_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "dashboard_cache_requests",
+    "Number of cache lookups by cache and result, either hit or miss.",
+    ["cache", "result"],
+)
+
+
+@dataclass
+class _DatasetFrame:
+    name: str
+    # Time spent in SQL queries and nested datasets, which is not counted as
+    # pandas processing time.
+    excluded: float = 0.0
+
+
+_datasets: ContextVar[tuple[_DatasetFrame, ...]] = ContextVar("datasets", default=())
+
+
+def dataset(func: F) -> F:
+    """
+    Decorates a function loading a dataset from the database, recording the
+    time spent processing the fetched rows. Queries have to be run by
+    read_sql_query to be accounted for.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        frame = _DatasetFrame(func.__qualname__)
+        token = _datasets.set(_datasets.get() + (frame,))
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - started_at
+            _datasets.reset(token)
+            self_duration = max(duration - frame.excluded, 0)
+            PANDAS_DURATION.labels(frame.name).observe(self_duration)
+            tracing.add_span("pandas", started_at, duration, self_duration, dataset=frame.name)
+            parents = _datasets.get()
+            if len(parents) > 0:
+                parents[-1].excluded += duration
+
+    return wrapper  # type: ignore[return-value]
+
+
+def read_sql_query(query: str, cnxn: Connection, params: list | None = None) -> pd.DataFrame:
+    """
+    Runs pd.read_sql_query, recording its duration and the size of its result
+    for the dataset being loaded.
+    """
+
+    started_at = time.perf_counter()
+    df = pd.read_sql_query(query, cnxn, params=params)
+    duration = time.perf_counter() - started_at
+
+    frames = _datasets.get()
+    name = frames[-1].name if len(frames) > 0 else "unknown"
+    if len(frames) > 0:
+        frames[-1].excluded += duration
+    QUERY_DURATION.labels(name).observe(duration)
+    QUERY_ROWS.labels(name).inc(len(df))
+    QUERY_BYTES.labels(name).inc(_estimated_size(df))
+    tracing.add_span("db", started_at, duration, dataset=name, operation="query")
+    return df
+
+
+def figure(func: F) -> F:
+    """
+    Decorates a function building a figure, recording its duration. Within a
+    callback, the figure is labelled by the callback's plot id, otherwise by
+    the function's name.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - started_at
+            plot = g.get("callback_id") if has_request_context() else None
+            FIGURE_BUILD_DURATION.labels(plot or func.__name__).observe(duration)
+            tracing.add_span("plot", started_at, duration, figure=func.__name__)
+
+    return wrapper  # type: ignore[return-value]
+
+
+@contextmanager
+def pool_checkout():
+    started_at = time.perf_counter()
+    yield
+    duration = time.perf_counter() - started_at
+    POOL_CHECKOUT_WAIT.observe(duration)
+    tracing.add_span("db", started_at, duration, operation="pool-checkout")
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def init_app(server: Flask, paths: dict[str, str]):
+    """
+    Serves the metrics at /metrics and records the duration and response size
+    of dash callbacks and of the given additional paths, labelled by plot id.
+    """
+
+    server.add_url_rule("/metrics", view_func=_serve_metrics)
+
+    @server.before_request
+    def before_request():
+        if request.path == "/_dash-update-component":
+            g.callback_id = _callback_id(request.get_json(silent=True) or {})
+        elif request.path in paths:
+            g.callback_id = paths[request.path]
+        else:
+            return
+        g.callback_started_at = time.perf_counter()
+
+    @server.after_request
+    def after_request(response: Response) -> Response:
+        if "callback_started_at" in g:
+            CALLBACK_DURATION.labels(g.callback_id).observe(time.perf_counter() - g.callback_started_at)
+            if response.content_length is not None:
+                CALLBACK_RESPONSE_SIZE.labels(g.callback_id).observe(response.content_length)
+        return response
+
+
+def _serve_metrics() -> Response:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def _callback_id(payload: dict) -> str:
+    # Graphs are identified by their plot id and other single outputs by their
+    # component id. Callbacks with multiple outputs, whose number may vary by
+    # page, are identified by their output specification, which is fixed.
+    outputs = payload.get("outputs")
+    if isinstance(outputs, dict):
+        output_id = outputs.get("id")
+        if isinstance(output_id, dict) and "plot" in output_id:
+            return str(output_id["plot"])
+        if isinstance(output_id, str):
+            return output_id
+    return str(payload.get("output", "unknown"))
+
+
+# Number of rows the size of large results is estimated from.
+_SIZE_SAMPLE_ROWS = 1000
+
+
+def _estimated_size(df: pd.DataFrame) -> int:
+    # The deep memory usage of string columns is linear in the number of rows
+    # and too slow to compute for every large result. It is thus extrapolated
+    # from evenly spaced rows.
+    if len(df) <= _SIZE_SAMPLE_ROWS:
+        return int(df.memory_usage(index=False, deep=True).sum())
+    sample = df.iloc[:: len(df) // _SIZE_SAMPLE_ROWS]
+    return int(sample.memory_usage(index=False, deep=True).sum() * len(df) / len(sample))
@@ -0,0 +1,17 @@
+import pyodbc
+
+from src import config
+
+
+def make_cnxn(readonly: bool = True) -> pyodbc.Connection:
+    cfg = config.get()
+    return pyodbc.connect(
+        f"SERVER={cfg.MSSQL_HOSTNAME},{cfg.MSSQL_PORT};"
+        f"UID={cfg.MSSQL_USER};"
+        f"PWD={cfg.MSSQL_PASSWORD.get_secret_value()};"
+        f"DATABASE={cfg.MSSQL_DB};"
+        "Driver=ODBC Driver 18 for SQL Server;"
+        f"TargetEncryptConnection={"yes" if cfg.MSSQL_TARGET_ENCRYPT_CONNECTION else "no"};"
+        f"TrustServerCertificate={"yes" if cfg.MSSQL_TRUST_SERVER_CERTIFICATE else "no"};",
+        readonly=readonly,
+    )
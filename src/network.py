@@ -1,23 +1,441 @@
-import networkx as nx
+import base64
+from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+import numpy as np
 import pandas as pd
 from pyodbc import Connection
 
-from src import bb_client_type_from_id, is_test_client
+from src import bb_client_type_from_id, is_test_client, lazy_import, metrics
+from src.snapshots import content_version
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+    from src import plotly_plots as plots
+else:
+    # Only needed for the colors of client types, which don't justify
+    # importing plotly express at startup.
+    plots = lazy_import("src.plotly_plots")
+
+
+@dataclass(frozen=True)
+class RelNetwork:
+    """
+    Undirected network of identities (nodes) and their relationships (edges).
+
+    Node and edge attributes are stored column-wise in arrays, with node
+    attributes aligned to 'addresses' and edge attributes aligned to
+    'sources'/'targets'. Adjacency is stored in compressed sparse row (CSR)
+    form: the neighbors of node i are indices[indptr[i]:indptr[i+1]], the
+    edges connecting them edge_ids[indptr[i]:indptr[i+1]].
+    """
+
+    # Node attributes
+    addresses: pd.Index
+    client_ids: pd.Categorical
+    clients: pd.Categorical
+    client_types: pd.Categorical
+
+    # Edge attributes
+    sources: np.ndarray
+    targets: np.ndarray
+    num_messages: np.ndarray
+
+    # Adjacency
+    indptr: np.ndarray
+    indices: np.ndarray
+    edge_ids: np.ndarray
+
+    @classmethod
+    def from_edges(
+        cls,
+        nodes: pd.DataFrame,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        num_messages: np.ndarray,
+    ) -> "RelNetwork":
+        """
+        Builds a network from a dataframe of nodes, indexed by address, with
+        the columns 'ClientId', 'Client' and 'ClientType', as well as edges
+        given as pairs of node indices. Parallel edges between the same pair of
+        nodes are merged, summing up their number of messages.
+        """
+
+        lo = np.minimum(sources, targets)
+        hi = np.maximum(sources, targets)
+        edges = (
+            pd.DataFrame({"lo": lo, "hi": hi, "NumMessages": num_messages})
+            .groupby(["lo", "hi"], sort=False, as_index=False)["NumMessages"]
+            .sum()
+        )
+        sources = edges["lo"].to_numpy(dtype=np.int32)
+        targets = edges["hi"].to_numpy(dtype=np.int32)
+
+        num_nodes = len(nodes)
+        endpoints = np.concatenate([sources, targets])
+        order = np.argsort(endpoints, kind="stable")
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(endpoints, minlength=num_nodes), out=indptr[1:])
+        indices = np.concatenate([targets, sources])[order]
+        edge_ids = np.tile(np.arange(len(sources), dtype=np.int32), 2)[order]
+
+        return cls(
+            addresses=nodes.index,
+            client_ids=pd.Categorical(nodes["ClientId"]),
+            clients=pd.Categorical(nodes["Client"]),
+            client_types=pd.Categorical(nodes["ClientType"]),
+            sources=sources,
+            targets=targets,
+            num_messages=edges["NumMessages"].to_numpy(dtype=np.int64),
+            indptr=indptr,
+            indices=indices,
+            edge_ids=edge_ids,
+        )
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.addresses)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.sources)
+
+    @cached_property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    @cached_property
+    def version(self) -> str:
+        """
+        Identifies the network's nodes, edges and their attributes.
+        """
+
+        return content_version(
+            "\0".join(self.addresses).encode()
+            + "\0".join(self.clients.astype(str)).encode()
+            + self.sources.astype("<i4").tobytes()
+            + self.targets.astype("<i4").tobytes()
+            + self.num_messages.astype("<i8").tobytes()
+        )
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node] : self.indptr[node + 1]]
+
+    def degree_order(self) -> np.ndarray:
+        """
+        Returns node indices sorted by degree (descending). Nodes of equal
+        degree keep their relative order.
+        """
+
+        return np.argsort(-self.degrees, kind="stable")
+
+    def neighborhood(self, nodes: np.ndarray, radius: int) -> np.ndarray:
+        """
+        Returns the sorted indices of all nodes within the given number of hops
+        of any of the given nodes, including the nodes themselves.
+        """
+
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        frontier = np.unique(nodes)
+        visited[frontier] = True
+        for _ in range(radius):
+            if len(frontier) == 0:
+                break
+            adjacent = self.indices[_ranges(self.indptr[frontier], self.indptr[frontier + 1])]
+            frontier = np.unique(adjacent[~visited[adjacent]])
+            visited[frontier] = True
+        return np.flatnonzero(visited)
+
+    def subnetwork(self, nodes: np.ndarray) -> "RelNetwork":
+        """
+        Returns the subnetwork of the given nodes and all edges between them.
+        Only the adjacency of the given nodes is visited, so that the cost does
+        not depend on the size of the whole network.
+        """
+
+        nodes = np.unique(nodes)
+        new_index = np.full(self.num_nodes, -1, dtype=np.int32)
+        new_index[nodes] = np.arange(len(nodes), dtype=np.int32)
+        edges = np.unique(self.edge_ids[_ranges(self.indptr[nodes], self.indptr[nodes + 1])])
+        edges = edges[(new_index[self.sources[edges]] >= 0) & (new_index[self.targets[edges]] >= 0)]
 
-from .plotly_plots import client_type_colmap
+        node_df = pd.DataFrame(
+            {
+                "ClientId": self.client_ids[nodes].remove_unused_categories(),
+                "Client": self.clients[nodes].remove_unused_categories(),
+                "ClientType": self.client_types[nodes],
+            },
+            index=self.addresses[nodes],
+        )
+        return RelNetwork.from_edges(
+            node_df,
+            new_index[self.sources[edges]],
+            new_index[self.targets[edges]],
+            self.num_messages[edges],
+        )
 
+    def to_networkx(self) -> "nx.Graph":
+        """
+        Exports the network as networkx graph for analysis. Nodes are keyed by
+        address and carry the attributes 'Client' and 'ClientType', edges carry
+        the attribute 'NumMessages'.
+        """
 
+        # networkx is only required for analysis and thus imported on demand.
+        import networkx as nx  # pylint: disable=import-outside-toplevel
+
+        net = nx.Graph()
+        net.add_nodes_from(
+            (address, {"ClientType": ctype, "Client": client})
+            for address, ctype, client in zip(self.addresses, self.client_types, self.clients)
+        )
+        net.add_edges_from(
+            (self.addresses[a], self.addresses[b], {"NumMessages": int(num)})
+            for a, b, num in zip(self.sources, self.targets, self.num_messages)
+        )
+        return net
+
+
+@dataclass(frozen=True)
+class ClientNetwork:
+    """
+    Relationship network aggregated to one node per client. Relationships
+    between identities of the same client are counted per client instead of
+    being represented as edges.
+    """
+
+    # Node attributes
+    client_ids: pd.Index
+    clients: np.ndarray
+    client_types: np.ndarray
+    num_identities: np.ndarray
+    num_internal_relationships: np.ndarray
+    num_internal_messages: np.ndarray
+
+    # Edge attributes
+    sources: np.ndarray
+    targets: np.ndarray
+    num_relationships: np.ndarray
+    num_messages: np.ndarray
+
+
+def aggregate_by_client(rel_network: RelNetwork) -> ClientNetwork:
+    """
+    Collapses the identities of the network into one node per ClientId. Edges
+    between clients carry the number of relationships and messages between
+    their identities. Identities without ClientId are omitted.
+    """
+
+    client_ids = rel_network.client_ids
+    codes = client_ids.codes
+    num_clients = len(client_ids.categories)
+
+    has_client = codes >= 0
+    clients = pd.Series(np.asarray(rel_network.clients)[has_client]).groupby(codes[has_client]).first()
+    client_types = pd.Series(np.asarray(rel_network.client_types)[has_client]).groupby(codes[has_client]).first()
+
+    source_codes = codes[rel_network.sources]
+    target_codes = codes[rel_network.targets]
+    valid = (source_codes >= 0) & (target_codes >= 0)
+    internal = valid & (source_codes == target_codes)
+    external = valid & (source_codes != target_codes)
+
+    edges = (
+        pd.DataFrame(
+            {
+                "Source": np.minimum(source_codes, target_codes)[external],
+                "Target": np.maximum(source_codes, target_codes)[external],
+                "NumMessages": rel_network.num_messages[external],
+            }
+        )
+        .groupby(["Source", "Target"], as_index=False)
+        .agg(NumRelationships=("NumMessages", "size"), NumMessages=("NumMessages", "sum"))
+    )
+
+    return ClientNetwork(
+        client_ids=pd.Index(client_ids.categories),
+        clients=clients.reindex(range(num_clients)).to_numpy(),
+        client_types=client_types.reindex(range(num_clients)).to_numpy(),
+        num_identities=np.bincount(codes[has_client], minlength=num_clients),
+        num_internal_relationships=np.bincount(source_codes[internal], minlength=num_clients),
+        num_internal_messages=np.bincount(
+            source_codes[internal], weights=rel_network.num_messages[internal], minlength=num_clients
+        ).astype(np.int64),
+        sources=edges["Source"].to_numpy(dtype=np.int32),
+        targets=edges["Target"].to_numpy(dtype=np.int32),
+        num_relationships=edges["NumRelationships"].to_numpy(dtype=np.int64),
+        num_messages=edges["NumMessages"].to_numpy(dtype=np.int64),
+    )
+
+
+def ego_network(
+    rel_network: RelNetwork,
+    addresses: list[str] | None = None,
+    client_id: str | None = None,
+    radius: int = 1,
+) -> RelNetwork | None:
+    """
+    Returns the subnetwork of all identities within the given number of hops
+    of the given addresses or of the identities of the given client, together
+    with all relationships between them. Returns None if none of the
+    identities are part of the network.
+    """
+
+    seeds: np.ndarray = np.empty(0, dtype=np.int64)
+    if addresses is not None:
+        seeds = rel_network.addresses.get_indexer(addresses)
+        seeds = seeds[seeds >= 0]
+    if client_id is not None:
+        seeds = np.concatenate([seeds, np.flatnonzero(np.asarray(rel_network.client_ids == client_id))])
+    if len(seeds) == 0:
+        return None
+    return rel_network.subnetwork(rel_network.neighborhood(seeds, radius))
+
+
+@dataclass(frozen=True)
+class NetworkStatistics:
+    """
+    Statistics of a relationship network. Each attribute is a dataframe with
+    the columns listed below.
+
+    component_sizes, one row per connected component:
+    - NumIdentities
+
+    hubs, identities with the most peers in descending order:
+    - Address
+    - Client
+    - ClientType: category (ordered)
+    - NumPeers
+    - NumMessages
+
+    relationships_between_client_types, one row per unordered pair of client
+    types with ClientType1 <= ClientType2:
+    - ClientType1: category (ordered)
+    - ClientType2: category (ordered)
+    - NumRelationships
+    - NumMessages
+
+    degree_distribution, number of identities per client type and number of
+    peers they have active relationships with:
+    - ClientType: category (ordered)
+    - NumPeers
+    - count
+    """
+
+    component_sizes: pd.DataFrame
+    hubs: pd.DataFrame
+    relationships_between_client_types: pd.DataFrame
+    degree_distribution: pd.DataFrame
+
+
+def network_statistics(rel_network: RelNetwork, num_hubs: int = 20) -> NetworkStatistics:
+    """
+    Computes statistics of the network from its edge list and adjacency.
+    """
+
+    client_types = rel_network.client_types.as_ordered()
+    degrees = rel_network.degrees
+
+    labels = connected_components(rel_network)
+    sizes = np.bincount(labels, minlength=rel_network.num_nodes)
+    component_sizes = pd.DataFrame({"NumIdentities": sizes[sizes > 0]})
+
+    num_messages = np.bincount(
+        np.concatenate([rel_network.sources, rel_network.targets]),
+        weights=np.tile(rel_network.num_messages, 2),
+        minlength=rel_network.num_nodes,
+    ).astype(np.int64)
+    top = rel_network.degree_order()[:num_hubs]
+    hubs = pd.DataFrame(
+        {
+            "Address": rel_network.addresses[top],
+            "Client": rel_network.clients[top],
+            "ClientType": client_types[top],
+            "NumPeers": degrees[top],
+            "NumMessages": num_messages[top],
+        }
+    )
+
+    codes = client_types.codes
+    source_codes = codes[rel_network.sources]
+    target_codes = codes[rel_network.targets]
+    valid = (source_codes >= 0) & (target_codes >= 0)
+    pairs = (
+        pd.DataFrame(
+            {
+                "ClientType1": np.minimum(source_codes, target_codes)[valid],
+                "ClientType2": np.maximum(source_codes, target_codes)[valid],
+                "NumMessages": rel_network.num_messages[valid],
+            }
+        )
+        .groupby(["ClientType1", "ClientType2"], as_index=False)
+        .agg(NumRelationships=("NumMessages", "size"), NumMessages=("NumMessages", "sum"))
+    )
+    for col in ["ClientType1", "ClientType2"]:
+        pairs[col] = pd.Categorical.from_codes(pairs[col], dtype=client_types.dtype)
+
+    degree_distribution = (
+        pd.DataFrame({"ClientType": client_types, "NumPeers": degrees})
+        .groupby(["ClientType", "NumPeers"], as_index=False, observed=True)
+        .size()
+        .rename(columns={"size": "count"})
+    )
+
+    return NetworkStatistics(
+        component_sizes=component_sizes,
+        hubs=hubs,
+        relationships_between_client_types=pairs,
+        degree_distribution=degree_distribution,
+    )
+
+
+def connected_components(rel_network: RelNetwork) -> np.ndarray:
+    """
+    Returns the connected component of each node, labeled by the smallest node
+    index within the component.
+    """
+
+    # Each round hooks the roots of adjacent trees onto the smaller root,
+    # followed by pointer jumping until every node points to its root.
+    labels = np.arange(rel_network.num_nodes)
+    while True:
+        source_labels = labels[rel_network.sources]
+        target_labels = labels[rel_network.targets]
+        differ = source_labels != target_labels
+        if not differ.any():
+            return labels
+        source_labels = source_labels[differ]
+        target_labels = target_labels[differ]
+        lower = np.minimum(source_labels, target_labels)
+        np.minimum.at(labels, source_labels, lower)
+        np.minimum.at(labels, target_labels, lower)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+@metrics.dataset
 def make_rel_network(
     cnxn: Connection,
     hide_test_clients: bool,
-) -> nx.Graph:
+    message_counts: pd.Series | None = None,
+) -> RelNetwork:
     """
-    Returns graph of active relationships as well as isolated nodes.
-    Nodes have the following metadata keys:
-        - 'Client' (Concatenation of ClientId and DisplayName)
-        - 'ClientType'
-    Links have the following metadata keys:
-        - 'NumMessages': Total number of messages exchanged between the peers.
+    Returns network of active relationships as well as isolated nodes.
+    Nodes have the following attributes:
+        - 'client_ids'
+        - 'clients' (Concatenation of ClientId and DisplayName)
+        - 'client_types'
+    Edges have the following attributes:
+        - 'num_messages': Total number of messages exchanged between the peers.
+
+    The number of messages per relationship may be passed as series indexed
+    by RelationshipId, e.g. from a MessageCountRollup, in which case they are
+    not counted by the query.
     """
 
     # Set up network nodes including their client type.
@@ -34,7 +452,7 @@ def make_rel_network(
         LEFT JOIN Devices.OpenIddictApplications AS B
         ON A.ClientId = B.ClientId
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         df = df[~df["ClientId"].map(is_test_client)]
 
@@ -49,77 +467,175 @@ def make_rel_network(
 
     df = df.set_index("Address", verify_integrity=True)
 
-    nodes = [
-        (idx, {"ClientType": ctype, "Client": c})
-        for idx, ctype, c in zip(df.index, df["ClientType"].values, df["Client"].values)
-    ]
-    net = nx.Graph()
-    net.add_nodes_from(nodes)
-
-    # Add edges
-    query = """
-        SELECT A.[From] AS FromAddress,
-            A.[To] AS ToAddress,
-            B.ClientId AS FromClientId,
-            C.ClientId AS ToClientId,
-            D.NumMessages
-        FROM Relationships.Relationships AS A
-        JOIN Devices.Identities AS B
-        ON A.[From] = B.Address
-        JOIN Devices.Identities AS C
-        ON A.[To] = C.Address
-        JOIN (
-            SELECT ri.RelationshipId, count(*) as NumMessages
-            FROM Messages.RecipientInformation ri
-            GROUP BY ri.RelationshipId
-        ) as D
-        ON A.Id = D.RelationshipId
-        WHERE A.Status = 20
-    """
-    df_active_rels = pd.read_sql_query(query, cnxn)
+    # Add edges. Active relationships are selected first, so that only their
+    # messages need to be counted. Relationships without messages are kept.
+    if message_counts is None:
+        query = """
+            WITH ActiveRelationships AS (
+                SELECT Id, [From], [To]
+                FROM Relationships.Relationships
+                WHERE Status = 20
+            )
+            SELECT A.[From] AS FromAddress,
+                A.[To] AS ToAddress,
+                B.ClientId AS FromClientId,
+                C.ClientId AS ToClientId,
+                COALESCE(D.NumMessages, 0) AS NumMessages
+            FROM ActiveRelationships AS A
+            JOIN Devices.Identities AS B
+            ON A.[From] = B.Address
+            JOIN Devices.Identities AS C
+            ON A.[To] = C.Address
+            LEFT JOIN (
+                SELECT ri.RelationshipId, count(*) as NumMessages
+                FROM Messages.RecipientInformation ri
+                WHERE ri.RelationshipId IN (SELECT Id FROM ActiveRelationships)
+                GROUP BY ri.RelationshipId
+            ) as D
+            ON A.Id = D.RelationshipId
+        """
+        df_active_rels = metrics.read_sql_query(query, cnxn)
+    else:
+        query = """
+            SELECT A.Id AS RelationshipId,
+                A.[From] AS FromAddress,
+                A.[To] AS ToAddress,
+                B.ClientId AS FromClientId,
+                C.ClientId AS ToClientId
+            FROM Relationships.Relationships AS A
+            JOIN Devices.Identities AS B
+            ON A.[From] = B.Address
+            JOIN Devices.Identities AS C
+            ON A.[To] = C.Address
+            WHERE A.Status = 20
+        """
+        df_active_rels = metrics.read_sql_query(query, cnxn)
+        df_active_rels["NumMessages"] = (
+            df_active_rels["RelationshipId"].map(message_counts).fillna(0).astype("int64")
+        )
     if hide_test_clients:
         # If either of the peers is a test client, we hide the relationship
         is_test = df_active_rels["FromClientId"].map(is_test_client) | df_active_rels["ToClientId"].map(is_test_client)
         df_active_rels = df_active_rels[~is_test]
 
-    edges = zip(
-        df_active_rels["FromAddress"].values,
-        df_active_rels["ToAddress"].values,
-        [{"NumMessages": num} for num in df_active_rels["NumMessages"]],
+    sources = df.index.get_indexer(df_active_rels["FromAddress"])
+    targets = df.index.get_indexer(df_active_rels["ToAddress"])
+    # Skip relationships of identities created after the nodes were queried.
+    known = (sources >= 0) & (targets >= 0)
+    return RelNetwork.from_edges(
+        df.filter(["ClientId", "Client", "ClientType"]),
+        sources[known],
+        targets[known],
+        df_active_rels["NumMessages"].to_numpy()[known],
     )
-    net.add_edges_from(edges)
-
-    return net
 
 
-def forcegraph_data(rel_network: nx.Graph) -> dict:
+def forcegraph_data(rel_network: RelNetwork, positions: np.ndarray | None = None) -> dict:
     """
     Exports relationship network data compatible with force-graph.js.
+
+    The data is encoded column-wise to keep the payload small for large
+    networks. Repeated strings are dictionary-encoded and numeric columns are
+    serialized as base64-encoded little-endian typed arrays. Node degrees and
+    neighbors are not included, as they are derived from the links
+    client-side. The result has the following keys:
+    - 'addresses': list of node addresses, sorted by degree (descending)
+    - 'clients': list of distinct clients
+    - 'clientTypes': client type of each client
+    - 'clientTypeColors': color of each client type
+    - 'nodeClients': Int32Array, index into 'clients' for each node
+    - 'nodeX', 'nodeY': Float32Array, precomputed position of each node. Only
+      included if positions, aligned with the network's nodes, are passed.
+    - 'linkSources': Int32Array, node index of each link's source
+    - 'linkTargets': Int32Array, node index of each link's target
+    - 'linkNumMessages': Int32Array, number of messages of each link
     """
+
     # Sorting nodes by degree (descending) produces a nice layout where
     # isolated and low-degree nodes are on the outside, surrounding node
     # clusters on the inside.
-    sorted_nodes = sorted(
-        rel_network.nodes(data=True),
-        key=lambda x: rel_network.degree[x[0]],
-        reverse=True,
+    order = rel_network.degree_order()
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    clients = rel_network.clients
+    has_client = clients.codes >= 0
+    client_types = (
+        pd.Series(np.asarray(rel_network.client_types)[has_client])
+        .groupby(clients.codes[has_client])
+        .first()
+        .reindex(range(len(clients.categories)))
     )
-    nodes = [
-        {
-            "Address": _id,
-            "Color": client_type_colmap[data["ClientType"]],
-            "NumPeers": rel_network.degree[_id],
-            "Peers": list(rel_network.neighbors(_id)),
-            **data,
-        }
-        for _id, data in sorted_nodes
-    ]
-    links = [
-        {
-            "source": a,
-            "target": b,
-            **data,
-        }
-        for a, b, data in rel_network.edges(data=True)
-    ]
-    return {"nodes": nodes, "links": links}
+
+    data = {
+        "addresses": rel_network.addresses[order].tolist(),
+        "clients": list(clients.categories),
+        "clientTypes": [str(t) for t in client_types],
+        "clientTypeColors": plots.client_type_colmap,
+        "nodeClients": _b64_int32(clients.codes[order]),
+        "linkSources": _b64_int32(rank[rel_network.sources]),
+        "linkTargets": _b64_int32(rank[rel_network.targets]),
+        "linkNumMessages": _b64_int32(rel_network.num_messages),
+    }
+    if positions is not None:
+        data["nodeX"] = _b64_float32(positions[order, 0])
+        data["nodeY"] = _b64_float32(positions[order, 1])
+    return data
+
+
+def client_network_data(client_network: ClientNetwork, positions: np.ndarray | None = None) -> dict:
+    """
+    Exports client-level network data compatible with force-graph.js, encoded
+    like forcegraph_data. The result has the following keys:
+    - 'level': always 'clients', distinguishing the data from identity-level
+      data
+    - 'clientIds': list of ClientIds, one per node
+    - 'clients': list of client labels, one per node
+    - 'clientTypes': list of client types, one per node
+    - 'clientTypeColors': color of each client type
+    - 'nodeNumIdentities': Int32Array, number of identities of each client
+    - 'nodeNumInternalRelationships': Int32Array, number of relationships
+      between identities of the same client
+    - 'nodeNumInternalMessages': Int32Array, number of messages exchanged
+      within these relationships
+    - 'nodeX', 'nodeY': Float32Array, precomputed position of each node. Only
+      included if positions, aligned with the network's nodes, are passed.
+    - 'linkSources': Int32Array, node index of each link's source
+    - 'linkTargets': Int32Array, node index of each link's target
+    - 'linkNumRelationships': Int32Array, number of relationships of each link
+    - 'linkNumMessages': Int32Array, number of messages of each link
+    """
+
+    data = {
+        "level": "clients",
+        "clientIds": client_network.client_ids.tolist(),
+        "clients": [str(c) for c in client_network.clients],
+        "clientTypes": [str(t) for t in client_network.client_types],
+        "clientTypeColors": plots.client_type_colmap,
+        "nodeNumIdentities": _b64_int32(client_network.num_identities),
+        "nodeNumInternalRelationships": _b64_int32(client_network.num_internal_relationships),
+        "nodeNumInternalMessages": _b64_int32(client_network.num_internal_messages),
+        "linkSources": _b64_int32(client_network.sources),
+        "linkTargets": _b64_int32(client_network.targets),
+        "linkNumRelationships": _b64_int32(client_network.num_relationships),
+        "linkNumMessages": _b64_int32(client_network.num_messages),
+    }
+    if positions is not None:
+        data["nodeX"] = _b64_float32(positions[:, 0])
+        data["nodeY"] = _b64_float32(positions[:, 1])
+    return data
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # Concatenation of np.arange(start, end) for all pairs of starts and ends.
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def _b64_int32(values: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(values, dtype="<i4").tobytes()).decode("ascii")
+
+
+def _b64_float32(values: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
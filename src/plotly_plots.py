@@ -9,7 +9,7 @@ import plotly.graph_objs as go
 import plotly.io as pio
 from plotly.subplots import make_subplots
 
-from src import client_types, int_bucket_label
+from src import client_types, int_bucket_label, metrics
 
 pio.templates[pio.templates.default].layout.font.family = "Work Sans"
 pio.templates[pio.templates.default].layout.hoverlabel.font.family = "Work Sans"
@@ -89,6 +89,7 @@ def no_data() -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_identities_per_client(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -143,6 +144,7 @@ def num_identities_per_client(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_sent_messages_per_client(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -191,6 +193,7 @@ def num_sent_messages_per_client(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_received_messages_per_client(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -239,30 +242,39 @@ def num_received_messages_per_client(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def message_content_size(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
     - ClientType: category (ordered)
-    - MessageSize
+    - MessageSize: lower bound of a bin of 50 B
+    - count
     """
 
     if len(df) == 0:
         return no_data()
 
-    df = df.filter(["ClientType", "MessageSize"])
+    df = df.filter(["ClientType", "MessageSize", "count"])
 
+    bin_width = 50
     p = px.histogram(
         df,
         x="MessageSize",
+        y="count",
+        histfunc="sum",
         color="ClientType",
         facet_col="ClientType",
         log_y=True,
-        labels={"MessageSize": "Message Size [B]"},
+        labels={"MessageSize": "Message Size [B]", "count": "Messages"},
         color_discrete_map=client_type_colmap,
         category_orders={
             "ClientType": df["ClientType"].cat.categories,
         },
     )
+    # Messages are shown in fixed bins of 50 B starting at 0, to which the
+    # query has binned their sizes already. Automatic bins would not align
+    # with them.
+    p.update_traces(xbins={"start": 0, "size": bin_width})
 
     # Somehow labeling of y-axis in hist does not work with labels param in histogram method itself :(
     p.update_layout(yaxis_title_text="Number of Messages")
@@ -274,6 +286,7 @@ def message_content_size(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_devices_per_identity(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -318,6 +331,7 @@ def num_devices_per_identity(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_recipients_per_sender_client_type(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -361,6 +375,7 @@ def num_recipients_per_sender_client_type(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_peers_per_identity(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -411,6 +426,161 @@ def num_peers_per_identity(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
+def network_degree_distribution(df: pd.DataFrame) -> go.Figure:
+    """
+    Accepts a dataframe with the following columns:
+    - ClientType: category (ordered)
+    - NumPeers
+    - count
+    """
+
+    if len(df) == 0:
+        return no_data()
+
+    df = df.filter(["ClientType", "NumPeers", "count"]).rename(columns={"count": "NumIdentities"})
+
+    maxexp = int(max(2, np.floor(np.log10(df["NumPeers"].max())) + 1))
+    bins = list(range(0, 6)) + list(int(x) for x in np.logspace(1, maxexp, num=maxexp))
+    bins = pd.IntervalIndex.from_breaks(bins, closed="left")
+
+    df["NumPeersBucket"] = pd.cut(df["NumPeers"], bins=bins).map(int_bucket_label).astype("category")
+    df = df.groupby(["ClientType", "NumPeersBucket"], observed=False, as_index=False)["NumIdentities"].sum()
+
+    p = px.bar(
+        df,
+        x="NumPeersBucket",
+        y="NumIdentities",
+        color="ClientType",
+        facet_col="ClientType",
+        log_y=True,
+        labels={
+            "NumIdentities": "Number of Identities",
+            "NumPeersBucket": "Number of Peers with Active Relationships",
+            "ClientType": "BB Client Type",
+        },
+        color_discrete_map=client_type_colmap,
+        category_orders={
+            "ClientType": df["ClientType"].cat.categories,
+        },
+    )
+
+    p.for_each_annotation(lambda a: a.update(text=a.text.split("=")[1]))
+    p.update_layout(
+        showlegend=False,
+    )
+
+    return p
+
+
+@metrics.figure
+def network_component_sizes(df: pd.DataFrame) -> go.Figure:
+    """
+    Accepts a dataframe with the following columns:
+    - NumIdentities
+    """
+
+    if len(df) == 0:
+        return no_data()
+
+    df = df.filter(["NumIdentities"])
+    df = df.value_counts().reset_index().rename(columns={"count": "NumComponents"})
+
+    maxexp = int(max(2, np.floor(np.log10(df["NumIdentities"].max())) + 1))
+    bins = list(range(1, 6)) + list(int(x) for x in np.logspace(1, maxexp, num=maxexp))
+    bins = pd.IntervalIndex.from_breaks(bins, closed="left")
+
+    df["NumIdentitiesBucket"] = pd.cut(df["NumIdentities"], bins=bins).map(int_bucket_label).astype("category")
+    df = df.groupby(["NumIdentitiesBucket"], observed=False, as_index=False)["NumComponents"].sum()
+
+    p = px.bar(
+        df,
+        x="NumIdentitiesBucket",
+        y="NumComponents",
+        log_y=True,
+        labels={
+            "NumComponents": "Number of Connected Components",
+            "NumIdentitiesBucket": "Number of Identities",
+        },
+        color_discrete_sequence=default_color_seq,
+    )
+    return p
+
+
+@metrics.figure
+def network_hubs(df: pd.DataFrame) -> go.Figure:
+    """
+    Accepts a dataframe with the following columns:
+    - Address
+    - Client
+    - ClientType: category (ordered)
+    - NumPeers
+    - NumMessages
+    """
+
+    if len(df) == 0:
+        return no_data()
+
+    df = df.filter(["Address", "Client", "ClientType", "NumPeers", "NumMessages"])
+    df = df.sort_values(by=["NumPeers"], ascending=False)
+
+    p = px.bar(
+        df,
+        x="NumPeers",
+        y="Address",
+        color="ClientType",
+        orientation="h",
+        labels={
+            "NumPeers": "Number of Peers",
+            "NumMessages": "Number of Messages",
+            "ClientType": "BB Client Type",
+            "Client": "BB Client",
+        },
+        hover_data={
+            "Client": True,
+            "NumMessages": True,
+        },
+        color_discrete_map=client_type_colmap,
+        category_orders={"Address": df["Address"]},
+    )
+    return p
+
+
+@metrics.figure
+def relationships_between_client_types(df: pd.DataFrame) -> go.Figure:
+    """
+    Accepts a dataframe with the following columns:
+    - ClientType1: category (ordered)
+    - ClientType2: category (ordered)
+    - NumRelationships
+    - NumMessages
+    """
+
+    if len(df) == 0:
+        return no_data()
+
+    df = df.filter(["ClientType1", "ClientType2", "NumRelationships"])
+    # Relationships are undirected. Mirror the pairs to get a symmetric matrix.
+    mirrored = df.rename(columns={"ClientType1": "ClientType2", "ClientType2": "ClientType1"})
+    df = pd.concat([df, mirrored[mirrored["ClientType1"] != mirrored["ClientType2"]]])
+    df = df.pivot_table(
+        index="ClientType1", columns="ClientType2", values="NumRelationships", aggfunc="sum", observed=True
+    )
+
+    p = px.imshow(
+        df.fillna(0),
+        text_auto=True,
+        labels={
+            "x": "BB Client Type",
+            "y": "BB Client Type",
+            "color": "Number of Relationships",
+        },
+        color_continuous_scale="Blues",
+    )
+    return p
+
+
+@metrics.figure
 def activity_plot(
     df: pd.DataFrame,
     time_col: str,
@@ -420,6 +590,7 @@ def activity_plot(
     Accepts a dataframe with the following columns:
     - [time_col]: datetime64[ns]
     - [split_col]: category (ordered)
+    - count (optional): number of occurrences at the time, defaults to 1
     """
 
     if len(df) == 0:
@@ -431,12 +602,13 @@ def activity_plot(
     #        simple dataframe or faceting support. density_heatmap doesn't let
     #        us specify pretty hover information.
 
-    df = df.filter([time_col, split_col])
+    df = df.filter([time_col, split_col, "count"])
     df[time_col] = df[time_col].dt.normalize()
     df["Weekday"] = pd.Categorical(df[time_col].dt.day_of_week, categories=list(range(0, 7)), ordered=True)
     df["Week"] = pd.Categorical(df[time_col].dt.isocalendar().week, categories=list(range(0, 53)), ordered=True)
     df["Year"] = pd.Categorical(df[time_col].dt.year, ordered=True)
-    df = df.groupby([time_col, split_col, "Weekday", "Week", "Year"], as_index=False, observed=False).size()
+    groups = df.groupby([time_col, split_col, "Weekday", "Week", "Year"], as_index=False, observed=False)
+    df = groups.size() if "count" not in df else groups["count"].sum().rename(columns={"count": "size"})
 
     fig = px.density_heatmap(
         df,
@@ -476,6 +648,7 @@ def activity_plot(
     return fig
 
 
+@metrics.figure
 def relationship_status_distribution(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -504,6 +677,7 @@ def relationship_status_distribution(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def relationship_duration_pending(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -549,6 +723,7 @@ def relationship_duration_pending(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def device_push_channel_type(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -590,6 +765,7 @@ def device_push_channel_type(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_relationship_templates_per_identity(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -636,6 +812,7 @@ def num_relationship_templates_per_identity(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_tokens_per_identity(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -686,6 +863,7 @@ def num_tokens_per_identity(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def token_size(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -724,6 +902,7 @@ def token_size(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_datawallet_modifications_per_identity(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -769,31 +948,34 @@ def num_datawallet_modifications_per_identity(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def size_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
-    - Size
+    - Size: lower bound of a bin of 50 B
     - ClientType: category (ordered)
+    - count
     """
 
     if len(df) == 0:
         return no_data()
 
-    df = df.filter(["Size", "ClientType"])
+    df = df.filter(["Size", "ClientType", "count"])
 
     # FUTURE: Payloadkategorie innerhalb der Balken anzeigen
     bin_width = 50
-    num_bins = math.ceil((df["Size"].max() - df["Size"].min()) / bin_width)
     p = px.histogram(
         df,
         x="Size",
+        y="count",
+        histfunc="sum",
         color="ClientType",
         facet_col="ClientType",
         log_y=True,
-        nbins=num_bins,
         labels={
             "Size": "Size [B]",
             "ClientType": "BB Client Type",
+            "count": "Datawallet Modifications",
         },
         color_discrete_map=client_type_colmap,
         category_orders={
@@ -801,6 +983,9 @@ def size_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
         },
     )
 
+    # Sizes are binned by the query already.
+    p.update_traces(xbins={"start": 0, "size": bin_width})
+
     p.for_each_annotation(lambda a: a.update(text=a.text.split("=")[1]))
     p.update_layout(
         showlegend=False,
@@ -810,6 +995,7 @@ def size_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def type_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -848,6 +1034,7 @@ def type_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def collection_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -886,6 +1073,7 @@ def collection_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def payload_category_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -925,6 +1113,7 @@ def payload_category_of_datawallet_modifications(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def type_of_external_events(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -964,6 +1153,7 @@ def type_of_external_events(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_external_events_per_sync_run(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -1007,6 +1197,7 @@ def num_external_events_per_sync_run(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def size_of_relationship_templates(df: pd.DataFrame):
     """
     Accepts a dataframe with the following columns:
@@ -1047,6 +1238,7 @@ def size_of_relationship_templates(df: pd.DataFrame):
     return p
 
 
+@metrics.figure
 def size_of_file_contents(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -1081,6 +1273,7 @@ def size_of_file_contents(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_max_rel_templ_allocations(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -1142,6 +1335,7 @@ def num_max_rel_templ_allocations(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def num_files_per_identity(df: pd.DataFrame) -> go.Figure:
     """
     Accepts dataframe with the following columns:
@@ -1185,6 +1379,7 @@ def num_files_per_identity(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def rlt_time_until_first_usage(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -1247,6 +1442,7 @@ def rlt_time_until_first_usage(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def rlt_validity_period(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
@@ -1292,6 +1488,7 @@ def rlt_validity_period(df: pd.DataFrame) -> go.Figure:
     return p
 
 
+@metrics.figure
 def timeline(
     df: pd.DataFrame,
     events_col: str,
@@ -1305,6 +1502,7 @@ def timeline(
     Accepts a dataframe with the following columns:
     - [events_col]: category
     - [time_col]: datetime64[ns]
+    - count (optional): number of occurrences at the time, defaults to 1
 
     The order of events in the plot's legend and hoverinfo is determined by the
     order of categories in the event column categorical.
@@ -1341,14 +1539,15 @@ def timeline(
     if len(df) == 0:
         return no_data()
 
-    df = df.filter([events_col, time_col])
+    df = df.filter([events_col, time_col, "count"])
 
     df["year"] = df[time_col].dt.year
     df["date-noyear"] = pd.Categorical(
         df[time_col].dt.strftime("%B %-d"),
         categories=dates_without_year(),
     )
-    df = df.groupby([events_col, "date-noyear", "year"], as_index=False, observed=True).size()
+    groups = df.groupby([events_col, "date-noyear", "year"], as_index=False, observed=True)
+    df = groups.size() if "count" not in df else groups["count"].sum().rename(columns={"count": "size"})
 
     unique_years = sorted(df["year"].unique())
     fig = make_subplots(
@@ -1446,6 +1645,7 @@ def timeline(
     return fig
 
 
+@metrics.figure
 def ral_reasons(df: pd.DataFrame) -> go.Figure:
     """
     Accepts a dataframe with the following columns:
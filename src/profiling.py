@@ -0,0 +1,98 @@
+"""
+On-demand profiling of single requests, e.g. a callback or /forcegraph/data.
+
+Profiling is only available if DASHBOARD_PROFILING_TOKEN is set. A request
+carrying the token in the X-Dashboard-Profile header, or in the profile
+query parameter, is run under cProfile with tracemalloc tracing its memory
+allocations. The profile is stored as a pstats file in DASHBOARD_PROFILING_DIR
+and can be downloaded from /profiles/<name>, given the token. Its name and the
+peak of the traced memory are returned in the response headers
+X-Dashboard-Profile-Name and X-Dashboard-Profile-Peak-Memory.
+
+Without the token configured, no hooks are installed and requests are not
+affected at all.
+"""
+
+import cProfile
+import hmac
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from flask import Flask, Response, abort, g, request, send_from_directory
+
+from src import config
+
+
+def init_app(server: Flask):
+    cfg = config.get()
+    if cfg.DASHBOARD_PROFILING_TOKEN is None:
+        return
+    token = cfg.DASHBOARD_PROFILING_TOKEN.get_secret_value()
+    directory = cfg.DASHBOARD_PROFILING_DIR or os.path.join(tempfile.gettempdir(), "dashboard-profiles")
+    os.makedirs(directory, exist_ok=True)
+    # tracemalloc traces the whole process, so that only one request is
+    # profiled at a time.
+    lock = threading.Lock()
+
+    def is_authorized() -> bool:
+        given = request.headers.get("X-Dashboard-Profile") or request.args.get("profile")
+        return given is not None and hmac.compare_digest(given.encode(), token.encode())
+
+    @server.before_request
+    def before_request():
+        if not is_authorized() or request.path.startswith("/profiles/"):
+            return
+        # The lock is held from here until after_request or teardown_request
+        # of the same request, which no with block can span.
+        if not lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+            abort(409, "Another request is being profiled.")
+        g.profile = cProfile.Profile()
+        tracemalloc.start()
+        g.profile.enable()
+
+    @server.after_request
+    def after_request(response: Response) -> Response:
+        profile: cProfile.Profile | None = g.pop("profile", None)
+        if profile is None:
+            return response
+        try:
+            profile.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # Callbacks are named by the plot id recorded for the metrics.
+            label = re.sub(r"[^\w-]+", "-", g.get("callback_id") or request.path).strip("-")[:80]
+            now = time.time()
+            timestamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}"
+            name = f"{timestamp}-{os.getpid()}-{label}.pstats"
+            profile.dump_stats(os.path.join(directory, name))
+        except OSError:
+            # The request itself succeeded, so that its response is returned
+            # without the profile rather than replaced by an error.
+            server.logger.exception("Failed to store the profile of %s", request.path)
+            return response
+        finally:
+            lock.release()
+        response.headers["X-Dashboard-Profile-Name"] = name
+        response.headers["X-Dashboard-Profile-Peak-Memory"] = str(peak)
+        return response
+
+    @server.teardown_request
+    def teardown_request(_):
+        # Requests failing before their response is complete skip
+        # after_request.
+        profile: cProfile.Profile | None = g.pop("profile", None)
+        if profile is not None:
+            profile.disable()
+            tracemalloc.stop()
+            lock.release()
+
+    def download(name: str) -> Response:
+        if not is_authorized():
+            abort(403)
+        return send_from_directory(directory, name, mimetype="application/octet-stream", as_attachment=True)
+
+    server.add_url_rule("/profiles/<name>", view_func=download)
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime
 from typing import get_args
 
@@ -14,9 +15,12 @@ from src import (
     bb_relationship_audit_log_reason_map,
     is_test_client,
     DeviceType,
+    metrics,
 )
+from src.rollups import DailyCountRollup
 
 
+@metrics.dataset
 def num_identities_per_client(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -30,14 +34,14 @@ def num_identities_per_client(
     """
 
     query = """
-    SELECT B.ClientId,
+    SELECT A.ClientId,
            B.DisplayName as ClientDisplayName,
            count(A.Address) as NumIdentities
     FROM Devices.Identities A
     LEFT JOIN Devices.OpenIDdictApplications AS B ON B.ClientId = A.ClientId
-    GROUP BY B.ClientId, B.DisplayName
+    GROUP BY A.ClientId, B.DisplayName
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         # Subsetting with an empty mask degenerates a dataframe, removing all
         # column information. This holds true even for empty dataframes where
@@ -55,74 +59,7 @@ def num_identities_per_client(
     return df
 
 
-def num_sent_messages_per_client(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
-    - NumMessages
-    - SenderClientDisplayName: category (ordered)
-    - SenderClientId: category (ordered)
-    - SenderClientType: category (ordered)
-    """
-
-    query = """
-    SELECT B.ClientId AS SenderClientId,
-	       C.DisplayName as SenderClientDisplayName,
-           count(A.Id) AS NumMessages
-    FROM Messages.Messages AS A
-    RIGHT JOIN Devices.Identities AS B ON A.CreatedBy = B.Address
-    LEFT JOIN Devices.OpenIddictApplications as C ON B.ClientId = C.ClientId
-    GROUP BY B.ClientId, C.DisplayName
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["SenderClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["SenderClientDisplayName"] = pd.Categorical(df["SenderClientDisplayName"].fillna("NULL"), ordered=True)
-    df["SenderClientType"] = pd.Categorical(df["SenderClientId"].map(bb_client_type_from_id), ordered=True)
-    df["SenderClientId"] = pd.Categorical(df["SenderClientId"], ordered=True)
-
-    return df
-
-
-def num_received_messages_per_client(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
-    - NumMessages
-    - RecipientClientDisplayName: category (ordered)
-    - RecipientClientId: category (ordered)
-    - RecipientClientType: category (ordered)
-    """
-
-    query = """
-    SELECT B.ClientId AS RecipientClientId,
-           C.DisplayName as RecipientClientDisplayName,
-           count(A.MessageId) as NumMessages
-    FROM Messages.RecipientInformation AS A
-    RIGHT JOIN Devices.Identities AS B
-    ON A.Address = B.Address
-    LEFT JOIN Devices.OpenIddictApplications C
-    ON C.ClientId = B.ClientId
-    GROUP BY B.ClientId, C.DisplayName
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["RecipientClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["RecipientClientDisplayName"] = pd.Categorical(df["RecipientClientDisplayName"].fillna("NULL"), ordered=True)
-    df["RecipientClientType"] = pd.Categorical(df["RecipientClientId"].map(bb_client_type_from_id), ordered=True)
-    df["RecipientClientId"] = pd.Categorical(df["RecipientClientId"], ordered=True)
-
-    return df
-
-
+@metrics.dataset
 def num_devices_per_identity(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -142,7 +79,7 @@ def num_devices_per_identity(
     ON A.IdentityAddress = B.Address
     GROUP BY A.IdentityAddress, B.ClientId
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -153,56 +90,29 @@ def num_devices_per_identity(
     return df
 
 
-def num_recipients_per_sender_client_type(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
-    - NumRecipients
-    - NumSentMessages
-    - SenderClientType: category (ordered)
-    """
-
-    query = """
-    SELECT i.ClientId,
-           count(ri.MessageId) as NumRecipients
-    FROM Messages.RecipientInformation AS ri JOIN Messages.Messages AS m
-    ON m.Id = ri.MessageId
-    JOIN Devices.Identities i
-    ON m.CreatedBy = i.Address
-    GROUP BY ri.MessageId, m.CreatedBy, i.ClientId
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["SenderClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-    df = (
-        df.groupby(["SenderClientType", "NumRecipients"], observed=True, as_index=False)
-        .value_counts()
-        .rename(columns={"count": "NumSentMessages"})
-    )
-    return df
-
-
+@metrics.dataset
 def identity_creations(
     cnxn: Connection,
     hide_test_clients: bool,
+    daily_counts: DailyCountRollup | None = None,
 ) -> pd.DataFrame:
     """
     Returns a dataframe with the following columns:
     - ClientType: category (ordered)
     - CreatedAt: datetime64[ns]
+
+    If daily_counts is given, identities are counted per day, which is given
+    by CreatedAt, in an additional column count.
     """
 
+    if daily_counts is not None:
+        return _daily_counts(cnxn, daily_counts, "identities", hide_test_clients)
+
     query = """
     SELECT i.CreatedAt, i.ClientId
     FROM Devices.Identities i
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -213,51 +123,174 @@ def identity_creations(
     return df
 
 
+@dataclass(frozen=True)
+class Messages:
+    """
+    Aggregates of the messages shown on the Messages page, each accepted by
+    the plot of the same name.
+    """
+
+    num_sent_messages_per_client: pd.DataFrame
+    num_received_messages_per_client: pd.DataFrame
+    num_recipients_per_sender_client_type: pd.DataFrame
+    message_content_size: pd.DataFrame
+    activity_num_sent_messages: pd.DataFrame
+
+
+@metrics.dataset
 def messages(
     cnxn: Connection,
     hide_test_clients: bool,
-) -> pd.DataFrame:
+) -> Messages:
     """
-    Returns a dataframe with the following columns:
+    Returns the aggregates of the Messages page, computed by two queries: one
+    of the messages joined with their number of recipients and one of the
+    recipients by client. The recipients are thus read twice.
+    The dataframes have the following columns:
+
+    num_sent_messages_per_client:
+    - NumMessages
+    - SenderClientDisplayName: category (ordered)
+    - SenderClientId: category (ordered)
+    - SenderClientType: category (ordered)
+
+    num_received_messages_per_client:
+    - NumMessages
+    - RecipientClientDisplayName: category (ordered)
+    - RecipientClientId: category (ordered)
+    - RecipientClientType: category (ordered)
+
+    num_recipients_per_sender_client_type:
+    - NumRecipients
+    - NumSentMessages
+    - SenderClientType: category (ordered)
+
+    message_content_size:
     - ClientType: category (ordered)
-    - CreatedAt: datetime64[ns]
-    - MessageSize
+    - MessageSize: lower bound of a bin of 50 B
+    - count
+
+    activity_num_sent_messages:
+    - ClientType: category (ordered)
+    - CreatedAt: datetime64[ns], the day
+    - count
     """
 
+    # Messages are counted by sender client, day of creation, size and number
+    # of recipients, which the aggregates of sent messages are derived from.
     query = """
-    SELECT m.CreatedAt, i.ClientId, len(m.Body) as MessageSize
+    SELECT i.ClientId,
+           YEAR(m.CreatedAt) as CreatedYear,
+           MONTH(m.CreatedAt) as CreatedMonth,
+           DAY(m.CreatedAt) as CreatedDay,
+           LEN(m.Body) - LEN(m.Body) % 50 as MessageSize,
+           r.NumRecipients,
+           count(*) as NumMessages
     FROM Messages.Messages m
     JOIN Devices.Identities i
     ON i.Address = m.CreatedBy
+    LEFT JOIN
+    (
+        SELECT ri.MessageId,
+               count(*) as NumRecipients
+        FROM Messages.RecipientInformation ri
+        GROUP BY ri.MessageId
+    ) AS r
+    ON r.MessageId = m.Id
+    GROUP BY i.ClientId,
+             YEAR(m.CreatedAt),
+             MONTH(m.CreatedAt),
+             DAY(m.CreatedAt),
+             LEN(m.Body) - LEN(m.Body) % 50,
+             r.NumRecipients
+    """
+    sent = metrics.read_sql_query(query, cnxn)
+    if hide_test_clients:
+        mask = ~sent["ClientId"].map(is_test_client)
+        if len(mask) > 0:
+            sent = sent[mask]
+    sent["ClientType"] = pd.Categorical(sent["ClientId"].map(bb_client_type_from_id), ordered=True)
+
+    # All clients with identities are listed, along with the number of
+    # messages received by them.
+    query = """
+    SELECT B.ClientId,
+           C.DisplayName as ClientDisplayName,
+           count(A.MessageId) as NumMessages
+    FROM Messages.RecipientInformation AS A
+    RIGHT JOIN Devices.Identities AS B
+    ON A.Address = B.Address
+    LEFT JOIN Devices.OpenIddictApplications C
+    ON C.ClientId = B.ClientId
+    GROUP BY B.ClientId, C.DisplayName
     """
-    df = pd.read_sql_query(query, cnxn)
+    clients = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
+        mask = ~clients["ClientId"].map(is_test_client)
         if len(mask) > 0:
-            df = df[mask]
-    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-    df["CreatedAt"] = df["CreatedAt"].astype("datetime64[ns]")
-    return df
+            clients = clients[mask]
+    clients["ClientDisplayName"] = clients["ClientDisplayName"].fillna("NULL")
+    clients["ClientType"] = clients["ClientId"].map(bb_client_type_from_id)
+
+    num_sent = sent.groupby("ClientId", dropna=False)["NumMessages"].sum()
+    per_sender = clients.assign(NumMessages=clients["ClientId"].map(num_sent).fillna(0).astype(int))
+    per_recipient = clients
+
+    def client_categories(df: pd.DataFrame, prefix: str) -> pd.DataFrame:
+        df = df.rename(columns={name: prefix + name for name in ["ClientId", "ClientDisplayName", "ClientType"]})
+        for name in [prefix + "ClientDisplayName", prefix + "ClientType", prefix + "ClientId"]:
+            df[name] = pd.Categorical(df[name], ordered=True)
+        return df
+
+    recipients = sent[sent["NumRecipients"].notna()].rename(columns={"ClientType": "SenderClientType"})
+    recipients["NumRecipients"] = recipients["NumRecipients"].astype(int)
+    recipients = recipients.groupby(["SenderClientType", "NumRecipients"], as_index=False, observed=True)[
+        "NumMessages"
+    ].sum()
+
+    sizes = sent.groupby(["ClientType", "MessageSize"], as_index=False, observed=True)["NumMessages"].sum()
+
+    daily = sent.filter(["ClientType", "NumMessages"])
+    daily["CreatedAt"] = pd.to_datetime(
+        sent[["CreatedYear", "CreatedMonth", "CreatedDay"]].set_axis(["year", "month", "day"], axis=1)
+    )
+    daily = daily.groupby(["CreatedAt", "ClientType"], as_index=False, observed=True)["NumMessages"].sum()
+
+    return Messages(
+        num_sent_messages_per_client=client_categories(per_sender, "Sender"),
+        num_received_messages_per_client=client_categories(per_recipient, "Recipient"),
+        num_recipients_per_sender_client_type=recipients.rename(columns={"NumMessages": "NumSentMessages"}),
+        message_content_size=sizes.rename(columns={"NumMessages": "count"}),
+        activity_num_sent_messages=daily.rename(columns={"NumMessages": "count"}),
+    )
 
 
+@metrics.dataset
 def external_events(
     cnxn: Connection,
     hide_test_clients: bool,
+    daily_counts: DailyCountRollup | None = None,
 ) -> pd.DataFrame:
     """
     Returns a dataframe with the following columns:
     - ClientType: category (ordered)
     - CreatedAt: datetime64[ns]
+
+    If daily_counts is given, external events are counted per day, which is
+    given by CreatedAt, in an additional column count.
     """
 
+    if daily_counts is not None:
+        df = _daily_counts(cnxn, daily_counts, "external_events", hide_test_clients)
+        return df.groupby(["CreatedAt", "ClientType"], as_index=False, observed=True)["count"].sum()
+
     query = """
     SELECT ee.CreatedAt, i.ClientId
     FROM Synchronization.ExternalEvents ee
     JOIN Devices.Identities i
     ON i.Address = ee.Owner
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -268,6 +301,7 @@ def external_events(
     return df
 
 
+@metrics.dataset
 def num_peers_per_identity(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -276,6 +310,8 @@ def num_peers_per_identity(
     Returns a dataframe with the following columns:
     - ClientType: category (ordered)
     - NumPeers
+
+    Peers are counted over relationships of every status.
     """
 
     query = """
@@ -283,25 +319,21 @@ def num_peers_per_identity(
            count(C.Peer) as NumPeers
     FROM
     (
-        (
-            SELECT B.Address AS IdentityAddress,
-                   B.ClientId,
-                   A.[To] AS Peer
-            FROM Relationships.Relationships as A RIGHT JOIN Devices.Identities as B
-            ON A.[From] = B.Address
-        )
+        SELECT B.Address AS IdentityAddress,
+               B.ClientId,
+               A.[To] AS Peer
+        FROM Relationships.Relationships as A RIGHT JOIN Devices.Identities as B
+        ON A.[From] = B.Address
         UNION
-        (
-            SELECT B.Address AS IdentityAddress,
-                   B.ClientId,
-                   A.[From] AS Peer
-            FROM Relationships.Relationships as A RIGHT JOIN Devices.Identities as B
-            ON A.[To] = B.Address
-        )
+        SELECT B.Address AS IdentityAddress,
+               B.ClientId,
+               A.[From] AS Peer
+        FROM Relationships.Relationships as A RIGHT JOIN Devices.Identities as B
+        ON A.[To] = B.Address
     ) AS C
     GROUP BY C.IdentityAddress, C.ClientId
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -312,17 +344,27 @@ def num_peers_per_identity(
     return df
 
 
+@metrics.dataset
 def sync_errors(
     cnxn: Connection,
     hide_test_clients: bool,
+    daily_counts: DailyCountRollup | None = None,
 ) -> pd.DataFrame:
     """
     Returns a dataframe with the following columns:
     - ErrorCode: category
     - CreatedAt: datetime64[ns]
     - ClientType: category (ordered)
+
+    If daily_counts is given, sync errors are counted per day, which is given
+    by CreatedAt, in an additional column count.
     """
 
+    if daily_counts is not None:
+        df = _daily_counts(cnxn, daily_counts, "sync_errors", hide_test_clients)
+        df["ErrorCode"] = pd.Categorical(df["ErrorCode"])
+        return df
+
     query = """
     SELECT se.ErrorCode, sr.CreatedAt, i.ClientId
     FROM Synchronization.SyncErrors se
@@ -331,7 +373,7 @@ def sync_errors(
     JOIN Devices.Identities i
     ON sr.CreatedBy = i.Address
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -344,6 +386,7 @@ def sync_errors(
     return df
 
 
+@metrics.dataset
 def relationships(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -371,7 +414,7 @@ def relationships(
     JOIN Devices.Identities i2
     ON i2.Address = ro.[To]
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["FromClientId"].map(is_test_client) & ~df["ToClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -390,6 +433,7 @@ def relationships(
     return df
 
 
+@metrics.dataset
 def device_push_channel_types(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -411,7 +455,7 @@ def device_push_channel_types(
     JOIN Devices.Identities AS B ON A.IdentityAddress = B.Address) AS X
     LEFT JOIN Devices.PnsRegistrations AS Y ON X.DeviceId = Y.DeviceId
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -427,43 +471,7 @@ def device_push_channel_types(
     return df
 
 
-def num_relationship_templates_per_identity(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
-    - ClientType: category (ordered)
-    - NumTemplates
-    """
-
-    query = """
-    SELECT C.ClientId,
-           count(C.TemplateId) AS NumTemplates
-    FROM
-    (
-        SELECT
-            B.Address AS IdentityAddress,
-            B.ClientId as ClientId,
-            A.Id as TemplateId
-        FROM
-            Relationships.RelationshipTemplates AS A
-        RIGHT OUTER JOIN Devices.Identities AS B
-            ON A.CreatedBy = B.Address
-    ) AS C
-    GROUP BY C.IdentityAddress, C.ClientId
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-
-    return df
-
-
+@metrics.dataset
 def num_tokens_per_identity(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -485,7 +493,7 @@ def num_tokens_per_identity(
     ) AS C
     GROUP BY C.IdentityAddress, C.ClientId
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -496,6 +504,7 @@ def num_tokens_per_identity(
     return df
 
 
+@metrics.dataset
 def token_size(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -514,7 +523,7 @@ def token_size(
     FROM Tokens.Tokens as A INNER JOIN Devices.Identities as B
     ON A.CreatedBy = B.Address
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -524,138 +533,51 @@ def token_size(
     return df
 
 
-def num_datawallet_modifications_per_identity(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
+@dataclass(frozen=True)
+class DatawalletModifications:
     """
-    Returns a dataframe with the following columns:
-    - ClientType: category (ordered)
-    - NumDWM
-    - count
+    Aggregates of the datawallet modifications shown on the Datawallet
+    Modifications page, each accepted by the plot of the same name.
     """
 
-    query = """
-    SELECT count(A.Id) as NumDWM,
-           B.ClientId
-    FROM Synchronization.DatawalletModifications as A RIGHT JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
-    GROUP BY B.Address, B.ClientId
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-    df = df.groupby(["NumDWM", "ClientType"], as_index=False, observed=True).value_counts()
-
-    return df
+    num_datawallet_modifications_per_identity: pd.DataFrame
+    size_of_datawallet_modifications: pd.DataFrame
+    type_of_datawallet_modifications: pd.DataFrame
+    collection_of_datawallet_modifications: pd.DataFrame
+    payload_category_of_datawallet_modifications: pd.DataFrame
 
 
-def size_of_datawallet_modifications(
+@metrics.dataset
+def datawallet_modifications(
     cnxn: Connection,
     hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
-    - Size
-    - ClientType: category (ordered)
+) -> DatawalletModifications:
     """
+    Returns the aggregates of the Datawallet Modifications page, computed from
+    a single scan of the datawallet modifications. The dataframes have the
+    following columns:
 
-    query = """
-    SELECT LEN(A.EncryptedPayload) as Size,
-           B.ClientId
-    FROM Synchronization.DatawalletModifications as A INNER JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-    df["Size"] = df["Size"].fillna(0.0)
-
-    return df
+    num_datawallet_modifications_per_identity:
+    - ClientType: category (ordered)
+    - NumDWM
+    - count
 
+    size_of_datawallet_modifications:
+    - Size: lower bound of a bin of 50 B
+    - ClientType: category (ordered)
+    - count
 
-def type_of_datawallet_modifications(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
+    type_of_datawallet_modifications:
     - Type: category (ordered)
     - ClientType: category (ordered)
     - count
-    """
-
-    query = """
-    SELECT A.Type,
-           B.ClientId
-    FROM Synchronization.DatawalletModifications as A JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df["Type"] = pd.Categorical(
-        df["Type"].map(bb_datawallet_modification_type_map),
-        sorted(bb_datawallet_modification_type_map.values()),
-        ordered=True,
-    )
-    df = df.drop(columns=["ClientId"])
-    df = df.groupby(["Type", "ClientType"], as_index=False, observed=False).value_counts()
-
-    return df
 
-
-def collection_of_datawallet_modifications(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
+    collection_of_datawallet_modifications:
     - Collection: category (ordered)
     - ClientType: category (ordered)
     - count
-    """
 
-    query = """
-    SELECT A.Collection,
-           B.ClientId
-    FROM Synchronization.DatawalletModifications as A JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-    df["Collection"] = pd.Categorical(
-        df["Collection"],
-        sorted(bb_datawallet_modification_collections),
-        ordered=True,
-    )
-    df = df.groupby(["Collection", "ClientType"], as_index=False, observed=False).value_counts()
-
-    return df
-
-
-def payload_category_of_datawallet_modifications(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns a dataframe with the following columns:
+    payload_category_of_datawallet_modifications:
     - PayloadCategory: category (ordered)
     - ClientType: category (ordered)
     - count
@@ -663,43 +585,116 @@ def payload_category_of_datawallet_modifications(
     # TODO: Alle möglichen Kategorien zentral hinterlegen und leere anzeigen.
     # Vgl. External Events.
 
+    # Modifications are counted both per identity and per client and every
+    # combination of their attributes, with sizes in bins of 50 B, which all
+    # aggregates are derived from. Every modification is joined with both
+    # rows of G, which emulates GROUPING SETS within the single scan, as
+    # SQLite lacks them. Identities without modifications are included with
+    # a count of zero.
     query = """
-    SELECT A.PayloadCategory,
-           B.ClientId
-    FROM Synchronization.DatawalletModifications as A RIGHT JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
+    SELECT ByIdentity, Address, ClientId, Type, Collection, PayloadCategory, Size, count(Id) as NumDWM
+    FROM (
+        SELECT G.ByIdentity,
+               CASE WHEN G.ByIdentity = 1 THEN B.Address END as Address,
+               B.ClientId,
+               CASE WHEN G.ByIdentity = 0 THEN A.Type END as Type,
+               CASE WHEN G.ByIdentity = 0 THEN A.Collection END as Collection,
+               CASE WHEN G.ByIdentity = 0 THEN A.PayloadCategory END as PayloadCategory,
+               CASE WHEN G.ByIdentity = 0 THEN LEN(A.EncryptedPayload) - LEN(A.EncryptedPayload) % 50 END as Size,
+               A.Id
+        FROM Synchronization.DatawalletModifications as A
+        RIGHT JOIN Devices.Identities as B
+        ON A.CreatedBy = B.Address
+        CROSS JOIN (SELECT 0 as ByIdentity UNION ALL SELECT 1) as G
+    ) AS C
+    GROUP BY ByIdentity, Address, ClientId, Type, Collection, PayloadCategory, Size
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
             df = df[mask]
     df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
     df = df.drop(columns=["ClientId"])
-    df["PayloadCategory"] = pd.Categorical(df["PayloadCategory"].fillna("Empty"), ordered=True)
-    df = df.groupby(["PayloadCategory", "ClientType"], as_index=False, observed=True).value_counts()
 
-    return df
+    per_identity = df[df["ByIdentity"] == 1].filter(["NumDWM", "ClientType"])
+    per_identity = per_identity.groupby(["NumDWM", "ClientType"], as_index=False, observed=True).value_counts()
+
+    df = df.rename(columns={"NumDWM": "count"})
+    identities = df[df["ByIdentity"] == 1]
+    modifications = df[(df["ByIdentity"] == 0) & (df["count"] > 0)]
 
+    sizes = modifications.filter(["Size", "ClientType", "count"])
+    sizes["Size"] = sizes["Size"].fillna(0.0)
+    sizes = sizes.groupby(["Size", "ClientType"], as_index=False, observed=True)["count"].sum()
 
+    types = modifications.filter(["Type", "ClientType", "count"])
+    types["Type"] = pd.Categorical(
+        types["Type"].map(bb_datawallet_modification_type_map),
+        sorted(bb_datawallet_modification_type_map.values()),
+        ordered=True,
+    )
+    types = types.groupby(["Type", "ClientType"], as_index=False, observed=False)["count"].sum()
+
+    collections = modifications.filter(["Collection", "ClientType", "count"])
+    collections["Collection"] = pd.Categorical(
+        collections["Collection"],
+        sorted(bb_datawallet_modification_collections),
+        ordered=True,
+    )
+    collections = collections.groupby(["Collection", "ClientType"], as_index=False, observed=False)["count"].sum()
+
+    # Identities without modifications are counted as one modification of the
+    # category Empty each.
+    payload_categories = pd.concat([modifications, identities[identities["count"] == 0].assign(count=1)])
+    payload_categories = payload_categories.filter(["PayloadCategory", "ClientType", "count"])
+    payload_categories["PayloadCategory"] = pd.Categorical(
+        payload_categories["PayloadCategory"].fillna("Empty"), ordered=True
+    )
+    payload_categories = payload_categories.groupby(
+        ["PayloadCategory", "ClientType"], as_index=False, observed=True
+    )["count"].sum()
+
+    return DatawalletModifications(
+        num_datawallet_modifications_per_identity=per_identity,
+        size_of_datawallet_modifications=sizes,
+        type_of_datawallet_modifications=types,
+        collection_of_datawallet_modifications=collections,
+        payload_category_of_datawallet_modifications=payload_categories,
+    )
+
+
+@metrics.dataset
 def type_of_external_events(
     cnxn: Connection,
     hide_test_clients: bool,
+    daily_counts: DailyCountRollup | None = None,
 ) -> pd.DataFrame:
     """
     Returns a dataframe with the following columns:
     - Count
     - ClientType: category (ordered)
     - Type: category (ordered)
+
+    If daily_counts is given, the external events are counted from it.
     """
 
+    if daily_counts is not None:
+        df = _daily_counts(cnxn, daily_counts, "external_events", hide_test_clients)
+        df["Type"] = pd.Categorical(
+            df["Type"].map(bb_external_event_type_map),
+            categories=sorted(bb_external_event_type_map.values()),
+            ordered=True,
+        )
+        return df.groupby(["ClientType", "Type"], as_index=False, observed=False)["count"].sum()
+
     query = """
     SELECT A.Type,
            B.ClientId
     FROM Synchronization.ExternalEvents as A JOIN Devices.Identities as B
     ON A.Owner = B.Address
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -716,73 +711,202 @@ def type_of_external_events(
     return df
 
 
-def size_of_relationship_templates(
+@dataclass(frozen=True)
+class RelationshipTemplates:
+    """
+    Aggregates of the relationship templates shown on the Relationship
+    Templates page, each accepted by the plot of the same name.
+    """
+
+    size_of_relationship_templates: pd.DataFrame
+    num_relationship_templates_per_identity: pd.DataFrame
+    num_max_rel_templ_allocations: pd.DataFrame
+    rlt_time_until_first_usage: pd.DataFrame
+    rlt_validity_period: pd.DataFrame
+
+
+@metrics.dataset
+def relationship_templates(
     cnxn: Connection,
     hide_test_clients: bool,
-) -> pd.DataFrame:
+) -> RelationshipTemplates:
     """
-    Returns a dataframe with the following columns:
+    Returns the aggregates of the Relationship Templates page, computed from a
+    single pass over the relationship templates and their allocations. The
+    dataframes have the following columns:
+
+    size_of_relationship_templates:
     - RelationshipTemplateId
     - RelationshipTemplateSize
     - CreatedBy
     - ClientType: category (ordered)
+
+    num_relationship_templates_per_identity:
+    - ClientType: category (ordered)
+    - NumTemplates
+
+    num_max_rel_templ_allocations:
+    - RLTCreatorClientType: category (ordered)
+    - MaxAllocs
+    - NumAllocs
+    - RelRLTAllocs
+
+    rlt_time_until_first_usage:
+    - TimeUntilFirstUsage: timedelta64[us]
+    - RLTCreatorClientType: category (ordered)
+    - ExpiredUnallocated: bool
+
+    rlt_validity_period:
+    - ValidityPeriod: timedelta64[us]
+    - RLTCreatorClientType: category (ordered)
     """
 
+    # One row per template, along with its allocations, and per identity
+    # without templates.
     query = """
-    SELECT LEN(RT.Content) as RelationshipTemplateSize, I.ClientId, RT.CreatedBy, RT.Id as RelationshipTemplateId
-    FROM Relationships.RelationshipTemplates as RT
-    INNER JOIN Devices.Identities as I
-    ON RT.CreatedBy = I.Address
+    SELECT B.Address,
+           B.ClientId,
+           A.Id,
+           A.CreatedAt,
+           A.ExpiresAt,
+           A.MaxNumberOfAllocations,
+           LEN(A.Content) as Size,
+           C.NumAllocations,
+           C.FirstAllocatedAt
+    FROM Devices.Identities as B
+    LEFT JOIN Relationships.RelationshipTemplates as A
+    ON A.CreatedBy = B.Address
+    LEFT JOIN
+    (
+        SELECT RelationshipTemplateId,
+               count(*) as NumAllocations,
+               MIN(AllocatedAt) as FirstAllocatedAt
+        FROM Relationships.RelationshipTemplateAllocations
+        GROUP BY RelationshipTemplateId
+    ) AS C
+    ON C.RelationshipTemplateId = A.Id
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
             df = df[mask]
     df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId"])
-    return df
 
+    per_identity = df.groupby(["Address", "ClientType"], as_index=False, observed=True)["Id"].count()
+    per_identity = per_identity.rename(columns={"Id": "NumTemplates"}).drop(columns=["Address"])
+
+    templates = df[df["Id"].notna()].drop(columns=["ClientId"])
+    templates["NumAllocations"] = templates["NumAllocations"].fillna(0).astype(int)
+    # ExpiresAt contains large timestamps (9999-12-31) which overflow
+    # datetime64[ns]. We thus use us-precision here.
+    templates["CreatedAt"] = templates["CreatedAt"].astype("datetime64[us]")
+    templates["ExpiresAt"] = templates["ExpiresAt"].astype("datetime64[us]").fillna("9999-12-31")
+    templates["FirstAllocatedAt"] = templates["FirstAllocatedAt"].astype("datetime64[us]")
+
+    sizes = pd.DataFrame(
+        {
+            "RelationshipTemplateSize": templates["Size"].fillna(0).astype(int),
+            "ClientType": templates["ClientType"],
+            "CreatedBy": templates["Address"],
+            "RelationshipTemplateId": templates["Id"],
+        }
+    )
+
+    allocations = pd.DataFrame(
+        {
+            "MaxAllocs": templates["MaxNumberOfAllocations"],
+            "NumAllocs": templates["NumAllocations"],
+            "RLTCreatorClientType": templates["ClientType"],
+        }
+    )
+    allocations["RelRLTAllocs"] = allocations["NumAllocs"] / allocations["MaxAllocs"]
+    allocations.loc[allocations["MaxAllocs"].isna(), "RelRLTAllocs"] = pd.NA
+    allocations["MaxAllocs"] = allocations["MaxAllocs"].fillna(0).astype(int)
+
+    first_usage = pd.DataFrame(
+        {
+            "RLTCreatorClientType": templates["ClientType"],
+            "TimeUntilFirstUsage": templates["FirstAllocatedAt"] - templates["CreatedAt"],
+            "ExpiredUnallocated": (templates["ExpiresAt"] <= datetime.now()) & (templates["NumAllocations"] == 0),
+        }
+    )
+
+    validity_periods = pd.DataFrame(
+        {
+            "ValidityPeriod": templates["ExpiresAt"] - templates["CreatedAt"],
+            "RLTCreatorClientType": templates["ClientType"],
+        }
+    )
 
+    return RelationshipTemplates(
+        size_of_relationship_templates=sizes,
+        num_relationship_templates_per_identity=per_identity,
+        num_max_rel_templ_allocations=allocations,
+        rlt_time_until_first_usage=first_usage,
+        rlt_validity_period=validity_periods,
+    )
+
+
+@metrics.dataset
 def num_external_events_per_sync_run(
     cnxn: Connection,
     hide_test_clients: bool,
+    use_event_count: bool = False,
 ) -> pd.DataFrame:
     """
     Returns a dataframe with the following columns:
     - ClientType: category (ordered)
     - NumExternalEvents
     - count
-    """
 
-    query = """
-    SELECT A.Id as SyncRunId,
-           B.Id as ExternalEventId,
-           C.ClientId
-    FROM Synchronization.SyncRuns as A LEFT JOIN Synchronization.ExternalEvents as B
-    ON A.Id = B.SyncRunId
-    JOIN Devices.Identities as C ON A.CreatedBy = C.Address
-    """
-    df = pd.read_sql_query(query, cnxn)
+    If use_event_count is set, the number of external events of a sync run is
+    read from SyncRuns.EventCount instead of counting its external events.
+    """
+
+    # Sync runs are counted by client and number of external events, such
+    # that only the histogram is read instead of a row per external event.
+    if use_event_count:
+        query = """
+        SELECT C.ClientId,
+               A.EventCount as NumExternalEvents,
+               count(*) as count
+        FROM Synchronization.SyncRuns as A
+        JOIN Devices.Identities as C ON A.CreatedBy = C.Address
+        GROUP BY C.ClientId, A.EventCount
+        """
+    else:
+        query = """
+        SELECT C.ClientId,
+               COALESCE(B.NumExternalEvents, 0) as NumExternalEvents,
+               count(*) as count
+        FROM Synchronization.SyncRuns as A
+        LEFT JOIN
+        (
+            SELECT ee.SyncRunId,
+                   count(*) as NumExternalEvents
+            FROM Synchronization.ExternalEvents ee
+            WHERE ee.SyncRunId IS NOT NULL
+            GROUP BY ee.SyncRunId
+        ) AS B
+        ON A.Id = B.SyncRunId
+        JOIN Devices.Identities as C ON A.CreatedBy = C.Address
+        GROUP BY C.ClientId, COALESCE(B.NumExternalEvents, 0)
+        """
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
             df = df[mask]
     df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
     df = df.drop(columns=["ClientId"])
-    df = (
-        df.groupby(["SyncRunId", "ClientType"], as_index=False, observed=True)
-        .count()
-        .rename(columns={"ExternalEventId": "NumExternalEvents"})
-        .drop(columns=["SyncRunId"])
-        .groupby(["ClientType", "NumExternalEvents"], as_index=False, observed=True)
-        .value_counts()
-    )
+    df = df.groupby(["ClientType", "NumExternalEvents"], as_index=False, observed=True)["count"].sum()
 
     return df
 
 
 # FIXME: Unused fn
+@metrics.dataset
 def relationship_templates_usage(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -801,7 +925,7 @@ def relationship_templates_usage(
     ON rt.Id = rta.RelationshipTemplateId
     GROUP BY rta.RelationshipTemplateId, rt.MaxNumberOfAllocations, rt.CreatedBy
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     df["CreationClientType"] = df["CreatedBy"].map(bb_client_type_from_id).astype("category")
     if hide_test_clients:
         mask = ~df["CreatedBy"].map(is_test_client)
@@ -810,6 +934,7 @@ def relationship_templates_usage(
     return df
 
 
+@metrics.dataset
 def size_of_file_contents(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -826,7 +951,7 @@ def size_of_file_contents(
     FROM Files.FileMetadata as A JOIN Devices.Identities as B
     ON A.CreatedBy = B.Address
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -836,52 +961,25 @@ def size_of_file_contents(
     return df
 
 
-def num_max_rel_templ_allocations(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns dataframe with the following columns:
-    - RLTCreatorClientType: category (ordered)
-    - MaxAllocs
-    - NumAllocs
-    - RelRLTAllocs
-    """
-
-    query = """
-    SELECT A.MaxNumberOfAllocations as MaxAllocs,
-           B.ClientId,
-           count(C.RelationshipTemplateId) as NumAllocs
-    FROM Relationships.RelationshipTemplates as A
-    JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
-    LEFT JOIN Relationships.RelationshipTemplateAllocations as C
-    ON A.Id = C.RelationshipTemplateId
-    GROUP BY A.MaxNumberOfAllocations, B.ClientId, A.Id
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-    df["RLTCreatorClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df["RelRLTAllocs"] = df["NumAllocs"] / df["MaxAllocs"]
-    df.loc[df["MaxAllocs"].isna(), "RelRLTAllocs"] = pd.NA
-    df = df.drop(columns=["ClientId"])
-    df["MaxAllocs"] = df["MaxAllocs"].fillna(0).astype(int)
-    return df
-
-
+@metrics.dataset
 def activity_num_created_files(
     cnxn: Connection,
     hide_test_clients: bool,
+    daily_counts: DailyCountRollup | None = None,
 ) -> pd.DataFrame:
     """
     Returns dataframe with the following columns:
     - FileId
     - CreatedAt
     - ClientType
+
+    If daily_counts is given, files are counted per day, which is given by
+    CreatedAt, in a column count replacing FileId.
     """
+
+    if daily_counts is not None:
+        return _daily_counts(cnxn, daily_counts, "files", hide_test_clients)
+
     query = """
     SELECT fm.Id as FileId, fm.CreatedAt, i.ClientId
     FROM Files.Filemetadata as fm
@@ -889,7 +987,7 @@ def activity_num_created_files(
     ON i.Address = fm.CreatedBy
     """
     # TODO: Remove deleted files from df?
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -899,6 +997,7 @@ def activity_num_created_files(
     return df
 
 
+@metrics.dataset
 def num_files_per_identity(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -917,7 +1016,7 @@ def num_files_per_identity(
     ON i.Address = fm.CreatedBy
     GROUP BY i.Address, i.ClientId
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
 
     if hide_test_clients:
         mask = ~df["ClientId"].map(is_test_client)
@@ -929,86 +1028,7 @@ def num_files_per_identity(
     return df
 
 
-def rlt_time_until_first_usage(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns dataframe with the following columns:
-    - TimeUntilFirstUsage: timedelta64[us]
-    - RLTCreatorClientType: category (ordered)
-    - ExpiredUnallocated: bool
-    """
-
-    query = """
-    SELECT A.CreatedAt,
-           A.ExpiresAt,
-           C.ClientId,
-           COUNT(B.AllocatedAt) as NumAllocations,
-           MIN(B.AllocatedAt) as FirstAllocatedAt
-    FROM Relationships.RelationshipTemplates as A
-    LEFT JOIN Relationships.RelationshipTemplateAllocations as B
-    ON A.Id = B.RelationshipTemplateId
-    JOIN Devices.Identities as C
-    ON A.CreatedBy = C.Address
-    GROUP BY A.Id, A.CreatedAt, A.CreatedBy, A.ExpiresAt, C.ClientId
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-
-    # ExpiresAt contains large timestamps (9999-12-31) which overflow
-    # datetime64[ns]. We thus use us-precision here.
-    df["CreatedAt"] = df["CreatedAt"].astype("datetime64[us]")
-    df["ExpiresAt"] = df["ExpiresAt"].astype("datetime64[us]").fillna("9999-12-31")
-    df["FirstAllocatedAt"] = df["FirstAllocatedAt"].astype("datetime64[us]")
-
-    df["RLTCreatorClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df["TimeUntilFirstUsage"] = df["FirstAllocatedAt"] - df["CreatedAt"]
-    df["ExpiredUnallocated"] = (df["ExpiresAt"] <= datetime.now()) & (df["NumAllocations"] == 0)
-    df = df.drop(columns=["ClientId", "FirstAllocatedAt", "CreatedAt", "ExpiresAt", "NumAllocations"])
-
-    return df
-
-
-def rlt_validity_period(
-    cnxn: Connection,
-    hide_test_clients: bool,
-) -> pd.DataFrame:
-    """
-    Returns dataframe with the following columns:
-    - ValidityPeriod: timedelta64[us]
-    - RLTCreatorClientType: category (ordered)
-    """
-
-    query = """
-    SELECT A.CreatedAt,
-           A.ExpiresAt,
-           B.ClientId
-    FROM Relationships.RelationshipTemplates as A
-    JOIN Devices.Identities as B
-    ON A.CreatedBy = B.Address
-    """
-    df = pd.read_sql_query(query, cnxn)
-    if hide_test_clients:
-        mask = ~df["ClientId"].map(is_test_client)
-        if len(mask) > 0:
-            df = df[mask]
-
-    # ExpiresAt contains large timestamps (9999-12-31) which overflow
-    # datetime64[ns]. We thus use us-precision here.
-    df["CreatedAt"] = df["CreatedAt"].astype("datetime64[us]")
-    df["ExpiresAt"] = df["ExpiresAt"].astype("datetime64[us]").fillna("9999-12-31")
-    df["ValidityPeriod"] = df["ExpiresAt"] - df["CreatedAt"]
-
-    df["RLTCreatorClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
-    df = df.drop(columns=["ClientId", "CreatedAt", "ExpiresAt"])
-
-    return df
-
-
+@metrics.dataset
 def ral_reasons(
     cnxn: Connection,
     hide_test_clients: bool,
@@ -1030,7 +1050,7 @@ def ral_reasons(
     LEFT JOIN Devices.Identities AS D
     ON B.[To] = D.Address
     """
-    df = pd.read_sql_query(query, cnxn)
+    df = metrics.read_sql_query(query, cnxn)
     if hide_test_clients:
         mask = ~df["FromClientId"].map(is_test_client) & ~df["ToClientId"].map(is_test_client)
         if len(mask) > 0:
@@ -1040,3 +1060,21 @@ def ral_reasons(
     df = df.drop(columns=["FromClientId", "ToClientId"])
 
     return df
+
+
+def _daily_counts(
+    cnxn: Connection,
+    daily_counts: DailyCountRollup,
+    source: str,
+    hide_test_clients: bool,
+) -> pd.DataFrame:
+    # Returns the daily counts of the given source with the columns CreatedAt,
+    # ClientType, count and the source's categories.
+    df = daily_counts.refresh(cnxn, source)
+    if hide_test_clients:
+        mask = ~df["ClientId"].map(is_test_client)
+        if len(mask) > 0:
+            df = df[mask]
+    df["ClientType"] = pd.Categorical(df["ClientId"].map(bb_client_type_from_id), ordered=True)
+    df = df.drop(columns=["ClientId"]).rename(columns={"Day": "CreatedAt"})
+    return df
@@ -0,0 +1,319 @@
+"""
+Local columnar replica of the backbone tables read by the dashboard, stored
+as Parquet files and queried with DuckDB.
+
+Usage: python -m src.replica [--table NAME ...] [--full]
+                             [--full-sync-hours H]
+
+Syncs the replica in DASHBOARD_REPLICA_DIR from the database configured by
+the same environment variables as the dashboard. Only the columns read by the
+dashboard are extracted, i.e. those listed by src.schema, and payloads
+are replaced by their size, which is all the dashboard reads of them.
+
+Tables which the backbone only ever inserts into, e.g. Messages.Messages, are
+synced incrementally: only rows whose key, e.g. CreatedAt or Id, is greater
+than the greatest key replicated so far are extracted and appended as a new
+Parquet file. Rows committed out of key order and deleted rows are thus
+missed, so that these tables are copied in full once their last full copy is
+older than the given number of hours, like all other tables on every sync.
+Full copies are written to a new directory which then atomically replaces
+the table's previous copy, such that a running dashboard never reads a
+partial copy. The previous copy is removed by the next sync, so that queries
+still reading it complete as long as syncs are further apart than the longest
+query. Syncs must not run concurrently, e.g. run them from a cron job.
+
+If DASHBOARD_REPLICA_DIR is set, the dashboard runs its queries on the
+replica instead of the database. Requires the optional replica dependencies
+(poetry install --with replica).
+"""
+
+import argparse
+import calendar
+import os
+import re
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from src import config, mssql
+from src.schema import TABLES, Table
+
+# Keys of the tables synced incrementally. The backbone only inserts into
+# them and their keys increase with every insert.
+INCREMENTAL_KEYS = {
+    "Messages.Messages": "CreatedAt",
+    "Messages.RecipientInformation": "Id",
+    "Relationships.RelationshipAuditLog": "Id",
+    "Relationships.RelationshipTemplateAllocations": "Id",
+    "Synchronization.DatawalletModifications": "CreatedAt",
+    "Tokens.Tokens": "CreatedAt",
+    "Files.FileMetadata": "CreatedAt",
+}
+
+_CHUNK_ROWS = 100_000
+# Full copies are named like Messages.Messages@20240101T000000.123456789, and
+# the table's directory Messages.Messages is a symlink to its current full copy.
+_COPY_RE = re.compile(r"^(?P<table>.+)@(?P<timestamp>\d{8}T\d{6})(\.\d{9})?$")
+
+
+def _import_duckdb() -> Any:
+    try:
+        import duckdb  # pylint: disable=import-outside-toplevel
+
+        return duckdb
+    except ImportError as e:
+        raise RuntimeError(
+            "The replica requires the optional replica dependencies. "
+            "Install them using 'poetry install --with replica'."
+        ) from e
+
+
+def _is_payload(sql_type: str) -> bool:
+    return "binary" in sql_type
+
+
+def _duckdb_type(sql_type: str) -> str:
+    if _is_payload(sql_type):
+        # Payloads are replicated as their size.
+        return "BIGINT"
+    if sql_type == "datetime2":
+        return "TIMESTAMP"
+    if sql_type == "bigint":
+        return "BIGINT"
+    if "int" in sql_type:
+        return "INTEGER"
+    return "VARCHAR"
+
+
+def _extract_query(table: Table, key: str | None) -> str:
+    columns = ", ".join(
+        f"LEN([{name}]) AS [{name}]" if _is_payload(sql_type) else f"[{name}]"
+        for name, sql_type in table.columns.items()
+    )
+    query = f"SELECT {columns} FROM {table.schema}.{table.name}"
+    if key is not None:
+        query += f" WHERE [{key}] > ?"
+    return query
+
+
+def _write_part(duck: Any, table: Table, df: pd.DataFrame, path: Path):
+    # Columns are cast explicitly, as a chunk's types inferred by pandas
+    # depend on its values, e.g. a column without values is of type object.
+    columns = ", ".join(f'CAST("{name}" AS {_duckdb_type(t)}) AS "{name}"' for name, t in table.columns.items())
+    duck.register("chunk", df.reindex(columns=list(table.columns)))
+    try:
+        tmp = path.with_name(path.name + ".tmp")
+        duck.execute(f"COPY (SELECT {columns} FROM chunk) TO '{tmp}' (FORMAT parquet)")
+        # Files are renamed once complete, as readers pick up all files
+        # ending in .parquet.
+        os.replace(tmp, path)
+    finally:
+        duck.unregister("chunk")
+
+
+def _extract(
+    source: Any,
+    duck: Any,
+    table: Table,
+    directory: Path,
+    *,
+    key: str | None = None,
+    watermark: Any = None,
+) -> int:
+    # Returns the number of rows extracted to new Parquet files in directory.
+    prefix = f"part-{time.time_ns()}"
+    params = None if key is None else [watermark]
+    num_rows = 0
+    num_parts = 0
+    for df in pd.read_sql_query(_extract_query(table, key), source, params=params, chunksize=_CHUNK_ROWS):
+        if len(df) == 0:
+            continue
+        _write_part(duck, table, df, directory / f"{prefix}-{num_parts:05d}.parquet")
+        num_rows += len(df)
+        num_parts += 1
+    if num_parts == 0 and key is None:
+        # Full copies consist of at least one file, so that the table is
+        # readable even if empty.
+        _write_part(duck, table, pd.DataFrame(columns=list(table.columns)), directory / f"{prefix}-00000.parquet")
+    return num_rows
+
+
+def _current_copy(directory: Path, table: Table) -> tuple[Path, float] | None:
+    link = directory / table.qualified_name
+    if not link.is_symlink():
+        return None
+    target = link.parent / os.readlink(link)
+    match = _COPY_RE.match(target.name)
+    if match is None or not target.is_dir():
+        return None
+    created_at = calendar.timegm(time.strptime(match["timestamp"], "%Y%m%dT%H%M%S"))
+    return target, created_at
+
+
+def sync_table(source: Any, duck: Any, directory: Path, table: Table, full_sync_after: float) -> str:
+    """
+    Syncs a table of the replica from the source connection, either fully or
+    incrementally, and returns a description of what has been synced.
+    """
+
+    key = INCREMENTAL_KEYS.get(table.qualified_name)
+    current = _current_copy(directory, table)
+    _remove_previous_copies(directory, table, None if current is None else current[0])
+    if key is not None and current is not None and time.time() - current[1] < full_sync_after:
+        copy = current[0]
+        watermark = duck.execute(f"SELECT max(\"{key}\") FROM read_parquet('{copy}/*.parquet')").fetchone()[0]
+        if watermark is None:
+            # Empty so far, so that all rows are new.
+            watermark = -1 if table.columns[key] != "datetime2" else datetime(1, 1, 1)
+        elif table.columns[key] == "datetime2":
+            # Timestamps are replicated with a precision of microseconds,
+            # which is coarser than SQL Server's datetime2. Rows of the last
+            # microsecond replicated would be extracted again otherwise.
+            watermark += timedelta(microseconds=1)
+        num_rows = _extract(source, duck, table, copy, key=key, watermark=watermark)
+        return f"appended {num_rows} rows"
+
+    now = time.time_ns()
+    timestamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now // 10**9))
+    copy = directory / f"{table.qualified_name}@{timestamp}.{now % 10**9:09d}"
+    copy.mkdir()
+    try:
+        num_rows = _extract(source, duck, table, copy)
+    except BaseException:
+        shutil.rmtree(copy)
+        raise
+    # The symlink is replaced atomically. The previous copy is only removed
+    # by the next sync of the table, as queries running on it list its files
+    # when they start and fail if these are removed before being read.
+    link = directory / table.qualified_name
+    tmp_link = directory / f".{table.qualified_name}.tmp"
+    tmp_link.unlink(missing_ok=True)
+    tmp_link.symlink_to(copy.name, target_is_directory=True)
+    os.replace(tmp_link, link)
+    return f"copied {num_rows} rows"
+
+
+def _remove_previous_copies(directory: Path, table: Table, current: Path | None):
+    # Removes the copies replaced by the current one, as well as those left
+    # behind by failed syncs.
+    for path in directory.iterdir():
+        match = _COPY_RE.match(path.name)
+        if match is None or match["table"] != table.qualified_name or path == current:
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+
+
+def sync(source: Any, directory: Path, tables: list[str], full_sync_after: float):
+    """
+    Syncs the given tables of the replica in directory from the source
+    connection.
+    """
+
+    duckdb = _import_duckdb()
+    directory.mkdir(parents=True, exist_ok=True)
+    duck = duckdb.connect()
+    try:
+        for name in tables:
+            started_at = time.perf_counter()
+            result = sync_table(source, duck, directory, TABLES[name], full_sync_after)
+            print(f"{name}: {result} in {time.perf_counter() - started_at:.1f}s", file=sys.stderr)
+    finally:
+        duck.close()
+
+
+def connect(directory: Path) -> "ReplicaConnection":
+    """
+    Connects to the replica in the given directory. Every table is provided
+    as a view of its Parquet files, such that the dashboard's queries resolve
+    their tables and see newly synced data on every query.
+    """
+
+    duckdb = _import_duckdb()
+    duck = duckdb.connect()
+    for table in TABLES.values():
+        if not (directory / table.qualified_name).is_dir():
+            raise RuntimeError(f"{table.qualified_name} is missing from the replica, sync it using src.replica.")
+        duck.execute(f'CREATE SCHEMA IF NOT EXISTS "{table.schema}"')
+        duck.execute(
+            f'CREATE VIEW "{table.schema}"."{table.name}" AS '
+            f"SELECT * FROM read_parquet('{directory / table.qualified_name}/*.parquet')"
+        )
+    # Payloads are replicated as their size, which is what SQL Server's LEN
+    # returns for them.
+    duck.execute("CREATE MACRO LEN(x) AS x")
+    return ReplicaConnection(duck)
+
+
+class ReplicaConnection:
+    """
+    DuckDB connection translating the T-SQL of the dashboard's queries. Only
+    the parts of the DB-API used by pandas are provided.
+    """
+
+    def __init__(self, duck: Any):
+        self._duck = duck
+
+    def cursor(self) -> "_ReplicaCursor":
+        return _ReplicaCursor(self._duck.cursor())
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        # Queries are read-only and never run in a transaction.
+        pass
+
+    def close(self):
+        self._duck.close()
+
+
+class _ReplicaCursor:
+    def __init__(self, cursor: Any):
+        self._cursor = cursor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def execute(self, sql: str, *params: Any) -> "_ReplicaCursor":
+        self._cursor.execute(_translate(sql), *params)
+        return self
+
+
+# Quoted identifiers, e.g. [From].
+_BRACKETS_RE = re.compile(r"\[(\w+)\]")
+
+
+def _translate(sql: str) -> str:
+    return _BRACKETS_RE.sub(r'"\1"', sql)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", action="append", help="table to sync, may be repeated; defaults to all")
+    parser.add_argument("--full", action="store_true", help="copy all tables in full")
+    parser.add_argument("--full-sync-hours", type=float, default=24, help="hours after which tables are copied in full")
+    args = parser.parse_args()
+
+    cfg = config.init()
+    if cfg.DASHBOARD_REPLICA_DIR is None:
+        parser.error("DASHBOARD_REPLICA_DIR is not set")
+    tables = args.table or list(TABLES)
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+
+    source = mssql.make_cnxn()
+    try:
+        sync(source, Path(cfg.DASHBOARD_REPLICA_DIR), tables, 0 if args.full else args.full_sync_hours * 3600)
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
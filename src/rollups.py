@@ -0,0 +1,221 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from pyodbc import Connection
+
+from src import metrics
+
+
+class MessageCountRollup:
+    """
+    Process-local rollup of the number of messages per relationship.
+
+    Instead of aggregating all of Messages.RecipientInformation on every
+    refresh, only rows added since the previous refresh are aggregated and
+    added to the counts. Rows are tracked by their monotonically increasing Id.
+    As deleted rows and rows committed out of Id order are not picked up
+    incrementally, the rollup is rebuilt from scratch once it is older than
+    the given interval.
+    """
+
+    def __init__(self, full_refresh_interval: float):
+        self._full_refresh_interval = full_refresh_interval
+        self._counts = pd.Series(dtype="int64", name="NumMessages")
+        self._max_id: int | None = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    @metrics.dataset
+    def refresh(self, cnxn: Connection) -> pd.Series:
+        """
+        Brings the rollup up to date and returns the number of messages per
+        relationship, indexed by RelationshipId. Relationships without messages
+        are not included.
+        """
+
+        with self._lock:
+            if self._max_id is None or time.time() - self._built_at >= self._full_refresh_interval:
+                self._counts = pd.Series(dtype="int64", name="NumMessages")
+                self._max_id = None
+                self._built_at = time.time()
+
+            query = """
+                SELECT ri.RelationshipId,
+                       count(*) AS NumMessages,
+                       max(ri.Id) AS MaxId
+                FROM Messages.RecipientInformation AS ri
+                WHERE ri.RelationshipId IS NOT NULL
+                  AND ri.Id > ?
+                GROUP BY ri.RelationshipId
+            """
+            df = metrics.read_sql_query(query, cnxn, params=[-1 if self._max_id is None else self._max_id])
+            if len(df) > 0:
+                delta = df.set_index("RelationshipId")["NumMessages"]
+                self._counts = self._counts.add(delta, fill_value=0).astype("int64")
+                self._max_id = max(self._max_id or -1, int(df["MaxId"].max()))
+            elif self._max_id is None:
+                self._max_id = -1
+            return self._counts
+
+
+@dataclass(frozen=True)
+class _DailyCountSource:
+    # Query counting the rows created at or after the given time per
+    # CreatedYear, CreatedMonth, CreatedDay, ClientId and category columns.
+    query: str
+    categories: tuple[str, ...] = ()
+
+
+# Sources of the daily count rollup by name. Days are grouped by their parts,
+# which SQL Server, DuckDB and SQLite (see synthetic.connect_sqlite) all
+# extract alike, unlike casts to a date.
+DAILY_COUNT_SOURCES = {
+    "identities": _DailyCountSource(
+        """
+        SELECT YEAR(i.CreatedAt) as CreatedYear,
+               MONTH(i.CreatedAt) as CreatedMonth,
+               DAY(i.CreatedAt) as CreatedDay,
+               i.ClientId,
+               count(*) as count
+        FROM Devices.Identities i
+        WHERE i.CreatedAt >= ?
+        GROUP BY YEAR(i.CreatedAt), MONTH(i.CreatedAt), DAY(i.CreatedAt), i.ClientId
+        """
+    ),
+    "external_events": _DailyCountSource(
+        """
+        SELECT YEAR(ee.CreatedAt) as CreatedYear,
+               MONTH(ee.CreatedAt) as CreatedMonth,
+               DAY(ee.CreatedAt) as CreatedDay,
+               i.ClientId,
+               ee.Type,
+               count(*) as count
+        FROM Synchronization.ExternalEvents ee
+        JOIN Devices.Identities i
+        ON i.Address = ee.Owner
+        WHERE ee.CreatedAt >= ?
+        GROUP BY YEAR(ee.CreatedAt), MONTH(ee.CreatedAt), DAY(ee.CreatedAt), i.ClientId, ee.Type
+        """,
+        ("Type",),
+    ),
+    "sync_errors": _DailyCountSource(
+        """
+        SELECT YEAR(sr.CreatedAt) as CreatedYear,
+               MONTH(sr.CreatedAt) as CreatedMonth,
+               DAY(sr.CreatedAt) as CreatedDay,
+               i.ClientId,
+               se.ErrorCode,
+               count(*) as count
+        FROM Synchronization.SyncErrors se
+        JOIN Synchronization.SyncRuns sr
+        ON sr.Id = se.SyncRunId
+        JOIN Devices.Identities i
+        ON sr.CreatedBy = i.Address
+        WHERE sr.CreatedAt >= ?
+        GROUP BY YEAR(sr.CreatedAt), MONTH(sr.CreatedAt), DAY(sr.CreatedAt), i.ClientId, se.ErrorCode
+        """,
+        ("ErrorCode",),
+    ),
+    "files": _DailyCountSource(
+        """
+        SELECT YEAR(fm.CreatedAt) as CreatedYear,
+               MONTH(fm.CreatedAt) as CreatedMonth,
+               DAY(fm.CreatedAt) as CreatedDay,
+               i.ClientId,
+               count(*) as count
+        FROM Files.FileMetadata fm
+        JOIN Devices.Identities i
+        ON i.Address = fm.CreatedBy
+        WHERE fm.CreatedAt >= ?
+        GROUP BY YEAR(fm.CreatedAt), MONTH(fm.CreatedAt), DAY(fm.CreatedAt), i.ClientId
+        """
+    ),
+}
+
+# Seconds a refresh waits for the refresh of another worker to complete.
+_LOCK_TIMEOUT = 600
+
+
+class DailyCountRollup:
+    """
+    Rollup of the number of rows created per day and client, e.g. of messages
+    sent, further split by the categories of each source, e.g. the type of
+    external events. The rollup is stored in a SQLite database shared by all
+    workers.
+
+    Instead of aggregating all rows of a source on every refresh, only rows
+    created since the start of the last day counted so far are aggregated,
+    replacing the counts of that day. Rows created earlier but committed
+    after the previous refresh and deleted rows are not picked up
+    incrementally, so that the counts of a source are rebuilt from scratch
+    once they are older than the given interval.
+    """
+
+    def __init__(self, path: Path, full_refresh_interval: float):
+        self._path = path
+        self._full_refresh_interval = full_refresh_interval
+
+    @metrics.dataset
+    def refresh(self, cnxn: Connection, source: str) -> pd.DataFrame:
+        """
+        Brings the counts of the given source up to date and returns them as a
+        dataframe with the following columns:
+        - Day: datetime64[ns]
+        - ClientId
+        - one column per category of the source
+        - count
+        """
+
+        db = sqlite3.connect(self._path, timeout=_LOCK_TIMEOUT, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS Watermarks "
+                "(Source TEXT PRIMARY KEY, Columns TEXT, Since TEXT, BuiltAt REAL)"
+            )
+            # Taking the write lock up front serializes the refreshes of all
+            # workers, such that each new row is aggregated by one of them.
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._update(db, cnxn, source)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return pd.read_sql_query(f'SELECT * FROM "{source}"', db, parse_dates=["Day"])
+        finally:
+            db.close()
+
+    def _update(self, db: sqlite3.Connection, cnxn: Connection, source: str):
+        categories = DAILY_COUNT_SOURCES[source].categories
+        columns = ", ".join(("Day", "ClientId") + categories + ("count",))
+        watermark = db.execute("SELECT Columns, Since, BuiltAt FROM Watermarks WHERE Source = ?", [source]).fetchone()
+        if watermark is None or watermark[0] != columns or time.time() - watermark[2] >= self._full_refresh_interval:
+            db.execute(f'DROP TABLE IF EXISTS "{source}"')
+            db.execute(f'CREATE TABLE "{source}" ({columns})')
+            db.execute(f'CREATE INDEX "{source}_Day" ON "{source}" (Day)')
+            since, built_at = datetime(1, 1, 1), time.time()
+        else:
+            since, built_at = datetime.fromisoformat(watermark[1]), watermark[2]
+
+        df = metrics.read_sql_query(DAILY_COUNT_SOURCES[source].query, cnxn, params=[since])
+        if len(df) > 0:
+            df["Day"] = pd.to_datetime(
+                df[["CreatedYear", "CreatedMonth", "CreatedDay"]].set_axis(["year", "month", "day"], axis=1)
+            )
+            df = df.filter(["Day", "ClientId", *categories, "count"])
+            db.execute(f'DELETE FROM "{source}" WHERE Day >= ?', [since.strftime("%Y-%m-%d")])
+            since = df["Day"].max().to_pydatetime()
+            df["Day"] = df["Day"].dt.strftime("%Y-%m-%d")
+            # Values are converted to Python objects, which sqlite3 binds.
+            rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+            db.executemany(f'INSERT INTO "{source}" VALUES ({", ".join("?" * len(df.columns))})', rows)
+        db.execute(
+            "INSERT OR REPLACE INTO Watermarks VALUES (?, ?, ?, ?)",
+            [source, columns, since.isoformat(), built_at],
+        )
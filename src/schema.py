@@ -0,0 +1,246 @@
+"""
+The backbone's tables read by the dashboard, as generated by src.synthetic and
+copied by src.replica.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Table:
+    schema: str
+    name: str
+    # Columns by name and SQL Server type. Columns of type PAYLOAD hold
+    # payloads, of which the synthetic data only has the sizes.
+    columns: dict[str, str]
+    primary_key: str | None = None
+    indexes: tuple[tuple[str, ...], ...] = ()
+    # Definition of tables which are views in the backbone database.
+    view: str | None = None
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+
+_ID = "char(20)"
+_ADDRESS = "nvarchar(80)"
+PAYLOAD = "varbinary(max)"
+
+TABLES = {
+    t.qualified_name: t
+    for t in [
+        Table(
+            "Devices",
+            "OpenIddictApplications",
+            {
+                "Id": "nvarchar(450)",
+                "ClientId": "nvarchar(100)",
+                "DisplayName": "nvarchar(max)",
+                "CreatedAt": "datetime2",
+            },
+            primary_key="Id",
+            indexes=(("ClientId",),),
+        ),
+        Table(
+            "Devices",
+            "Identities",
+            {
+                "Address": _ADDRESS,
+                "ClientId": "nvarchar(200)",
+                "CreatedAt": "datetime2",
+                "IdentityVersion": "tinyint",
+                "Status": "int",
+            },
+            primary_key="Address",
+            indexes=(("ClientId",),),
+        ),
+        Table(
+            "Devices",
+            "Devices",
+            {"Id": _ID, "IdentityAddress": _ADDRESS, "CreatedAt": "datetime2", "DeletedAt": "datetime2"},
+            primary_key="Id",
+            indexes=(("IdentityAddress",),),
+        ),
+        Table(
+            "Devices",
+            "PnsRegistrations",
+            {
+                "DeviceId": _ID,
+                "IdentityAddress": _ADDRESS,
+                "Handle": "nvarchar(200)",
+                "AppId": "nvarchar(max)",
+                "UpdatedAt": "datetime2",
+                "Environment": "int",
+            },
+            primary_key="DeviceId",
+        ),
+        Table(
+            "Relationships",
+            "RelationshipTemplates",
+            {
+                "Id": _ID,
+                "CreatedBy": _ADDRESS,
+                "CreatedAt": "datetime2",
+                "ExpiresAt": "datetime2",
+                "MaxNumberOfAllocations": "int",
+                "Content": PAYLOAD,
+            },
+            primary_key="Id",
+            indexes=(("CreatedBy",),),
+        ),
+        Table(
+            "Relationships",
+            "Relationships",
+            {
+                "Id": _ID,
+                "RelationshipTemplateId": _ID,
+                "From": _ADDRESS,
+                "To": _ADDRESS,
+                "CreatedAt": "datetime2",
+                "Status": "int",
+            },
+            primary_key="Id",
+            indexes=(("From",), ("To",), ("RelationshipTemplateId",)),
+        ),
+        Table(
+            "Relationships",
+            "RelationshipTemplateAllocations",
+            {"Id": "int", "RelationshipTemplateId": _ID, "AllocatedBy": _ADDRESS, "AllocatedAt": "datetime2"},
+            primary_key="Id",
+            indexes=(("RelationshipTemplateId", "AllocatedBy"),),
+        ),
+        Table(
+            "Relationships",
+            "RelationshipAuditLog",
+            {
+                "Id": "int",
+                "RelationshipId": _ID,
+                "Reason": "int",
+                "OldStatus": "int",
+                "NewStatus": "int",
+                "CreatedBy": _ADDRESS,
+                "CreatedAt": "datetime2",
+            },
+            primary_key="Id",
+            indexes=(("RelationshipId",),),
+        ),
+        Table(
+            "AdminUi",
+            "RelationshipOverviews",
+            {
+                "From": _ADDRESS,
+                "To": _ADDRESS,
+                "RelationshipTemplateId": _ID,
+                "Status": "int",
+                "CreatedAt": "datetime2",
+                "AnsweredAt": "datetime2",
+            },
+            view="""
+                CREATE VIEW AdminUi.RelationshipOverviews AS
+                SELECT R.[From], R.[To], R.RelationshipTemplateId, R.Status,
+                       C.CreatedAt, A.CreatedAt AS AnsweredAt
+                FROM Relationships.Relationships AS R
+                LEFT JOIN Relationships.RelationshipAuditLog AS C
+                ON C.RelationshipId = R.Id AND C.Reason = 0
+                LEFT JOIN Relationships.RelationshipAuditLog AS A
+                ON A.RelationshipId = R.Id AND A.Reason IN (1, 2, 3)
+            """,
+        ),
+        Table(
+            "Messages",
+            "Messages",
+            {"Id": _ID, "CreatedBy": _ADDRESS, "CreatedAt": "datetime2", "Body": PAYLOAD},
+            primary_key="Id",
+            indexes=(("CreatedBy",),),
+        ),
+        Table(
+            "Messages",
+            "RecipientInformation",
+            {
+                "Id": "int",
+                "Address": _ADDRESS,
+                "MessageId": _ID,
+                "RelationshipId": _ID,
+                "ReceivedAt": "datetime2",
+            },
+            primary_key="Id",
+            indexes=(("MessageId",), ("Address",), ("RelationshipId",)),
+        ),
+        Table(
+            "Synchronization",
+            "SyncRuns",
+            {
+                "Id": _ID,
+                "Type": "int",
+                "Index": "bigint",
+                "CreatedBy": _ADDRESS,
+                "CreatedAt": "datetime2",
+                "ExpiresAt": "datetime2",
+                "FinalizedAt": "datetime2",
+                "EventCount": "int",
+            },
+            primary_key="Id",
+            indexes=(("CreatedBy", "Index"),),
+        ),
+        Table(
+            "Synchronization",
+            "ExternalEvents",
+            {
+                "Id": _ID,
+                "Type": "int",
+                "Index": "bigint",
+                "Owner": _ADDRESS,
+                "CreatedAt": "datetime2",
+                "SyncRunId": _ID,
+                "SyncErrorCount": "tinyint",
+            },
+            primary_key="Id",
+            indexes=(("Owner", "Index"), ("SyncRunId",)),
+        ),
+        Table(
+            "Synchronization",
+            "SyncErrors",
+            {"Id": _ID, "SyncRunId": _ID, "ExternalEventId": _ID, "ErrorCode": "nvarchar(100)"},
+            primary_key="Id",
+            indexes=(("SyncRunId",), ("ExternalEventId",)),
+        ),
+        Table(
+            "Synchronization",
+            "DatawalletModifications",
+            {
+                "Id": _ID,
+                "CreatedBy": _ADDRESS,
+                "Index": "bigint",
+                "CreatedAt": "datetime2",
+                "Type": "int",
+                "Collection": "nvarchar(50)",
+                "ObjectIdentifier": "nvarchar(100)",
+                "PayloadCategory": "nvarchar(50)",
+                "EncryptedPayload": PAYLOAD,
+            },
+            primary_key="Id",
+            indexes=(("CreatedBy", "Index"),),
+        ),
+        Table(
+            "Tokens",
+            "Tokens",
+            {"Id": _ID, "CreatedBy": _ADDRESS, "CreatedAt": "datetime2", "ExpiresAt": "datetime2", "Content": PAYLOAD},
+            primary_key="Id",
+            indexes=(("CreatedBy",),),
+        ),
+        Table(
+            "Files",
+            "FileMetadata",
+            {
+                "Id": _ID,
+                "CreatedBy": _ADDRESS,
+                "CreatedAt": "datetime2",
+                "ExpiresAt": "datetime2",
+                "CipherSize": "bigint",
+            },
+            primary_key="Id",
+            indexes=(("CreatedBy",),),
+        ),
+    ]
+}
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, TypeVar
+
+from src import metrics
+
+T = TypeVar("T")
+
+
+def content_version(data: bytes) -> str:
+    """
+    Returns a short, stable version identifier for the given content. Equal
+    content yields equal versions across processes, which allows workers to
+    agree on ETags without sharing state.
+    """
+
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+@dataclass(frozen=True)
+class Snapshot(Generic[T]):
+    value: T
+    version: str
+    created_at: float
+
+    def age(self) -> float:
+        """
+        Returns the age of the snapshot in seconds.
+        """
+
+        return time.time() - self.created_at
+
+
+class SnapshotCache(Generic[T]):
+    """
+    Process-local cache of expensive to build datasets. Snapshots are rebuilt
+    once they are older than the configured time-to-live. Concurrent requests
+    for the same key while a snapshot is being built wait for the single build
+    instead of hitting the database in parallel.
+    """
+
+    def __init__(self, name: str, ttl: float, version: Callable[[T], str]):
+        self._name = name
+        self._ttl = ttl
+        self._version = version
+        self._snapshots: dict[Hashable, Snapshot[T]] = {}
+        self._build_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # Number of requests served from a snapshot and number of builds.
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, build: Callable[[], T]) -> Snapshot[T]:
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and self.is_fresh(snapshot):
+            self.hits += 1
+            metrics.cache_lookup(self._name, hit=True)
+            return snapshot
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            # Another thread may have rebuilt the snapshot while we waited.
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and self.is_fresh(snapshot):
+                self.hits += 1
+                metrics.cache_lookup(self._name, hit=True)
+                return snapshot
+            self.misses += 1
+            metrics.cache_lookup(self._name, hit=False)
+            value = build()
+            snapshot = Snapshot(value=value, version=self._version(value), created_at=time.time())
+            self._snapshots[key] = snapshot
+            return snapshot
+
+    def peek(self, key: Hashable) -> Snapshot[T] | None:
+        """
+        Returns the current snapshot for key, regardless of its age, without
+        triggering a build.
+        """
+
+        return self._snapshots.get(key)
+
+    def snapshots(self) -> dict[Hashable, Snapshot[T]]:
+        """
+        Returns all current snapshots by key, regardless of their age.
+        """
+
+        return dict(self._snapshots)
+
+    def is_fresh(self, snapshot: Snapshot[T]) -> bool:
+        return snapshot.age() < self._ttl
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+class VersionedCache(Generic[T]):
+    """
+    Caches one value per key, derived from a versioned dataset. The value is
+    only rebuilt once the dataset's version has changed.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._values: dict[Hashable, tuple[str, T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: str, build: Callable[[], T]) -> T:
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is not None and cached[0] == version:
+                metrics.cache_lookup(self._name, hit=True)
+                return cached[1]
+            metrics.cache_lookup(self._name, hit=False)
+            value = build()
+            self._values[key] = (version, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
@@ -0,0 +1,164 @@
+"""
+Profiles the cold start of the dashboard, i.e. importing main and creating
+the app, and checks it against a time budget.
+
+Usage: python -m src.startup [--budget-ms MS] [--repeat N] [--top N] [--json]
+
+Each run happens in a fresh interpreter with `-X importtime`. The fastest run
+is reported, listing the modules with the highest cumulative import time and
+the import time per top-level package. The command exits with status 1 if
+the startup time exceeds the budget, so that it can be used as a regression
+check.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# Budget for the cold start of a single worker in milliseconds. Raise it
+# deliberately, not to make the check pass.
+STARTUP_BUDGET_MS = 2500
+
+# Executed in a fresh interpreter. The app is created with placeholder
+# credentials, which is fine as no connections are opened without warm-up.
+_PROFILED_STARTUP = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from src import config
+config.init(
+    MSSQL_HOSTNAME="localhost",
+    MSSQL_PORT=1433,
+    MSSQL_USER="-",
+    MSSQL_PASSWORD="-",
+    MSSQL_DB="-",
+    MSSQL_TARGET_ENCRYPT_CONNECTION="false",
+    MSSQL_TRUST_SERVER_CERTIFICATE="true",
+    DASHBOARD_HIDE_TEST_CLIENTS_DEFAULT="false",
+    DASHBOARD_TEST_CLIENTS_REGEX="$^",
+    DASHBOARD_APP_CLIENTS_REGEX="$^",
+    DASHBOARD_WARM_UP=False,
+)
+main.create_app(init_config_from_env=False)
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000}))
+"""
+
+
+@dataclass(frozen=True)
+class ModuleImportTime:
+    module: str
+    self_ms: float
+    cumulative_ms: float
+
+
+@dataclass(frozen=True)
+class StartupProfile:
+    import_ms: float
+    create_app_ms: float
+    modules: list[ModuleImportTime]
+
+    @property
+    def total_ms(self) -> float:
+        return self.import_ms + self.create_app_ms
+
+
+def profile_startup() -> StartupProfile:
+    """
+    Profiles the startup of the dashboard in a fresh interpreter.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROFILED_STARTUP],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return StartupProfile(
+        import_ms=timings["import_ms"],
+        create_app_ms=timings["create_app_ms"],
+        modules=_parse_importtime(result.stderr),
+    )
+
+
+def _parse_importtime(output: str) -> list[ModuleImportTime]:
+    # Lines look like "import time:       520 |    1498478 |   src", where
+    # the module name is indented by its nesting depth. The first line is a
+    # header.
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules.append(
+            ModuleImportTime(
+                module=module.strip(),
+                self_ms=int(self_us) / 1000,
+                cumulative_ms=int(cumulative_us) / 1000,
+            )
+        )
+    return modules
+
+
+def _self_time_per_package(modules: list[ModuleImportTime]) -> dict[str, float]:
+    per_package: dict[str, float] = defaultdict(float)
+    for m in modules:
+        per_package[m.module.split(".")[0]] += m.self_ms
+    return dict(sorted(per_package.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="startup time budget")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, the fastest of which is reported")
+    parser.add_argument("--top", type=int, default=20, help="number of modules and packages to list")
+    parser.add_argument("--json", action="store_true", help="print a machine-readable report")
+    args = parser.parse_args()
+
+    profile = min((profile_startup() for _ in range(max(args.repeat, 1))), key=lambda p: p.total_ms)
+    within_budget = profile.total_ms <= args.budget_ms
+    by_cumulative = sorted(profile.modules, key=lambda m: m.cumulative_ms, reverse=True)[: args.top]
+    per_package = dict(list(_self_time_per_package(profile.modules).items())[: args.top])
+
+    if args.json:
+        report = {
+            "total_ms": profile.total_ms,
+            "import_ms": profile.import_ms,
+            "create_app_ms": profile.create_app_ms,
+            "budget_ms": args.budget_ms,
+            "within_budget": within_budget,
+            "modules": [asdict(m) for m in by_cumulative],
+            "packages": per_package,
+        }
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"Startup: {profile.total_ms:.0f} ms (import main: {profile.import_ms:.0f} ms, "
+            f"create_app: {profile.create_app_ms:.0f} ms), budget: {args.budget_ms:.0f} ms"
+        )
+        print("\nModules by cumulative import time [ms]:")
+        for m in by_cumulative:
+            print(f"{m.cumulative_ms:10.1f} {m.self_ms:10.1f}  {m.module}")
+        print("\nImport time per top-level package [ms]:")
+        for package, ms in per_package.items():
+            print(f"{ms:10.1f}  {package}")
+
+    if not within_budget:
+        print(
+            f"Startup time of {profile.total_ms:.0f} ms exceeds the budget of {args.budget_ms:.0f} ms.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,857 @@
+"""
+Generates synthetic backbone data at a configurable scale, e.g. to benchmark
+and load-test the dashboard without production data.
+
+Usage: python -m src.synthetic --rows N [--target mssql|sqlite] [--out DIR]
+                               [--seed N] [--end DATE]
+
+Roughly N rows, e.g. 1e3 up to 1e8, are generated across all tables read by
+the dashboard. The data mimics production data:
+- Identities belong to app, test and connector clients. Client ids follow the
+  examples of the README, i.e. app clients match 'app-dev|app-.*' and test
+  clients 'dev|test-.*'. A few identities belong to a client missing from
+  Devices.OpenIddictApplications.
+- The number of rows per identity, e.g. relationships, messages or
+  datawallet modifications, is heavy-tailed, connectors being most active.
+- Timestamps span several years with growing activity. Templates, tokens and
+  files partly expire at 9999-12-31.
+- Payloads, e.g. message bodies, have realistic sizes but are filled with zero
+  bytes.
+
+Targets:
+- mssql: Creates the tables in the database configured by the same
+  environment variables as the dashboard, e.g. an empty database created in
+  the local server of dev/bootstrap-mssql. AdminUi.RelationshipOverviews is
+  created as a view as in the backbone.
+- sqlite: Writes one database file per schema to DIR, e.g. DIR/Devices.db.
+  See connect_sqlite for connecting to them such that the dashboard's queries
+  run unchanged.
+
+The same rows and seed yield the same data.
+"""
+
+import argparse
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src import bb_datawallet_modification_collections, bb_external_event_type_map, config
+from src.schema import PAYLOAD, TABLES, Table
+
+# Mean number of rows per identity, roughly following production data. Rows
+# of the remaining tables are derived from these, adding up to about
+# _ROWS_PER_IDENTITY rows across all tables per identity.
+_DEVICES_PER_APP_IDENTITY = 1.3
+_TEMPLATES_PER_IDENTITY = 1.5
+_RELATIONSHIPS_PER_IDENTITY = 2.0
+_MESSAGES_PER_IDENTITY = 10.0
+_SYNC_RUNS_PER_IDENTITY = 8.0
+_EXTERNAL_EVENTS_PER_IDENTITY = 12.0
+_DATAWALLET_MODIFICATIONS_PER_IDENTITY = 20.0
+_TOKENS_PER_IDENTITY = 1.0
+_FILES_PER_IDENTITY = 1.0
+_ROWS_PER_IDENTITY = 76
+
+_MIN_IDENTITIES = 10
+_CHUNK_ROWS = 50_000
+
+_START = np.datetime64("2021-06-01", "us")
+_NEVER = np.datetime64("9999-12-31", "us").astype(np.int64)
+_NAT = np.iinfo(np.int64).min
+_MINUTE = 60 * 10**6
+_HOUR = 60 * _MINUTE
+_DAY = 24 * _HOUR
+
+# Sequences of audit log entries, i.e. reason, old and new status, by which
+# relationships reach their status, along with their share.
+_RELATIONSHIP_HISTORIES = [
+    (0.08, [(0, None, 10)]),
+    (0.66, [(0, None, 10), (1, 10, 20)]),
+    (0.02, [(0, None, 10), (1, 10, 20), (4, 20, 50), (5, 50, 50), (6, 50, 20)]),
+    (0.06, [(0, None, 10), (2, 10, 30)]),
+    (0.04, [(0, None, 10), (3, 10, 40)]),
+    (0.08, [(0, None, 10), (1, 10, 20), (4, 20, 50)]),
+    (0.01, [(0, None, 10), (1, 10, 20), (4, 20, 50), (5, 50, 50), (7, 50, 50)]),
+    (0.03, [(0, None, 10), (1, 10, 20), (4, 20, 50), (9, 50, 60)]),
+    (0.02, [(0, None, 10), (1, 10, 20), (4, 20, 50), (9, 50, 60), (9, 60, 70)]),
+]
+
+# Shares of external event types, keyed as in bb_external_event_type_map.
+_EXTERNAL_EVENT_TYPES = {0: 0.7, 10: 0.2, 12: 0.02, 13: 0.02, 20: 0.01, 21: 0.01, 22: 0.02, 23: 0.01, 24: 0.01}
+
+_SYNC_ERROR_CODES = [
+    "error.platform.recordNotFound",
+    "error.platform.validation.invalidPropertyValue",
+    "error.runtime.unknown",
+    "error.transport.messages.decryptionFailed",
+]
+
+
+@dataclass(frozen=True)
+class _Histories:
+    # Per relationship, its status and whether it has been active.
+    status: np.ndarray
+    was_active: np.ndarray
+    # Per entry of the audit log, the relationship, the index of the entry
+    # within the relationship's history, the entry as reason, old and new
+    # status, and its time.
+    rels: np.ndarray
+    step: np.ndarray
+    entry: np.ndarray
+    created: np.ndarray
+
+
+class _Generator:
+    def __init__(self, rows: int, seed: int, end: datetime):
+        self._rng = np.random.default_rng(seed)
+        self._end = np.datetime64(end.replace(tzinfo=None), "us").astype(np.int64)
+        self.num_identities = max(round(rows / _ROWS_PER_IDENTITY), _MIN_IDENTITIES)
+        # Clients, identities and relationships are drawn first, by
+        # generate(), and the further tables are generated relative to them.
+        self._client_table = pd.DataFrame()
+        self._is_app: np.ndarray = np.empty(0, dtype=bool)
+        self._identity_created: np.ndarray = np.empty(0, dtype=np.int64)
+        self._activity: np.ndarray = np.empty(0)
+        self._cumulative_activity: np.ndarray = np.empty(0)
+        self._addresses: np.ndarray = np.empty(0, dtype=object)
+        self._rel_peers: tuple[np.ndarray, np.ndarray] = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._rel_created: np.ndarray = np.empty(0, dtype=np.int64)
+        self._rel_ids: np.ndarray = np.empty(0, dtype=object)
+        self._rel_activity: np.ndarray = np.empty(0)
+
+    def generate(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        yield from self._clients()
+        yield from self._identities()
+        yield from self._devices()
+        yield from self._relationships()
+        yield from self._messages()
+        yield from self._synchronization()
+        yield from self._datawallet_modifications()
+        yield from self._tokens()
+        yield from self._files()
+
+    def _clients(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        # Connectors have heavy-tailed numbers of identities. The legacy
+        # client is missing from OpenIddictApplications.
+        num_connectors = int(np.clip(np.sqrt(self.num_identities) / 4, 3, 200))
+        connector_shares = 1 / np.arange(1, num_connectors + 1) ** 1.1
+        clients = pd.DataFrame(
+            {
+                "ClientId": ["app-prod", "app-dev", "dev", "test-connector"]
+                + [f"connector-{i:03d}" for i in range(1, num_connectors + 1)]
+                + ["legacy-connector"],
+                "DisplayName": ["Enmeshed App", "Enmeshed App (dev)", "dev", "Test Connector"]
+                + [f"Connector {i}" for i in range(1, num_connectors + 1)]
+                + [None],
+                "Share": [0.6, 0.04, 0.03, 0.05] + list(0.25 * connector_shares / connector_shares.sum()) + [0.03],
+            }
+        )
+        clients["IsApp"] = clients["ClientId"].str.startswith("app-")
+        clients["IsTest"] = clients["ClientId"].isin(["dev", "test-connector"])
+        self._client_table = clients
+
+        applications = clients[clients["DisplayName"].notna()]
+        yield TABLES["Devices.OpenIddictApplications"], pd.DataFrame(
+            {
+                "Id": [f"{i:032x}" for i in range(len(applications))],
+                "ClientId": applications["ClientId"].to_numpy(),
+                "DisplayName": applications["DisplayName"].to_numpy(),
+                "CreatedAt": _timestamps(np.full(len(applications), _START.astype(np.int64))),
+            }
+        )
+
+    def _identities(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        n = self.num_identities
+        rng = self._rng
+        shares = self._client_table["Share"].to_numpy()
+        clients = rng.choice(len(shares), size=n, p=shares / shares.sum())
+        self._is_app = self._client_table["IsApp"].to_numpy()[clients]
+        is_test = self._client_table["IsTest"].to_numpy()[clients]
+        # Sign-ups grow over time, i.e. the density of creation times is
+        # increasing.
+        start = _START.astype(np.int64)
+        self._identity_created = start + ((self._end - start) * np.sqrt(rng.random(n))).astype(np.int64)
+        # Activity of an identity, by which it owns rows of other tables. Rows
+        # are spread over the identity's lifetime, which is thus accounted
+        # for, such that activity follows the number of identities over time.
+        activity = (rng.pareto(1.5, n) + 1) * (self._end - self._identity_created) / (self._end - start)
+        activity[~self._is_app & ~is_test] *= 5
+        self._activity = activity
+        self._cumulative_activity = np.cumsum(activity)
+        self._addresses = _addresses(np.arange(n))
+
+        for lo, hi in _chunks(n):
+            yield TABLES["Devices.Identities"], pd.DataFrame(
+                {
+                    "Address": self._addresses[lo:hi],
+                    "ClientId": self._client_table["ClientId"].to_numpy()[clients[lo:hi]],
+                    "CreatedAt": _timestamps(self._identity_created[lo:hi]),
+                    "IdentityVersion": 1,
+                    "Status": rng.choice([0, 1, 2], size=hi - lo, p=[0.98, 0.015, 0.005]),
+                }
+            )
+
+    def _devices(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        # Connectors run on a single device without push notifications.
+        counts = np.where(self._is_app, rng.geometric(1 / _DEVICES_PER_APP_IDENTITY, self.num_identities), 1)
+        owners = np.repeat(np.arange(self.num_identities), counts)
+        first = np.r_[True, owners[1:] != owners[:-1]]
+        created = np.where(first, self._identity_created[owners], self._after(self._identity_created[owners]))
+        deleted = np.where(rng.random(len(owners)) < 0.02, self._after(created), _NAT)
+        ids = _ids("DVC", np.arange(len(owners)))
+        for lo, hi in _chunks(len(owners)):
+            yield TABLES["Devices.Devices"], pd.DataFrame(
+                {
+                    "Id": ids[lo:hi],
+                    "IdentityAddress": self._addresses[owners[lo:hi]],
+                    "CreatedAt": _timestamps(created[lo:hi]),
+                    "DeletedAt": _timestamps(deleted[lo:hi]),
+                }
+            )
+
+        registered = np.flatnonzero(self._is_app[owners] & (rng.random(len(owners)) < 0.8))
+        platforms = rng.choice(["fcm", "apns", "sse"], size=len(registered), p=[0.55, 0.35, 0.1])
+        for lo, hi in _chunks(len(registered)):
+            devices = registered[lo:hi]
+            yield TABLES["Devices.PnsRegistrations"], pd.DataFrame(
+                {
+                    "DeviceId": ids[devices],
+                    "IdentityAddress": self._addresses[owners[devices]],
+                    "Handle": platforms[lo:hi] + "|" + pd.Series(devices).map(lambda d: f"{d:040x}").to_numpy(),
+                    "AppId": "eu.enmeshed.app",
+                    "UpdatedAt": _timestamps(self._after(created[devices])),
+                    "Environment": 1,
+                }
+            )
+
+    def _relationships(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        n = self.num_identities
+
+        num_templates = round(_TEMPLATES_PER_IDENTITY * n)
+        creators = self._sample_identities(num_templates)
+        template_created = self._after(self._identity_created[creators])
+        # Templates of active identities, e.g. those of connectors published
+        # on websites, are used most.
+        popularity = np.cumsum((rng.pareto(1.5, num_templates) + 1) * self._activity[creators])
+        template_ids = _ids("RLT", np.arange(num_templates))
+
+        num_rels = round(_RELATIONSHIPS_PER_IDENTITY * n)
+        templates = _sample(rng, popularity, num_rels)
+        to = creators[templates]
+        from_ = self._sample_identities(num_rels)
+        from_ = np.where(from_ == to, (from_ + 1) % n, from_)
+        # Relationships are mostly requested soon after the template has been
+        # shared or the requesting identity has been created.
+        earliest = np.maximum(template_created[templates], self._identity_created[from_])
+        rel_created = earliest + np.minimum(
+            _lognormal(rng, 3 * _DAY, 2.0, num_rels), (self._end - earliest) * rng.random(num_rels)
+        ).astype(np.int64)
+        rel_ids = _ids("REL", np.arange(num_rels))
+
+        # Templates are allocated by the identities requesting relationships,
+        # and a few more without a relationship being created.
+        num_unused = round(0.1 * num_rels)
+        unused = _sample(rng, popularity, num_unused)
+        alloc_templates = np.r_[templates, unused]
+        alloc_by = np.r_[from_, self._sample_identities(num_unused)]
+        alloc_at = np.r_[
+            np.maximum(rel_created - _lognormal(rng, 5 * _MINUTE, 1.0, num_rels), template_created[templates]),
+            self._after(template_created[unused]),
+        ]
+        num_allocs = np.bincount(alloc_templates, minlength=num_templates)
+        max_allocs = np.where(
+            rng.random(num_templates) < 0.6,
+            np.nan,
+            np.maximum(num_allocs, 1) * rng.choice([1, 1, 1, 2, 10], size=num_templates),
+        )
+        u = rng.random(num_templates)
+        expires = np.where(
+            u < 0.35,
+            _NEVER,
+            np.where(u < 0.55, _NAT, template_created + _lognormal(rng, 7 * _DAY, 1.0, num_templates)),
+        )
+        for lo, hi in _chunks(num_templates):
+            yield TABLES["Relationships.RelationshipTemplates"], pd.DataFrame(
+                {
+                    "Id": template_ids[lo:hi],
+                    "CreatedBy": self._addresses[creators[lo:hi]],
+                    "CreatedAt": _timestamps(template_created[lo:hi]),
+                    "ExpiresAt": _timestamps(expires[lo:hi]),
+                    "MaxNumberOfAllocations": pd.array(max_allocs[lo:hi], dtype="Int64"),
+                    "Content": _lognormal(rng, 1500, 1.0, hi - lo),
+                }
+            )
+        for lo, hi in _chunks(len(alloc_templates)):
+            yield TABLES["Relationships.RelationshipTemplateAllocations"], pd.DataFrame(
+                {
+                    "Id": np.arange(lo + 1, hi + 1),
+                    "RelationshipTemplateId": template_ids[alloc_templates[lo:hi]],
+                    "AllocatedBy": self._addresses[alloc_by[lo:hi]],
+                    "AllocatedAt": _timestamps(alloc_at[lo:hi]),
+                }
+            )
+
+        histories = self._histories(rel_created)
+        rels, step, entry, audit_at = histories.rels, histories.step, histories.entry, histories.created
+        status = histories.status
+        self._rel_peers = (from_, to)
+        self._rel_created = rel_created
+        self._rel_ids = rel_ids
+        # Messages are exchanged in relationships which have been active.
+        self._rel_activity = np.cumsum(
+            histories.was_active
+            * (rng.pareto(2.0, num_rels) + 1)
+            * np.sqrt(self._activity[to])
+            * (self._end - rel_created)
+        )
+
+        for lo, hi in _chunks(num_rels):
+            yield TABLES["Relationships.Relationships"], pd.DataFrame(
+                {
+                    "Id": rel_ids[lo:hi],
+                    "RelationshipTemplateId": template_ids[templates[lo:hi]],
+                    "From": self._addresses[from_[lo:hi]],
+                    "To": self._addresses[to[lo:hi]],
+                    "CreatedAt": _timestamps(rel_created[lo:hi]),
+                    "Status": status[lo:hi],
+                }
+            )
+        # The creation is entered by the requesting and the answer by the
+        # requested identity.
+        audit_by = np.where(step % 2 == 0, from_[rels], to[rels])
+        for lo, hi in _chunks(len(rels)):
+            yield TABLES["Relationships.RelationshipAuditLog"], pd.DataFrame(
+                {
+                    "Id": np.arange(lo + 1, hi + 1),
+                    "RelationshipId": rel_ids[rels[lo:hi]],
+                    "Reason": entry[lo:hi, 0].astype(int),
+                    "OldStatus": pd.array(entry[lo:hi, 1], dtype="Int64"),
+                    "NewStatus": entry[lo:hi, 2].astype(int),
+                    "CreatedBy": self._addresses[audit_by[lo:hi]],
+                    "CreatedAt": _timestamps(audit_at[lo:hi]),
+                }
+            )
+
+        answered = (step == 1) & np.isin(entry[:, 0], [1, 2, 3])
+        answered_at = np.full(num_rels, _NAT)
+        answered_at[rels[answered]] = audit_at[answered]
+        for lo, hi in _chunks(num_rels):
+            yield TABLES["AdminUi.RelationshipOverviews"], pd.DataFrame(
+                {
+                    "From": self._addresses[from_[lo:hi]],
+                    "To": self._addresses[to[lo:hi]],
+                    "RelationshipTemplateId": template_ids[templates[lo:hi]],
+                    "Status": status[lo:hi],
+                    "CreatedAt": _timestamps(rel_created[lo:hi]),
+                    "AnsweredAt": _timestamps(answered_at[lo:hi]),
+                }
+            )
+
+    def _histories(self, rel_created: np.ndarray) -> _Histories:
+        # Relationships reach their status by one of the histories, which
+        # is recorded by the audit log. Creation is followed by an answer
+        # within hours, later changes happen within months.
+        rng = self._rng
+        num_rels = len(rel_created)
+        shares = np.array([share for share, _ in _RELATIONSHIP_HISTORIES])
+        steps = [np.array(s, dtype=float) for _, s in _RELATIONSHIP_HISTORIES]
+        histories = rng.choice(len(steps), size=num_rels, p=shares / shares.sum())
+        lengths = np.array([len(s) for s in steps])[histories]
+        entries = np.concatenate([steps[h] for h in range(len(steps))])
+        offsets = np.r_[0, np.cumsum([len(s) for s in steps])[:-1]]
+        rels = np.repeat(np.arange(num_rels), lengths)
+        first_entries = np.cumsum(lengths) - lengths
+        step = np.arange(len(rels)) - np.repeat(first_entries, lengths)
+        entry = entries[offsets[histories[rels]] + step]
+        gaps = np.where(
+            step == 0,
+            0,
+            np.where(
+                step == 1,
+                _lognormal(rng, 2 * _HOUR, 1.5, len(rels)),
+                _lognormal(rng, 30 * _DAY, 1.0, len(rels)),
+            ),
+        )
+        gaps = np.cumsum(gaps)
+        return _Histories(
+            status=entry[np.cumsum(lengths) - 1, 2].astype(int),
+            was_active=np.isin(histories, [h for h, s in enumerate(steps) if (s[:, 2] == 20).any()]),
+            rels=rels,
+            step=step,
+            entry=entry,
+            created=np.minimum(rel_created[rels] + gaps - np.repeat(gaps[first_entries], lengths), self._end),
+        )
+
+    def _messages(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        if self._rel_activity[-1] == 0:
+            return
+        from_, to = self._rel_peers
+        num_messages = round(_MESSAGES_PER_IDENTITY * self.num_identities)
+        next_recipient_id = 1
+        for lo, hi in _chunks(num_messages):
+            size = hi - lo
+            rels = _sample(rng, self._rel_activity, size)
+            sent_by_from = rng.random(size) < 0.5
+            senders = np.where(sent_by_from, from_[rels], to[rels])
+            created = self._after(self._rel_created[rels])
+            ids = _ids("MSG", np.arange(lo, hi))
+            yield TABLES["Messages.Messages"], pd.DataFrame(
+                {
+                    "Id": ids,
+                    "CreatedBy": self._addresses[senders],
+                    "CreatedAt": _timestamps(created),
+                    "Body": np.minimum(_lognormal(rng, 1200, 1.0, size), 5 * 2**20),
+                }
+            )
+
+            # Most messages are sent to the peer of the relationship, a few
+            # to further recipients.
+            extra = np.where(rng.random(size) < 0.03, rng.geometric(0.3, size), 0)
+            messages = np.repeat(np.arange(size), 1 + extra)
+            first = np.r_[True, messages[1:] != messages[:-1]]
+            recipient_rels = np.where(first, rels[messages], _sample(rng, self._rel_activity, len(messages)))
+            recipients = np.where(first, np.where(sent_by_from, to[rels], from_[rels])[messages], to[recipient_rels])
+            received = np.where(
+                rng.random(len(messages)) < 0.05,
+                _NAT,
+                np.minimum(created[messages] + _lognormal(rng, 10 * _MINUTE, 2.0, len(messages)), self._end),
+            )
+            yield TABLES["Messages.RecipientInformation"], pd.DataFrame(
+                {
+                    "Id": np.arange(next_recipient_id, next_recipient_id + len(messages)),
+                    "Address": self._addresses[recipients],
+                    "MessageId": ids[messages],
+                    "RelationshipId": self._rel_ids[recipient_rels],
+                    "ReceivedAt": _timestamps(received),
+                }
+            )
+            next_recipient_id += len(messages)
+
+    def _synchronization(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        n = self.num_identities
+
+        # Sync runs are indexed per identity in order of their creation.
+        num_runs = round(_SYNC_RUNS_PER_IDENTITY * n)
+        run_owners = self._sample_identities(num_runs)
+        run_created = self._after(self._identity_created[run_owners])
+        order = np.lexsort((run_created, run_owners))
+        run_owners, run_created = run_owners[order], run_created[order]
+        runs_per_owner = np.bincount(run_owners, minlength=n)
+        first_run = np.cumsum(runs_per_owner) - runs_per_owner
+        run_index = np.arange(num_runs) - first_run[run_owners]
+        run_ids = _ids("SYR", np.arange(num_runs))
+        event_counts = np.zeros(num_runs, dtype=np.int64)
+
+        types = np.array(list(_EXTERNAL_EVENT_TYPES), dtype=int)
+        type_shares = np.array(list(_EXTERNAL_EVENT_TYPES.values()))
+        assert set(types) <= set(bb_external_event_type_map)
+        num_events = round(_EXTERNAL_EVENTS_PER_IDENTITY * n)
+        next_index = np.zeros(n, dtype=np.int64)
+        num_errors = 0
+        for lo, hi in _chunks(num_events):
+            size = hi - lo
+            owners = self._sample_identities(size)
+            index = pd.Series(owners).groupby(owners).cumcount().to_numpy() + next_index[owners]
+            next_index += np.bincount(owners, minlength=n)
+            # Most events have been fetched by one of their owner's sync runs.
+            synced = (runs_per_owner[owners] > 0) & (rng.random(size) < 0.9)
+            runs = np.where(
+                synced, first_run[owners] + (rng.random(size) * runs_per_owner[owners]).astype(np.int64), -1
+            )
+            event_counts += np.bincount(runs[synced], minlength=num_runs)
+            failed = synced & (rng.random(size) < 0.02)
+            ids = _ids("EXE", np.arange(lo, hi))
+            yield TABLES["Synchronization.ExternalEvents"], pd.DataFrame(
+                {
+                    "Id": ids,
+                    "Type": rng.choice(types, size=size, p=type_shares / type_shares.sum()),
+                    "Index": index,
+                    "Owner": self._addresses[owners],
+                    "CreatedAt": _timestamps(self._after(self._identity_created[owners])),
+                    "SyncRunId": _or_none(synced, run_ids[np.maximum(runs, 0)]),
+                    "SyncErrorCount": failed.astype(int),
+                }
+            )
+            yield TABLES["Synchronization.SyncErrors"], pd.DataFrame(
+                {
+                    "Id": _ids("SYE", np.arange(num_errors, num_errors + failed.sum())),
+                    "SyncRunId": run_ids[runs[failed]],
+                    "ExternalEventId": ids[failed],
+                    "ErrorCode": rng.choice(_SYNC_ERROR_CODES, size=failed.sum(), p=[0.6, 0.2, 0.15, 0.05]),
+                }
+            )
+            num_errors += failed.sum()
+
+        for lo, hi in _chunks(num_runs):
+            size = hi - lo
+            created = run_created[lo:hi]
+            yield TABLES["Synchronization.SyncRuns"], pd.DataFrame(
+                {
+                    "Id": run_ids[lo:hi],
+                    "Type": np.where(rng.random(size) < 0.95, 0, 1),
+                    "Index": run_index[lo:hi],
+                    "CreatedBy": self._addresses[run_owners[lo:hi]],
+                    "CreatedAt": _timestamps(created),
+                    "ExpiresAt": _timestamps(created + 10 * _MINUTE),
+                    "FinalizedAt": _timestamps(
+                        np.where(rng.random(size) < 0.01, _NAT, created + _lognormal(rng, 2 * 10**6, 1.0, size))
+                    ),
+                    "EventCount": event_counts[lo:hi],
+                }
+            )
+
+    def _datawallet_modifications(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        n = self.num_identities
+        # The datawallet is mostly used by the app.
+        weights = np.cumsum(self._activity * np.where(self._is_app, 1, 0.05))
+        collections = np.array(sorted(bb_datawallet_modification_collections))
+        collection_shares = rng.dirichlet(np.full(len(collections), 0.7))
+        num_modifications = round(_DATAWALLET_MODIFICATIONS_PER_IDENTITY * n)
+        next_index = np.zeros(n, dtype=np.int64)
+        for lo, hi in _chunks(num_modifications):
+            size = hi - lo
+            owners = _sample(rng, weights, size)
+            index = pd.Series(owners).groupby(owners).cumcount().to_numpy() + next_index[owners]
+            next_index += np.bincount(owners, minlength=n)
+            # Create, Update, Delete and CacheChanged, of which the latter two
+            # carry no payload.
+            types = rng.choice(4, size=size, p=[0.45, 0.4, 0.1, 0.05])
+            has_payload = types < 2
+            yield TABLES["Synchronization.DatawalletModifications"], pd.DataFrame(
+                {
+                    "Id": _ids("DWM", np.arange(lo, hi)),
+                    "CreatedBy": self._addresses[owners],
+                    "Index": index,
+                    "CreatedAt": _timestamps(self._after(self._identity_created[owners])),
+                    "Type": types,
+                    "Collection": rng.choice(collections, size=size, p=collection_shares),
+                    "ObjectIdentifier": _ids("OBJ", rng.integers(0, 4 * num_modifications, size)),
+                    "PayloadCategory": _or_none(
+                        has_payload,
+                        rng.choice(["Userdata", "Technical", "Metadata"], size=size, p=[0.6, 0.3, 0.1]),
+                    ),
+                    "EncryptedPayload": pd.array(
+                        np.where(has_payload, _lognormal(rng, 350, 0.8, size), np.nan), dtype="Int64"
+                    ),
+                }
+            )
+
+    def _tokens(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        num_tokens = round(_TOKENS_PER_IDENTITY * self.num_identities)
+        for lo, hi in _chunks(num_tokens):
+            size = hi - lo
+            owners = self._sample_identities(size)
+            created = self._after(self._identity_created[owners])
+            yield TABLES["Tokens.Tokens"], pd.DataFrame(
+                {
+                    "Id": _ids("TOK", np.arange(lo, hi)),
+                    "CreatedBy": self._addresses[owners],
+                    "CreatedAt": _timestamps(created),
+                    "ExpiresAt": _timestamps(
+                        np.where(rng.random(size) < 0.15, _NEVER, created + _lognormal(rng, 2 * _DAY, 1.5, size))
+                    ),
+                    "Content": _lognormal(rng, 700, 0.7, size),
+                }
+            )
+
+    def _files(self) -> Iterator[tuple[Table, pd.DataFrame]]:
+        rng = self._rng
+        num_files = round(_FILES_PER_IDENTITY * self.num_identities)
+        for lo, hi in _chunks(num_files):
+            size = hi - lo
+            owners = self._sample_identities(size)
+            created = self._after(self._identity_created[owners])
+            yield TABLES["Files.FileMetadata"], pd.DataFrame(
+                {
+                    "Id": _ids("FIL", np.arange(lo, hi)),
+                    "CreatedBy": self._addresses[owners],
+                    "CreatedAt": _timestamps(created),
+                    "ExpiresAt": _timestamps(
+                        np.where(rng.random(size) < 0.15, _NEVER, created + _lognormal(rng, 30 * _DAY, 1.0, size))
+                    ),
+                    "CipherSize": np.minimum(_lognormal(rng, 150_000, 1.8, size), 100 * 2**20),
+                }
+            )
+
+    def _sample_identities(self, size: int) -> np.ndarray:
+        return _sample(self._rng, self._cumulative_activity, size)
+
+    def _after(self, start: np.ndarray) -> np.ndarray:
+        # Random timestamps between the given ones and the end, i.e. rows of
+        # an identity are spread over its lifetime.
+        return start + ((self._end - start) * self._rng.random(len(start))).astype(np.int64)
+
+
+def _chunks(num_rows: int) -> Iterator[tuple[int, int]]:
+    for lo in range(0, num_rows, _CHUNK_ROWS):
+        yield lo, min(lo + _CHUNK_ROWS, num_rows)
+
+
+def _sample(rng: np.random.Generator, cumulative_weights: np.ndarray, size: int) -> np.ndarray:
+    # Samples indices with probabilities proportional to the weights.
+    indices = np.searchsorted(cumulative_weights, rng.random(size) * cumulative_weights[-1], side="right")
+    return np.minimum(indices, len(cumulative_weights) - 1)
+
+
+def _lognormal(rng: np.random.Generator, median: float, sigma: float, size: int) -> np.ndarray:
+    return np.maximum(rng.lognormal(np.log(median), sigma, size), 1).astype(np.int64)
+
+
+def _ids(prefix: str, index: np.ndarray) -> np.ndarray:
+    # Backbone ids consist of a prefix of three characters and 17 more.
+    return (prefix + pd.Series(index, dtype="int64").astype(str).str.zfill(17)).to_numpy(dtype=object)
+
+
+def _addresses(index: np.ndarray) -> np.ndarray:
+    return ("did:e:localhost:dids:" + pd.Series(index, dtype="int64").map(lambda i: f"{i:022x}")).to_numpy(dtype=object)
+
+
+def _or_none(mask: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # The values where the mask is set and None elsewhere.
+    result = np.full(len(mask), None, dtype=object)
+    result[mask] = values[mask]
+    return result
+
+
+def _timestamps(us: np.ndarray) -> np.ndarray:
+    # Microseconds since the epoch, _NAT marking missing values.
+    return np.asarray(us, dtype=np.int64).astype("datetime64[us]")
+
+
+def generate(rows: int, seed: int = 0, end: datetime | None = None) -> Iterator[tuple[Table, pd.DataFrame]]:
+    """
+    Generates about the given number of rows of synthetic backbone data, as
+    chunks of rows of the tables in TABLES. Rows of a table may be interleaved
+    with rows of others. Timestamps range up to end, by default today.
+    """
+
+    if end is None:
+        end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    yield from _Generator(rows, seed, end).generate()
+
+
+def write_mssql(cnxn: Any, chunks: Iterator[tuple[Table, pd.DataFrame]]) -> dict[str, int]:
+    """
+    Writes the generated chunks to a SQL Server database, creating the tables
+    along with their indexes. Returns the number of rows written per table.
+    """
+
+    cursor = cnxn.cursor()
+    cursor.fast_executemany = True
+    counts: dict[str, int] = {}
+    schemas: set[str] = set()
+    for table, df in chunks:
+        if table.schema not in schemas:
+            schemas.add(table.schema)
+            cursor.execute(f"IF SCHEMA_ID('{table.schema}') IS NULL EXEC('CREATE SCHEMA [{table.schema}]')")
+        if table.qualified_name not in counts:
+            counts[table.qualified_name] = 0
+            if table.view is None:
+                definitions = ", ".join(
+                    f"[{name}] {sql_type}{' NOT NULL' if name == table.primary_key else ''}"
+                    for name, sql_type in table.columns.items()
+                )
+                cursor.execute(f"CREATE TABLE [{table.schema}].[{table.name}] ({definitions})")
+            cnxn.commit()
+        if table.view is not None or len(df) == 0:
+            continue
+        values = ", ".join(
+            "REPLICATE(CAST(0x00 AS varbinary(max)), ?)" if sql_type == PAYLOAD else "?"
+            for sql_type in table.columns.values()
+        )
+        cursor.executemany(
+            f"INSERT INTO [{table.schema}].[{table.name}] ({_column_list(table)}) VALUES ({values})",
+            _rows(table, df),
+        )
+        cnxn.commit()
+        counts[table.qualified_name] += len(df)
+
+    # Indexes are created once all rows are written, which is faster than
+    # maintaining them while inserting.
+    for name in counts:
+        table = TABLES[name]
+        if table.view is not None:
+            cursor.execute(table.view)
+            continue
+        if table.primary_key is not None:
+            cursor.execute(
+                f"ALTER TABLE [{table.schema}].[{table.name}] "
+                f"ADD CONSTRAINT [PK_{table.name}] PRIMARY KEY ([{table.primary_key}])"
+            )
+        for columns in table.indexes:
+            cursor.execute(
+                f"CREATE INDEX [IX_{table.name}_{'_'.join(columns)}] ON [{table.schema}].[{table.name}] "
+                f"({', '.join(f'[{c}]' for c in columns)})"
+            )
+        cnxn.commit()
+    cursor.close()
+    return counts
+
+
+def write_sqlite(directory: Path, chunks: Iterator[tuple[Table, pd.DataFrame]]) -> dict[str, int]:
+    """
+    Writes the generated chunks to one SQLite database file per schema in the
+    given directory, creating the tables along with their indexes. Views are
+    written as tables. Returns the number of rows written per table.
+    """
+
+    directory.mkdir(parents=True, exist_ok=True)
+    cnxn = sqlite3.connect(":memory:")
+    counts: dict[str, int] = {}
+    schemas: set[str] = set()
+    for table, df in chunks:
+        if table.schema not in schemas:
+            schemas.add(table.schema)
+            cnxn.execute("ATTACH DATABASE ? AS " + _sqlite_quote(table.schema), [str(directory / f"{table.schema}.db")])
+            # The files are written at once, so that they need not survive
+            # crashes.
+            cnxn.execute(f"PRAGMA {_sqlite_quote(table.schema)}.journal_mode = OFF")
+            cnxn.execute(f"PRAGMA {_sqlite_quote(table.schema)}.synchronous = OFF")
+        if table.qualified_name not in counts:
+            counts[table.qualified_name] = 0
+            definitions = ", ".join(f"[{name}] {_sqlite_type(t)}" for name, t in table.columns.items())
+            cnxn.execute(f"CREATE TABLE [{table.schema}].[{table.name}] ({definitions})")
+        values = ", ".join(
+            "NULLIF(zeroblob(?), x'')" if sql_type == PAYLOAD else "?" for sql_type in table.columns.values()
+        )
+        cnxn.executemany(
+            f"INSERT INTO [{table.schema}].[{table.name}] ({_column_list(table)}) VALUES ({values})",
+            _rows(table, df, sqlite=True),
+        )
+        cnxn.commit()
+        counts[table.qualified_name] += len(df)
+
+    for name in counts:
+        table = TABLES[name]
+        if table.primary_key is not None:
+            cnxn.execute(
+                f"CREATE UNIQUE INDEX [{table.schema}].[PK_{table.name}] ON [{table.name}] ([{table.primary_key}])"
+            )
+        for columns in table.indexes:
+            cnxn.execute(
+                f"CREATE INDEX [{table.schema}].[IX_{table.name}_{'_'.join(columns)}] ON [{table.name}] "
+                f"({', '.join(f'[{c}]' for c in columns)})"
+            )
+    cnxn.commit()
+    cnxn.close()
+    return counts
+
+
+def connect_sqlite(directory: Path) -> sqlite3.Connection:
+    """
+    Connects to data written by write_sqlite, attaching the database file of
+    every schema under the schema's name, such that the dashboard's queries
+    resolve their tables. SQL Server's LEN, YEAR, MONTH and DAY are provided as
+    well, and timestamp columns are returned as datetimes as by pyodbc.
+    """
+
+    cnxn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    for path in sorted(directory.glob("*.db")):
+        cnxn.execute("ATTACH DATABASE ? AS " + _sqlite_quote(path.stem), [f"file:{path}?mode=ro"])
+    create_sql_server_functions(cnxn)
+    return cnxn
+
+
+def create_sql_server_functions(cnxn: sqlite3.Connection):
+    """
+    Provides SQL Server's LEN, YEAR, MONTH and DAY on a SQLite connection.
+    Timestamps are expected as text like 2024-01-31 12:00:00.000000.
+    """
+
+    cnxn.create_function("LEN", 1, lambda value: None if value is None else len(value), deterministic=True)
+    for name, part in [("YEAR", slice(0, 4)), ("MONTH", slice(5, 7)), ("DAY", slice(8, 10))]:
+        cnxn.create_function(
+            name, 1, lambda value, part=part: None if value is None else int(value[part]), deterministic=True
+        )
+
+
+sqlite3.register_converter("DATETIME2", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _column_list(table: Table) -> str:
+    return ", ".join(f"[{name}]" for name in table.columns)
+
+
+def _rows(table: Table, df: pd.DataFrame, sqlite: bool = False) -> list[tuple]:
+    # Drivers expect Python objects and None in place of missing values.
+    df = df.filter(list(table.columns))
+    if sqlite:
+        for name, sql_type in table.columns.items():
+            if sql_type == "datetime2":
+                df[name] = df[name].dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def _sqlite_type(sql_type: str) -> str:
+    if sql_type == "datetime2":
+        # Declared as such to be converted by connect_sqlite.
+        return "DATETIME2"
+    if "int" in sql_type:
+        return "INTEGER"
+    if "binary" in sql_type:
+        return "BLOB"
+    return "TEXT"
+
+
+def _sqlite_quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _num_rows(value: str) -> int:
+    # Accepts scientific notation, e.g. 1e6.
+    rows = int(float(value))
+    if rows < 1000:
+        raise argparse.ArgumentTypeError("at least 1000 rows are required")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=_num_rows, required=True, help="approximate number of rows, e.g. 1e6")
+    parser.add_argument("--target", choices=["mssql", "sqlite"], default="mssql", help="where to write the data")
+    parser.add_argument("--out", type=Path, default=Path("synthetic-data"), help="directory of the sqlite target")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random number generator")
+    parser.add_argument(
+        "--end", type=datetime.fromisoformat, help="date of the latest timestamps, e.g. 2025-01-01; defaults to today"
+    )
+    args = parser.parse_args()
+
+    chunks = generate(args.rows, args.seed, args.end)
+    if args.target == "sqlite":
+        if any(args.out.glob("*.db")):
+            parser.error(f"{args.out} already contains database files")
+        counts = write_sqlite(args.out, chunks)
+    else:
+        cfg = config.init()
+        import main as app  # pylint: disable=import-outside-toplevel
+
+        cnxn = app.make_cnxn(readonly=False)
+        try:
+            cursor = cnxn.cursor()
+            if cursor.execute("SELECT OBJECT_ID('Devices.Identities')").fetchval() is not None:
+                parser.error(f"database {cfg.MSSQL_DB} already contains backbone tables")
+            cursor.close()
+            counts = write_mssql(cnxn, chunks)
+        finally:
+            cnxn.close()
+
+    for name, count in counts.items():
+        print(f"{count:12,d}  {name}")
+    print(f"{sum(counts.values()):12,d}  rows in total", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Tracing of dash callbacks, breaking down the time spent per callback into
+phases:
+- db: waiting for a connection and running SQL queries
+- pandas: processing the fetched rows
+- plot: building the figure
+- serialize: serializing the figure for the response, done by dash after the
+  callback has returned
+
+Traces are enabled by DASHBOARD_TRACING and written to stderr as one JSON
+object per line. If DASHBOARD_TRACING_OTLP_ENDPOINT is set, they are exported
+to an OpenTelemetry collector as well, which requires the optional
+opentelemetry dependencies (poetry install --with tracing).
+
+Phases are recorded by the instrumentation in src.metrics, so that queries
+and figures are traced wherever they are instrumented.
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+from flask import Flask, Response, g, has_request_context
+
+from src import config
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True)
+class Span:
+    phase: str
+    # Start relative to the start of the trace and duration, in seconds.
+    start: float
+    duration: float
+    # Time spent within the span but outside of nested spans, e.g. a dataset's
+    # processing time excluding its queries.
+    self_duration: float
+    attributes: dict[str, str]
+
+
+@dataclass
+class Trace:
+    plot: str
+    hide_test_clients: bool
+    started_at: float = field(default_factory=time.perf_counter)
+    started_at_ns: int = field(default_factory=time.time_ns)
+    returned_at: float | None = None
+    spans: list[Span] = field(default_factory=list)
+
+    def phase_durations(self) -> dict[str, float]:
+        durations = dict.fromkeys(_PHASES, 0.0)
+        for span in self.spans:
+            durations[span.phase] += span.self_duration
+        return durations
+
+
+_PHASES = ("db", "pandas", "plot", "serialize")
+
+
+def traced(plot: str) -> Callable[[F], F]:
+    """
+    Decorates a callback, tracing its phases. The callback's first argument is
+    expected to be the value of its hide-test-clients checkbox.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(value, *args, **kwargs):
+            if not config.get().DASHBOARD_TRACING or not has_request_context():
+                return func(value, *args, **kwargs)
+
+            # The trace is kept on the request, as dash runs callbacks in a
+            # copy of the request's context and serializes their results
+            # outside of it.
+            trace = Trace(plot=plot, hide_test_clients=value is not None and len(value) > 0)
+            g.trace = trace
+            try:
+                return func(value, *args, **kwargs)
+            finally:
+                trace.returned_at = time.perf_counter()
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def add_span(
+    phase: str,
+    started_at: float,
+    duration: float,
+    self_duration: float | None = None,
+    **attributes: str,
+):
+    """
+    Adds a span to the trace of the current callback, if any. started_at is
+    given as returned by time.perf_counter.
+    """
+
+    if not has_request_context():
+        return
+    trace: Trace | None = g.get("trace")
+    if trace is None or trace.returned_at is not None:
+        return
+    trace.spans.append(
+        Span(
+            phase=phase,
+            start=started_at - trace.started_at,
+            duration=duration,
+            self_duration=duration if self_duration is None else self_duration,
+            attributes=attributes,
+        )
+    )
+
+
+def init_app(server: Flask):
+    """
+    Finishes the traces of callbacks once their responses are serialized.
+    """
+
+    cfg = config.get()
+    if not cfg.DASHBOARD_TRACING:
+        return
+    if cfg.DASHBOARD_TRACING_OTLP_ENDPOINT is not None:
+        # Fail on startup rather than on the first trace.
+        _import_opentelemetry()
+
+    @server.after_request
+    def after_request(response: Response) -> Response:
+        trace: Trace | None = g.get("trace")
+        if trace is not None and trace.returned_at is not None:
+            _add_serialize_span(trace, trace.returned_at)
+            _log(trace)
+            if cfg.DASHBOARD_TRACING_OTLP_ENDPOINT is not None:
+                _export(trace, cfg.DASHBOARD_TRACING_OTLP_ENDPOINT)
+        return response
+
+
+def _add_serialize_span(trace: Trace, returned_at: float):
+    # Dash serializes the callback's result right after it has returned, so
+    # that the time until the response is complete is spent serializing.
+    now = time.perf_counter()
+    duration = now - returned_at
+    trace.spans.append(
+        Span(
+            phase="serialize",
+            start=returned_at - trace.started_at,
+            duration=duration,
+            self_duration=duration,
+            attributes={},
+        )
+    )
+
+
+def _log(trace: Trace):
+    record = {
+        "event": "callback",
+        "plot": trace.plot,
+        "hideTestClients": trace.hide_test_clients,
+        "durationMs": _ms(max(s.start + s.duration for s in trace.spans)),
+        "phasesMs": {phase: _ms(d) for phase, d in trace.phase_durations().items()},
+        "spans": [
+            {
+                "phase": s.phase,
+                "startMs": _ms(s.start),
+                "durationMs": _ms(s.duration),
+                "selfMs": _ms(s.self_duration),
+                **s.attributes,
+            }
+            for s in trace.spans
+        ],
+        "pid": os.getpid(),
+    }
+    print(json.dumps(record), file=sys.stderr, flush=True)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+# Tracer of the OpenTelemetry exporter along with the id of the process it was
+# created in. Its export thread does not survive gunicorn forking workers, so
+# that each worker creates its own.
+_tracer: tuple[int, Any] | None = None
+
+
+def _import_opentelemetry():
+    try:
+        # pylint: disable=import-outside-toplevel,unused-import
+        import opentelemetry.exporter.otlp.proto.http.trace_exporter  # noqa: F401
+        import opentelemetry.sdk.trace  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            "Exporting traces requires the optional tracing dependencies. "
+            "Install them using 'poetry install --with tracing'."
+        ) from e
+
+
+def _get_tracer(endpoint: str) -> Any:
+    # pylint: disable=import-outside-toplevel
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    global _tracer
+    if _tracer is None or _tracer[0] != os.getpid():
+        provider = TracerProvider(resource=Resource.create({"service.name": "backbone-data-dashboard"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        _tracer = (os.getpid(), provider.get_tracer(__name__))
+    return _tracer[1]
+
+
+def _export(trace: Trace, endpoint: str):
+    from opentelemetry import trace as otel_trace  # pylint: disable=import-outside-toplevel
+
+    tracer = _get_tracer(endpoint)
+
+    def ns(offset: float) -> int:
+        return trace.started_at_ns + int(offset * 1e9)
+
+    root = tracer.start_span(
+        f"callback {trace.plot}",
+        start_time=trace.started_at_ns,
+        attributes={"dashboard.plot": trace.plot, "dashboard.hide_test_clients": trace.hide_test_clients},
+    )
+    context = otel_trace.set_span_in_context(root)
+    for s in trace.spans:
+        span = tracer.start_span(
+            s.phase,
+            context=context,
+            start_time=ns(s.start),
+            attributes={
+                "dashboard.phase": s.phase,
+                "dashboard.self_ms": _ms(s.self_duration),
+                **{f"dashboard.{k}": v for k, v in s.attributes.items()},
+            },
+        )
+        span.end(end_time=ns(s.start + s.duration))
+    root.end(end_time=ns(max(s.start + s.duration for s in trace.spans)))
@@ -0,0 +1,20 @@
+import pytest
+
+from src import config
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _config():
+    # Test clients are prefixed with test-, app clients with app-.
+    config.init(
+        MSSQL_HOSTNAME="localhost",
+        MSSQL_PORT=1433,
+        MSSQL_USER="sa",
+        MSSQL_PASSWORD="",
+        MSSQL_DB="test",
+        MSSQL_TARGET_ENCRYPT_CONNECTION="false",
+        MSSQL_TRUST_SERVER_CERTIFICATE="true",
+        DASHBOARD_HIDE_TEST_CLIENTS_DEFAULT="false",
+        DASHBOARD_TEST_CLIENTS_REGEX="test-.*",
+        DASHBOARD_APP_CLIENTS_REGEX="app-.*",
+    )
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from src import network
+from src.network import RelNetwork
+
+
+def _network(edges: list[tuple[int, int]], num_messages: list[int] | None = None, num_nodes: int = 0) -> RelNetwork:
+    num_nodes = max([num_nodes] + [max(edge) + 1 for edge in edges])
+    client_ids = ["app-a" if i % 2 == 0 else "connector-b" for i in range(num_nodes)]
+    nodes = pd.DataFrame(
+        {
+            "ClientId": client_ids,
+            "Client": client_ids,
+            "ClientType": ["App" if c.startswith("app-") else "Connector" for c in client_ids],
+        },
+        index=pd.Index([f"id{i}" for i in range(num_nodes)]),
+    )
+    sources = np.array([a for a, _ in edges], dtype=np.int64)
+    targets = np.array([b for _, b in edges], dtype=np.int64)
+    if num_messages is None:
+        num_messages = [0] * len(edges)
+    return RelNetwork.from_edges(nodes, sources, targets, np.array(num_messages, dtype=np.int64))
+
+
+def _edges(net: RelNetwork) -> dict[frozenset[str], int]:
+    return {
+        frozenset((net.addresses[a], net.addresses[b])): int(num)
+        for a, b, num in zip(net.sources, net.targets, net.num_messages)
+    }
+
+
+def test_from_edges_merges_parallel_edges():
+    net = _network([(0, 1), (1, 0), (1, 2), (0, 1)], num_messages=[1, 2, 3, 4])
+
+    assert net.num_nodes == 3
+    assert net.num_edges == 2
+    assert _edges(net) == {frozenset(("id0", "id1")): 7, frozenset(("id1", "id2")): 3}
+
+
+def test_adjacency_lists_neighbors_of_every_node():
+    net = _network([(0, 1), (1, 2), (2, 0), (2, 3)], num_nodes=5)
+
+    assert [sorted(net.neighbors(i).tolist()) for i in range(net.num_nodes)] == [[1, 2], [0, 2], [0, 1, 3], [2], []]
+    assert net.degrees.tolist() == [2, 2, 3, 1, 0]
+    for node in range(net.num_nodes):
+        edges = net.edge_ids[net.indptr[node] : net.indptr[node + 1]]
+        peers = np.where(net.sources[edges] == node, net.targets[edges], net.sources[edges])
+        assert peers.tolist() == net.neighbors(node).tolist()
+
+
+def test_degree_order_is_stable():
+    net = _network([(0, 1), (1, 2), (3, 4)])
+
+    assert net.degree_order().tolist() == [1, 0, 2, 3, 4]
+
+
+def test_subnetwork_keeps_edges_between_given_nodes():
+    net = _network([(0, 1), (1, 2), (2, 3), (3, 0)], num_messages=[1, 2, 3, 4])
+
+    sub = net.subnetwork(np.array([3, 0, 1]))
+
+    assert sub.addresses.tolist() == ["id0", "id1", "id3"]
+    assert _edges(sub) == {frozenset(("id0", "id1")): 1, frozenset(("id3", "id0")): 4}
+    assert sub.client_ids.tolist() == ["app-a", "connector-b", "connector-b"]
+
+
+def test_subnetwork_of_nodes_without_peers():
+    net = _network([(0, 1), (2, 3)], num_messages=[1, 2], num_nodes=6)
+
+    sub = net.subnetwork(np.array([5, 3, 4, 2]))
+
+    assert sub.addresses.tolist() == ["id2", "id3", "id4", "id5"]
+    assert _edges(sub) == {frozenset(("id2", "id3")): 2}
+    assert net.subnetwork(np.array([], dtype=np.int64)).num_nodes == 0
+
+
+def test_version_depends_on_edges_and_messages():
+    net = _network([(0, 1), (1, 2)], num_messages=[1, 2])
+
+    assert net.version == _network([(1, 0), (1, 2)], num_messages=[1, 2]).version
+    assert net.version != _network([(0, 1), (1, 2)], num_messages=[1, 3]).version
+    assert net.version != _network([(0, 1), (0, 2)], num_messages=[1, 2]).version
+
+
+def test_to_networkx_matches_edges():
+    net = _network([(0, 1), (1, 2)], num_messages=[5, 6], num_nodes=4)
+
+    graph = net.to_networkx()
+
+    assert sorted(graph.nodes) == ["id0", "id1", "id2", "id3"]
+    assert graph.edges["id1", "id0"]["NumMessages"] == 5
+    assert graph.nodes["id1"]["ClientType"] == "Connector"
+
+
+def test_connected_components():
+    net = _network([(1, 2), (3, 4), (4, 5), (6, 5)], num_nodes=8)
+
+    assert network.connected_components(net).tolist() == [0, 1, 1, 3, 3, 3, 3, 7]
+
+
+def test_degree_distribution_counts_identities_per_client_type_and_degree():
+    # Even nodes are apps, odd ones connectors.
+    net = _network([(0, 1), (0, 3), (2, 3)], num_nodes=6)
+
+    df = network.network_statistics(net).degree_distribution
+
+    assert df.to_dict("records") == [
+        {"ClientType": "App", "NumPeers": 0, "count": 1},
+        {"ClientType": "App", "NumPeers": 1, "count": 1},
+        {"ClientType": "App", "NumPeers": 2, "count": 1},
+        {"ClientType": "Connector", "NumPeers": 0, "count": 1},
+        {"ClientType": "Connector", "NumPeers": 1, "count": 1},
+        {"ClientType": "Connector", "NumPeers": 2, "count": 1},
+    ]
+
+
+def test_neighborhood_within_radius():
+    # A path 0 - 1 - 2 - 3 - 4 and an isolated node 5.
+    net = _network([(0, 1), (1, 2), (2, 3), (3, 4)], num_nodes=6)
+
+    assert net.neighborhood(np.array([0]), 0).tolist() == [0]
+    assert net.neighborhood(np.array([0]), 1).tolist() == [0, 1]
+    assert net.neighborhood(np.array([0]), 2).tolist() == [0, 1, 2]
+    assert net.neighborhood(np.array([0, 4]), 1).tolist() == [0, 1, 3, 4]
+    assert net.neighborhood(np.array([2, 2]), 9).tolist() == [0, 1, 2, 3, 4]
+    assert net.neighborhood(np.array([5]), 3).tolist() == [5]
+    # Adjacency of nodes without peers in between those with peers.
+    assert net.neighborhood(np.array([4, 5, 0]), 1).tolist() == [0, 1, 3, 4, 5]
+    assert net.neighborhood(np.array([], dtype=np.int64), 2).tolist() == []
+
+
+def test_ego_network_of_addresses():
+    net = _network([(0, 1), (1, 2), (2, 3), (3, 0), (3, 4)], num_messages=[1, 2, 3, 4, 5])
+
+    ego = network.ego_network(net, addresses=["id0", "unknown"], radius=1)
+
+    assert ego is not None
+    assert ego.addresses.tolist() == ["id0", "id1", "id3"]
+    assert _edges(ego) == {frozenset(("id0", "id1")): 1, frozenset(("id3", "id0")): 4}
+
+
+def test_ego_network_of_client():
+    # Even nodes belong to app-a, odd ones to connector-b.
+    net = _network([(0, 1), (1, 3), (2, 5)], num_nodes=7)
+
+    assert network.ego_network(net, client_id="app-a", radius=0).addresses.tolist() == ["id0", "id2", "id4", "id6"]
+    ego = network.ego_network(net, client_id="app-a", radius=1)
+    assert ego.addresses.tolist() == ["id0", "id1", "id2", "id4", "id5", "id6"]
+    assert ego.num_edges == 2
+
+
+def test_ego_network_of_unknown_identities():
+    net = _network([(0, 1)])
+
+    assert network.ego_network(net, addresses=["unknown"]) is None
+    assert network.ego_network(net, client_id="unknown") is None
+    assert network.ego_network(net) is None
@@ -0,0 +1,146 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.rollups import DailyCountRollup, MessageCountRollup
+from src.synthetic import create_sql_server_functions
+
+
+@pytest.fixture(name="cnxn")
+def fixture_cnxn():
+    cnxn = sqlite3.connect(":memory:")
+    cnxn.execute("ATTACH DATABASE ':memory:' AS Messages")
+    cnxn.execute("CREATE TABLE Messages.RecipientInformation (Id INTEGER PRIMARY KEY, RelationshipId TEXT)")
+    yield cnxn
+    cnxn.close()
+
+
+def _add_recipients(cnxn: sqlite3.Connection, *relationship_ids: str | None):
+    cnxn.executemany(
+        "INSERT INTO Messages.RecipientInformation (RelationshipId) VALUES (?)",
+        [(relationship_id,) for relationship_id in relationship_ids],
+    )
+
+
+def test_message_counts_are_added_incrementally(cnxn):
+    rollup = MessageCountRollup(full_refresh_interval=3600)
+    assert rollup.refresh(cnxn).empty
+
+    _add_recipients(cnxn, "rel1", "rel1", None, "rel2")
+    assert rollup.refresh(cnxn).to_dict() == {"rel1": 2, "rel2": 1}
+
+    _add_recipients(cnxn, "rel2", "rel3")
+    counts = rollup.refresh(cnxn)
+    assert counts.to_dict() == {"rel1": 2, "rel2": 2, "rel3": 1}
+    assert counts.dtype == "int64"
+
+    assert rollup.refresh(cnxn).to_dict() == {"rel1": 2, "rel2": 2, "rel3": 1}
+
+
+def test_deleted_messages_are_dropped_on_full_refresh(cnxn):
+    _add_recipients(cnxn, "rel2", "rel1", "rel1")
+    incremental = MessageCountRollup(full_refresh_interval=3600)
+    full = MessageCountRollup(full_refresh_interval=0)
+    incremental.refresh(cnxn)
+    full.refresh(cnxn)
+
+    cnxn.execute("DELETE FROM Messages.RecipientInformation WHERE RelationshipId = 'rel2'")
+    _add_recipients(cnxn, "rel1")
+
+    assert incremental.refresh(cnxn).to_dict() == {"rel1": 3, "rel2": 1}
+    assert full.refresh(cnxn).to_dict() == {"rel1": 3}
+
+
+@pytest.fixture(name="source")
+def fixture_source():
+    source = sqlite3.connect(":memory:")
+    create_sql_server_functions(source)
+    source.execute("ATTACH DATABASE ':memory:' AS Devices")
+    source.execute("ATTACH DATABASE ':memory:' AS Synchronization")
+    source.execute("CREATE TABLE Devices.Identities (Address TEXT PRIMARY KEY, ClientId TEXT, CreatedAt TEXT)")
+    source.execute("CREATE TABLE Synchronization.ExternalEvents (Owner TEXT, Type INTEGER, CreatedAt TEXT)")
+    yield source
+    source.close()
+
+
+def _add_identities(source: sqlite3.Connection, *identities: tuple[str, str, str]):
+    source.executemany("INSERT INTO Devices.Identities VALUES (?, ?, ?)", identities)
+
+
+def _daily_counts(df: pd.DataFrame) -> dict[tuple, int]:
+    keys = df.drop(columns="count").assign(Day=df["Day"].dt.strftime("%Y-%m-%d"))
+    return dict(zip(keys.itertuples(index=False, name=None), df["count"]))
+
+
+def test_daily_counts_replace_the_last_day_incrementally(source, tmp_path):
+    rollup = DailyCountRollup(tmp_path / "rollup.sqlite", full_refresh_interval=3600)
+    assert rollup.refresh(source, "identities").empty
+
+    _add_identities(
+        source,
+        ("id1", "app", "2024-01-01 08:00:00"),
+        ("id2", "app", "2024-01-02 09:00:00"),
+        ("id3", "connector", "2024-01-02 10:00:00"),
+    )
+    assert _daily_counts(rollup.refresh(source, "identities")) == {
+        ("2024-01-01", "app"): 1,
+        ("2024-01-02", "app"): 1,
+        ("2024-01-02", "connector"): 1,
+    }
+
+    # Rows of the last day counted are counted again, those of earlier days
+    # are kept.
+    _add_identities(source, ("id4", "app", "2024-01-02 23:00:00"), ("id5", "app", "2024-01-03 00:00:00"))
+    assert _daily_counts(rollup.refresh(source, "identities")) == {
+        ("2024-01-01", "app"): 1,
+        ("2024-01-02", "app"): 2,
+        ("2024-01-02", "connector"): 1,
+        ("2024-01-03", "app"): 1,
+    }
+
+
+def test_daily_counts_are_split_by_category(source, tmp_path):
+    _add_identities(source, ("id1", "app", "2024-01-01 08:00:00"), ("id2", "connector", "2024-01-01 08:00:00"))
+    source.executemany(
+        "INSERT INTO Synchronization.ExternalEvents VALUES (?, ?, ?)",
+        [
+            ("id1", 0, "2024-01-01 09:00:00"),
+            ("id1", 0, "2024-01-01 10:00:00"),
+            ("id1", 10, "2024-01-01 11:00:00"),
+            ("id2", 0, "2024-01-02 09:00:00"),
+        ],
+    )
+    rollup = DailyCountRollup(tmp_path / "rollup.sqlite", full_refresh_interval=3600)
+
+    assert _daily_counts(rollup.refresh(source, "external_events")) == {
+        ("2024-01-01", "app", 0): 2,
+        ("2024-01-01", "app", 10): 1,
+        ("2024-01-02", "connector", 0): 1,
+    }
+
+
+def test_daily_counts_are_rebuilt_after_the_full_refresh_interval(source, tmp_path):
+    _add_identities(source, ("id1", "app", "2024-01-01 08:00:00"), ("id2", "app", "2024-01-02 08:00:00"))
+    incremental = DailyCountRollup(tmp_path / "incremental.sqlite", full_refresh_interval=3600)
+    full = DailyCountRollup(tmp_path / "full.sqlite", full_refresh_interval=0)
+    incremental.refresh(source, "identities")
+    full.refresh(source, "identities")
+
+    source.execute("DELETE FROM Devices.Identities WHERE Address = 'id1'")
+
+    assert _daily_counts(incremental.refresh(source, "identities")) == {
+        ("2024-01-01", "app"): 1,
+        ("2024-01-02", "app"): 1,
+    }
+    assert _daily_counts(full.refresh(source, "identities")) == {("2024-01-02", "app"): 1}
+
+
+def test_daily_counts_are_shared_through_the_file(source, tmp_path):
+    _add_identities(source, ("id1", "app", "2024-01-01 08:00:00"))
+    DailyCountRollup(tmp_path / "rollup.sqlite", full_refresh_interval=3600).refresh(source, "identities")
+    _add_identities(source, ("id2", "app", "2024-01-01 09:00:00"))
+
+    # Another worker's rollup continues from the watermark stored in the file.
+    other = DailyCountRollup(tmp_path / "rollup.sqlite", full_refresh_interval=3600)
+    assert _daily_counts(other.refresh(source, "identities")) == {("2024-01-01", "app"): 2}